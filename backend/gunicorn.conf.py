@@ -0,0 +1,11 @@
+from src.core.config import settings
+from src.metrics.multiprocess import clear_directory
+
+worker_class = "uvicorn.workers.UvicornWorker"
+
+
+def on_starting(server) -> None:
+    # Снимки метрик прошлого запуска не должны попасть в счётчики нового,
+    # снимки работающих Celery воркеров остаются
+    if settings.METRICS.MULTIPROCESS_DIR:
+        clear_directory(settings.METRICS.MULTIPROCESS_DIR)
@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 
-from src.api.v1.endpoints import user
+from src.api.v1.endpoints import metrics, user
 from src.api.v1.endpoints.auth import auth, email, password
+from src.core.config import settings
 
 api_router = APIRouter()
 
@@ -9,3 +10,5 @@ api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(email.router, prefix="/user/email", tags=["user"])
 api_router.include_router(password.router, prefix="/user/password", tags=["user"])
 api_router.include_router(user.router, prefix="/user/profile", tags=["user"])
+if settings.METRICS.ENABLED:
+    api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
@@ -1,4 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Response,
+    status,
+)
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 
 from src.api.v1.dependencies import (
@@ -73,10 +80,13 @@ async def register_user(
 )
 async def login(
     user_service: UserServiceDependency,
+    background_tasks: BackgroundTasks,
     credentials: OAuth2PasswordRequestForm = Depends(),
     strategy: StrategyABC = Depends(backend.get_strategy),
 ):
-    user = await user_service.authenticate(credentials.username, credentials.password)
+    user = await user_service.authenticate(
+        credentials.username, credentials.password, background_tasks
+    )
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -0,0 +1,39 @@
+from secrets import compare_digest
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from src.core.config import settings
+from src.metrics import metrics_service
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+bearer = HTTPBearer(auto_error=False)
+
+
+def verify_metrics_token(
+    credentials: Annotated[Optional[HTTPAuthorizationCredentials], Depends(bearer)],
+) -> None:
+    """Проверяет токен `METRICS.TOKEN`, без настроенного токена метрики недоступны"""
+
+    token = settings.METRICS.TOKEN
+    if (
+        token is None
+        or credentials is None
+        or not compare_digest(credentials.credentials.encode(), token.encode())
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+router = APIRouter(dependencies=[Depends(verify_metrics_token)])
+
+
+# Снимки воркеров читаются с диска, поэтому обработчик выполняется в пуле потоков
+@router.get("", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics_service.render(), media_type=CONTENT_TYPE)
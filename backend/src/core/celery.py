@@ -1,11 +1,15 @@
 from logging.config import dictConfig
 
 from celery.app import Celery
-from celery.signals import setup_logging
+from celery.signals import setup_logging, worker_process_init, worker_process_shutdown
 
 from src.core.config import settings
+from src.database import async_engine
 from src.logs.config import LOG_CONFIG
-from src.utils.enums import BytesTo, SecondsTo
+from src.metrics import metrics_service
+from src.services.renderers import TemplateRenderer
+from src.tracing.integrations import instrument_celery, instrument_engine
+from src.utils.enums import SecondsTo
 
 REDIS_URL = f"{settings.REDIS.URL}/1"
 
@@ -16,6 +20,9 @@ celery_app = Celery(
     broker_connection_retry_on_startup=False,
 )
 
+instrument_celery()
+instrument_engine(async_engine)
+
 celery_app.autodiscover_tasks(
     [
         "src.services.auth",
@@ -32,12 +39,32 @@ celery_app.conf.beat_schedule = {
         ),
         "kwargs": {
             "writer_path": settings.LOG.WRITER_PATH,
-            "writer_kwargs": {"file_size": BytesTo.ONE_MB * 10},
+            "writer_kwargs": {"file_size": settings.LOG.MAX_FILE_SIZE},
+            "chunk_size": settings.LOG.DRAIN_CHUNK_SIZE,
         },
-    }
+    },
+    "dispatch-mail-outbox": {
+        "task": "mail-outbox-dispatch",
+        "schedule": settings.EMAIL.OUTBOX_DISPATCH_INTERVAL,
+    },
 }
 
 
 @setup_logging.connect
 def setup_loggers(*args, **kwargs):
     dictConfig(LOG_CONFIG)
+
+
+@worker_process_init.connect
+def warm_up_templates(*args, **kwargs):
+    TemplateRenderer.warm_up()
+
+
+@worker_process_init.connect
+def start_metrics(*args, **kwargs):
+    metrics_service.start()
+
+
+@worker_process_shutdown.connect
+def stop_metrics(*args, **kwargs):
+    metrics_service.stop()
@@ -4,6 +4,7 @@ from src.core.config.testing import (
     EmailSettingsTest,
     LogSettingsTest,
     RedisSettingsTest,
+    TracingSettingsTest,
 )
 
 from .base import (
@@ -43,6 +44,7 @@ class SettingsFactory:
             base_settings.EMAIL = EmailSettingsTest()  # type: ignore
             base_settings.LOG = LogSettingsTest()
             base_settings.REDIS = RedisSettingsTest()
+            base_settings.TRACING = TracingSettingsTest()
         else:
             base_settings.DEBUG = False
             base_settings.EMAIL = EmailSettingsProd()  # type: ignore
@@ -49,6 +49,29 @@ class EmailSettings(PyBaseSettings):
     USE_SSL: Optional[bool] = None
     SSL_KEYFILE: Optional[str] = None
     SSL_CERTFILE: Optional[str] = None
+    POOL_ENABLED: bool = True
+    POOL_SIZE: int = 4
+    POOL_IDLE_TIMEOUT: int = SecondsTo.ONE_MINUTE
+    POOL_KEEPALIVE_INTERVAL: int = 15
+    POOL_MAX_MESSAGES: int = 100
+    MASS_CHUNK_SIZE: int = 100
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_RETRY_DELAY: int = SecondsTo.ONE_SECOND * 30
+    OUTBOX_DISPATCH_INTERVAL: int = SecondsTo.ONE_SECOND * 5
+    OUTBOX_LEASE_TIMEOUT: int = SecondsTo.ONE_MINUTE * 10
+    SPOOL_MAX_SIZE: int = BytesTo.ONE_MB
+    STREAM_BUFFER_SIZE: int = BytesTo.ONE_KB * 64
+    DOMAIN_RATE: float = 5
+    DOMAIN_BURST: int = 10
+    DOMAIN_CONCURRENCY: int = 2
+    # Домен -> (сообщений в секунду, размер всплеска, параллельных отправок)
+    DOMAIN_LIMITS: dict[str, tuple[float, int, int]] = {}
+    DELIVERY_BACKEND: str = "src.services.mail.email.backend.EmailSMTPBackend"
+    DELIVERY_WORKERS: int = 8
+    DELIVERY_MAX_ATTEMPTS: int = 4
+    DELIVERY_RETRY_DELAY: float = SecondsTo.ONE_SECOND * 2
+    DELIVERY_MAX_RETRY_DELAY: float = SecondsTo.ONE_MINUTE
 
     model_config = get_model_config("SMTP_")
 
@@ -88,8 +111,90 @@ class LogSettings(PyBaseSettings):
     STORAGE_PATH: str = "src.logs.storage.RedisStorage"
     DIR: Path = BASE_DIR / "logs"
     MAX_FILE_SIZE: int = BytesTo.ONE_MB * 10
+    BACKUP_COUNT: int = 5
+    BACKUP_MAX_AGE: Optional[int] = SecondsTo.ONE_WEEK * 4
+    ALLOW_COMPRESSION: bool = True
+    COMPRESSION: Literal["gzip", "zstd"] = "gzip"
+    ROTATION_WHEN: Optional[Literal["hourly", "daily"]] = None
+    INDEX_BLOCK_SIZE: int = BytesTo.ONE_KB * 64
     CHECK_TIMEOUT: int = SecondsTo.ONE_MINUTE * 30
     WRITER_PATH: str = "src.logs.writer.RotationFileWriter"
+    JSON_ENCODER: Literal["json", "orjson"] = "json"
+    FILE_FORMAT: Literal["ndjson", "json"] = "ndjson"
+    FSYNC_POLICY: Literal["always", "interval", "never"] = "always"
+    FSYNC_INTERVAL: float = 1.0
+    STREAM_MAX_LEN: int = 1_000_000
+    STREAM_GROUP: str = "log-writers"
+    STREAM_CLAIM_IDLE: int = SecondsTo.ONE_MINUTE * 5
+    STREAM_CONSUMER: Optional[str] = None
+    DRAIN_CHUNK_SIZE: int = 1000
+    LOCMEM_MAX_LEN: int = 10_000
+    QUEUE_SIZE: int = 10_000
+    BATCH_SIZE: int = 500
+    FLUSH_INTERVAL: float = 1.0
+    CAPTURE_BODY: bool = True
+    MAX_BODY_SIZE: int = BytesTo.ONE_KB * 16
+    ACCESS_SAMPLE_RATE: float = 0.01
+    ACCESS_ROUTE_SAMPLE_RATES: dict[str, float] = {}
+    ACCESS_SLOW_THRESHOLD: int = 1000
+    EXCEPTION_DEDUP_WINDOW: int = SecondsTo.ONE_MINUTE
+    EXCEPTION_DEDUP_MAX_SIZE: int = 1024
+
+
+class TracingSettings(PyBaseSettings):
+    ENABLED: bool = True
+    SAMPLE_RATE: float = 0.1
+    SERVICE_NAME: Optional[str] = None
+    EXPORTER_PATH: str = "src.tracing.exporters.FileSpanExporter"
+    FILE: Path = BASE_DIR / "logs" / "traces" / "spans.ndjson"
+    OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    OTLP_TIMEOUT: float = 5.0
+    QUEUE_SIZE: int = 10_000
+    BATCH_SIZE: int = 512
+    FLUSH_INTERVAL: float = 5.0
+    MAX_STATEMENT_SIZE: int = BytesTo.ONE_KB
+
+    model_config = get_model_config("TRACING_")
+
+
+class TemplateSettings(PyBaseSettings):
+    CACHE_SIZE: int = 400
+    BYTECODE_CACHE_DIR: Optional[Path] = None
+
+    model_config = get_model_config("TEMPLATE_")
+
+
+class TaskSettings(PyBaseSettings):
+    BACKEND: str = "src.services.tasks.celery.CeleryTaskService"
+    WORKERS: int = 4
+    QUEUE_SIZE: int = 1000
+    RESULTS_SIZE: int = 1000
+    DRAIN_TIMEOUT: int = SecondsTo.ONE_SECOND * 30
+
+    model_config = get_model_config("TASK_")
+
+
+class MetricsSettings(PyBaseSettings):
+    ENABLED: bool = True
+    # Bearer токен для /metrics, без него эндпоинт отвечает 401
+    TOKEN: Optional[str] = None
+    MULTIPROCESS_DIR: Optional[Path] = None
+    FLUSH_INTERVAL: float = 5.0
+    LATENCY_BUCKETS: list[float] = [
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+    ]
+
+    model_config = get_model_config("METRICS_")
 
 
 class AuthSettings(PyBaseSettings):
@@ -112,6 +217,10 @@ class AuthSettings(PyBaseSettings):
         "src.services.validators.password.NumericPasswordValidator",
         "src.services.validators.password.CommonPasswordValidator",
     ]
+    PASSWORD_SCHEMES: list[str] = ["bcrypt"]
+    BCRYPT_ROUNDS: Optional[int] = None
+    ARGON2_TIME_COST: Optional[int] = None
+    ARGON2_MEMORY_COST: Optional[int] = None
 
     model_config = get_model_config("AUTH_")
 
@@ -142,6 +251,10 @@ class BaseSettings(PyBaseSettings):
     DB: DatabaseSettings = DatabaseSettings()
     REDIS: RedisSettings = RedisSettings()
     LOG: LogSettings = LogSettings()
+    TRACING: TracingSettings = TracingSettings()
+    METRICS: MetricsSettings = MetricsSettings()
+    TEMPLATE: TemplateSettings = TemplateSettings()
+    TASK: TaskSettings = TaskSettings()
     EMAIL: EmailSettings = EmailSettings()  # type: ignore
     AUTH: AuthSettings = AuthSettings()  # type: ignore
     CORS: CORSSettings = CORSSettings()
@@ -1,7 +1,12 @@
 from pathlib import Path
 from typing import Optional
 
-from src.core.config.base import EmailSettings, LogSettings, RedisSettings
+from src.core.config.base import (
+    EmailSettings,
+    LogSettings,
+    RedisSettings,
+    TracingSettings,
+)
 
 
 class EmailSettingsTest(EmailSettings):
@@ -18,3 +23,7 @@ class RedisSettingsTest(RedisSettings):
     LOG_DB: Optional[int] = 15
     CACHE_DB: int = 15
     BACKEND: Optional[str] = "src.services.cache.InMemoryBackend"
+
+
+class TracingSettingsTest(TracingSettings):
+    ENABLED: bool = False
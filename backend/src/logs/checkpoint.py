@@ -0,0 +1,103 @@
+from contextlib import contextmanager
+from fcntl import LOCK_EX, LOCK_NB, LOCK_UN, flock
+from hashlib import sha1
+from json import JSONDecodeError, dumps, loads
+from os import fsync, replace
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from src.core.config import settings
+from src.logs.types import LOG_KIND
+from src.logs.writer import WritePosition
+
+
+class Checkpoint(NamedTuple):
+    """
+    Контрольная точка выгрузки логов одного типа
+
+    :param digest: Хеш порции, запись которой начата
+    :param position: Позиция в файле, с которой начата запись порции
+    :param count: Количество лог-записей в порции
+    """
+
+    digest: str
+    position: Optional[WritePosition] = None
+    count: int = 0
+
+
+class CheckpointStore:
+    """
+    Хранит контрольные точки выгрузки логов в файлах рядом с логами.
+    Файл заменяется атомарно, поэтому после падения он либо старый, либо новый.
+    Контрольная точка одна на тип логов, поэтому выгрузка типа должна выполняться
+    под блокировкой `lock`
+
+    :param directory: Директория логов
+    """
+
+    def __init__(self, directory: Optional[Path] = None) -> None:
+        self.directory = directory or settings.LOG.DIR
+
+    def load(self, kind: LOG_KIND) -> Optional[Checkpoint]:
+        try:
+            data = loads(self._get_file(kind).read_text())
+        except (FileNotFoundError, JSONDecodeError):
+            return None
+
+        position = data.get("position")
+        return Checkpoint(
+            digest=data["digest"],
+            position=WritePosition(*position) if position else None,
+            count=data.get("count", 0),
+        )
+
+    def save(self, kind: LOG_KIND, checkpoint: Checkpoint) -> None:
+        file = self._get_file(kind)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = file.with_suffix(".tmp")
+
+        with open(tmp_file, "w") as f:
+            f.write(dumps(checkpoint._asdict()))
+            f.flush()
+            fsync(f.fileno())
+        replace(tmp_file, file)
+
+    def delete(self, kind: LOG_KIND) -> None:
+        self._get_file(kind).unlink(missing_ok=True)
+
+    @contextmanager
+    def lock(self, kind: LOG_KIND) -> Iterator[bool]:
+        """
+        Блокировка выгрузки логов одного типа между процессами.
+        Не ждёт освобождения: если выгрузку уже выполняет другой процесс,
+        возвращается `False`. Блокировка снимается ОС и при падении процесса
+
+        :return: Захвачена ли блокировка
+        """
+
+        file = self._get_file(kind).with_suffix(".lock")
+        file.parent.mkdir(parents=True, exist_ok=True)
+        with open(file, "a") as f:
+            try:
+                flock(f.fileno(), LOCK_EX | LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+
+            try:
+                yield True
+            finally:
+                flock(f.fileno(), LOCK_UN)
+
+    def _get_file(self, kind: LOG_KIND) -> Path:
+        return self.directory / kind / f".{kind}.checkpoint"
+
+
+def get_chunk_digest(values: list[bytes]) -> str:
+    """Хеш порции лог-записей"""
+
+    digest = sha1(usedforsecurity=False)
+    for value in values:
+        digest.update(len(value).to_bytes(8, "big"))
+        digest.update(value)
+    return digest.hexdigest()
@@ -0,0 +1,128 @@
+import gzip
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BufferedReader
+from os import getpid, replace, utime
+from pathlib import Path
+from shutil import copyfileobj
+from threading import Lock
+from typing import IO, Callable, Literal, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION = Literal["gzip", "zstd"]
+COMPRESSION_SUFFIXES: dict[str, str] = {"gzip": ".gz", "zstd": ".zst"}
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def compress_file(file: Path, compression: COMPRESSION) -> Path:
+    """
+    Сжимает файл потоково, не загружая его в память.
+    Сжатый файл сначала пишется во временный и переименовывается,
+    исходный удаляется только после успешного сжатия
+
+    :param file: Путь к файлу
+    :param compression: Алгоритм сжатия
+    :raises ImportError: Для zstd не установлен пакет `zstandard`
+    :return: Путь к сжатому файлу
+    """
+
+    destination = file.with_name(file.name + COMPRESSION_SUFFIXES[compression])
+    tmp_destination = destination.with_name(destination.name + ".tmp")
+    stat = file.stat()
+
+    with open(file, "rb") as source, open_compressed(tmp_destination, compression) as f:
+        copyfileobj(source, f, COPY_CHUNK_SIZE)
+
+    # Время изменения сохраняется, по нему считается возраст сегмента
+    utime(tmp_destination, (stat.st_atime, stat.st_mtime))
+    replace(tmp_destination, destination)
+    file.unlink()
+    return destination
+
+
+def open_compressed(file: Path, compression: COMPRESSION) -> IO[bytes]:
+    """Открывает файл на запись со сжатием"""
+
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("Для сжатия логов zstd необходим пакет zstandard")
+        return zstandard.ZstdCompressor().stream_writer(open(file, "wb"))
+
+    return gzip.open(file, "wb")
+
+
+def open_decompressed(file: Path, compression: COMPRESSION) -> IO[bytes]:
+    """Открывает сжатый файл на чтение с распаковкой, в т.ч. из нескольких фреймов"""
+
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("Для распаковки логов zstd необходим пакет zstandard")
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            open(file, "rb"), read_across_frames=True
+        )
+        return BufferedReader(reader)  # type: ignore[arg-type]
+
+    return gzip.open(file, "rb")  # type: ignore[return-value]
+
+
+def compress_bytes(data: bytes, compression: COMPRESSION) -> bytes:
+    """
+    Сжимает данные в отдельный gzip member / zstd frame.
+    Склеенные фреймы остаются корректным сжатым файлом, и каждый из них
+    можно распаковать независимо, зная его смещение
+    """
+
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("Для сжатия логов zstd необходим пакет zstandard")
+        return zstandard.ZstdCompressor().compress(data)
+
+    return gzip.compress(data)
+
+
+def decompress_bytes(data: bytes, compression: COMPRESSION) -> bytes:
+    """Распаковывает данные, сжатые `compress_bytes`"""
+
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("Для распаковки логов zstd необходим пакет zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+
+    return gzip.decompress(data)
+
+
+def get_compression(file: Path) -> Optional[COMPRESSION]:
+    """Алгоритм сжатия файла по его расширению"""
+
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if file.name.endswith(suffix):
+            return compression  # type: ignore[return-value]
+    return None
+
+
+class BackgroundExecutor:
+    """
+    Фоновый поток для обслуживания файлов логов (сжатие, удаление старых).
+    Поток создаётся лениво и заново после fork процесса
+    """
+
+    def __init__(self) -> None:
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = Lock()
+
+    def submit(self, function: Callable, *args) -> Future:
+        pid = getpid()
+        with self._lock:
+            if self._executor is None or self._pid != pid:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="log-maintenance"
+                )
+                self._pid = pid
+            return self._executor.submit(function, *args)
+
+
+background_executor = BackgroundExecutor()
@@ -0,0 +1,188 @@
+from collections import OrderedDict
+from hashlib import sha1
+from logging import getLogger
+from threading import Lock
+from traceback import walk_tb
+from typing import Callable, NamedTuple, Optional
+
+from src.core.config import BASE_DIR, settings
+
+logger = getLogger(__name__)
+
+# Части путей, после которых путь к файлу не зависит от окружения
+PATH_MARKERS = ("site-packages/", "dist-packages/")
+MAX_CHAIN_DEPTH = 8
+
+
+class Occurrence(NamedTuple):
+    """
+    Учёт исключения в текущем окне
+
+    :param first: Первое появление в окне, трассировку нужно сохранить полностью
+    :param count: Номер появления в окне
+    :param suppressed: Сколько появлений без трассировки было в прошлом окне
+    """
+
+    first: bool
+    count: int
+    suppressed: int
+
+
+class ExceptionDeduplicator:
+    """
+    Дедупликация трассировок одинаковых исключений.
+
+    Исключения группируются по отпечатку: типу и кадрам стека (файл, функция,
+    строка) с учётом цепочки `__cause__`/`__context__`, без текста сообщения.
+    Полная трассировка сохраняется один раз за окно `window` секунд,
+    остальные появления в окне записываются только с отпечатком и счётчиком.
+    Количество повторов без трассировки передаётся в `report`, если отпечаток
+    вытеснен из LRU или его окно истекло без новых появлений
+
+    :param window: Длина окна в секундах, `0` - дедупликация выключена
+    :param max_size: Максимальное количество отслеживаемых отпечатков
+    :param report: Обработчик повторов без трассировки: отпечаток и их количество
+    """
+
+    def __init__(
+        self,
+        window: Optional[float] = None,
+        max_size: Optional[int] = None,
+        report: Optional[Callable[[str, int], None]] = None,
+    ) -> None:
+        self.window = (
+            settings.LOG.EXCEPTION_DEDUP_WINDOW if window is None else window
+        )
+        self.max_size = max_size or settings.LOG.EXCEPTION_DEDUP_MAX_SIZE
+        self.report = report or report_suppressed
+        # Отпечаток -> [начало окна, появлений в окне]
+        self._windows: OrderedDict[str, list] = OrderedDict()
+        self._swept_at = 0.0
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def register(self, fingerprint: str, created: float) -> Occurrence:
+        """
+        Учитывает появление исключения
+
+        :param fingerprint: Отпечаток исключения
+        :param created: Время создания записи лога
+        """
+
+        evicted: Optional[tuple[str, list]] = None
+        with self._lock:
+            state = self._windows.get(fingerprint)
+            if state is None or created - state[0] >= self.window:
+                suppressed = state[1] - 1 if state is not None else 0
+                self._windows[fingerprint] = [created, 1]
+                self._windows.move_to_end(fingerprint)
+                if len(self._windows) > self.max_size:
+                    evicted = self._windows.popitem(last=False)
+                occurrence = Occurrence(True, 1, suppressed)
+            else:
+                state[1] += 1
+                self._windows.move_to_end(fingerprint)
+                occurrence = Occurrence(False, state[1], 0)
+
+        # Обработчик пишет лог, поэтому вызывается вне блокировки
+        if evicted is not None and evicted[1][1] > 1:
+            self.report(evicted[0], evicted[1][1] - 1)
+        return occurrence
+
+    def sweep(self, now: float) -> None:
+        """
+        Закрывает истёкшие окна и передаёт в `report` их повторы без трассировки,
+        иначе они потеряются, если исключение больше не появится.
+        Окна проверяются не чаще раза в `window` секунд
+
+        :param now: Текущее время, в той же шкале, что и `created` записей
+        """
+
+        if not self.enabled or now - self._swept_at < self.window:
+            return
+
+        with self._lock:
+            if now - self._swept_at < self.window:
+                return
+            self._swept_at = now
+            expired = [
+                (fingerprint, state[1] - 1)
+                for fingerprint, state in self._windows.items()
+                if now - state[0] >= self.window
+            ]
+            for fingerprint, _ in expired:
+                del self._windows[fingerprint]
+
+        for fingerprint, suppressed in expired:
+            if suppressed:
+                self.report(fingerprint, suppressed)
+
+
+def report_suppressed(fingerprint: str, suppressed: int) -> None:
+    """Записывает в лог, сколько повторов исключения было без трассировки"""
+
+    logger.error(
+        "Исключение %s повторилось без трассировки %s раз",
+        fingerprint,
+        suppressed,
+        extra={
+            "data": {
+                "exception_fingerprint": fingerprint,
+                "exception_suppressed": suppressed,
+            }
+        },
+    )
+
+
+def get_exception_fingerprint(exception: BaseException) -> str:
+    """
+    Отпечаток исключения: тип и нормализованные кадры стека,
+    включая цепочку причин
+
+    :param exception: Исключение
+    """
+
+    digest = sha1(usedforsecurity=False)
+    seen: set[int] = set()
+    current: Optional[BaseException] = exception
+
+    while current is not None and len(seen) < MAX_CHAIN_DEPTH:
+        if id(current) in seen:
+            break
+        seen.add(id(current))
+
+        exception_type = type(current)
+        digest.update(
+            f"{exception_type.__module__}.{exception_type.__qualname__}\n".encode()
+        )
+        for frame, lineno in walk_tb(current.__traceback__):
+            code = frame.f_code
+            filename = normalize_filename(code.co_filename)
+            digest.update(f"{filename}:{code.co_name}:{lineno}\n".encode())
+
+        if current.__cause__ is not None:
+            current = current.__cause__
+        elif not current.__suppress_context__:
+            current = current.__context__
+        else:
+            current = None
+
+    return digest.hexdigest()[:16]
+
+
+def normalize_filename(filename: str) -> str:
+    """Путь к файлу без частей, зависящих от окружения"""
+
+    for marker in PATH_MARKERS:
+        _, found, tail = filename.rpartition(marker)
+        if found:
+            return tail
+
+    base_dir = str(BASE_DIR)
+    if filename.startswith(base_dir):
+        return filename[len(base_dir) :].lstrip("/")
+    return filename
+
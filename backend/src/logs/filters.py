@@ -1,58 +1,170 @@
+import re
 from json import JSONDecodeError, loads
-from typing import Any, Iterable
+from typing import Any, Iterable, Literal, Optional
+from urllib.parse import unquote_plus
+
+from src.core.config import settings
+
+SECURE_VALUE = "<SECURE>"
+MAX_DEPTH = 32
+KEY_CACHE_SIZE = 4096
+# Заголовки с учётными данными, их значения в лог не попадают
+CREDENTIAL_HEADERS = frozenset(
+    {
+        "authorization",
+        "proxy-authorization",
+        "cookie",
+        "set-cookie",
+        "x-api-key",
+        "x-csrf-token",
+    }
+)
+
+# Пара `"ключ": значение` в JSON, в т.ч. в обрезанном, который не парсится
+JSON_PAIR_REGEX = re.compile(
+    r'"(?P<key>(?:[^"\\]|\\.)*)"\s*:\s*'
+    r'(?P<value>"(?:[^"\\]|\\.)*"?|[^,{}\[\]\s]+)'
+)
+
+KeyAction = Optional[Literal["exclude", "secure"]]
 
 
 class PIIFilter:
     """
-    Класс для замены PII в лог-записях
+    Класс для замены PII в лог-записях.
+
+    Паттерны компилируются один раз в регулярные выражения, решение по ключу кешируется.
+    Тело запроса обходится рекурсивно: вложенные объекты и списки JSON,
+    поля form-urlencoded, а также обрезанный JSON, который не удалось распарсить
 
     :param pii_patterns: Паттерны ключей, значения которых необходимо заменить
     :param exclude_patterns: Паттерны ключей, значения которых не нужно хранить в лог-записях
+    :param max_body_size: Сколько символов тела проверять, остальное отбрасывается,
+        по умолчанию - лимит сохраняемого тела `LOG.MAX_BODY_SIZE`
     """
 
     def __init__(
-        self, pii_patterns: Iterable[str], exclude_patterns: Iterable[str]
+        self,
+        pii_patterns: Iterable[str],
+        exclude_patterns: Iterable[str],
+        max_body_size: Optional[int] = None,
     ) -> None:
-        self._pii_patterns = pii_patterns
-        self._exclude_patterns = exclude_patterns
+        self._pii_regex = self._compile(pii_patterns)
+        self._exclude_regex = self._compile(exclude_patterns)
+        self.max_body_size = max_body_size or settings.LOG.MAX_BODY_SIZE
+        self._key_actions: dict[str, KeyAction] = {}
 
     def replace(self, request_data: dict[str, Any]) -> dict:
         """Удалить/заменить ненужные/чувствительные данные из лог-записи"""
 
         body = request_data.get("request_body", "")
-
-        try:
-            body = loads(body)
-        except JSONDecodeError:
-            body = self._replace_string(body)
+        if isinstance(body, str):
+            body = self.replace_body(body)
         else:
-            body = self._replace_dict(body)
+            body = self._replace_value(body, 0)
 
         request_data["request_body"] = body
+        for field in ("request_headers", "response_headers"):
+            headers = request_data.get(field)
+            if headers:
+                request_data[field] = self.replace_headers(headers)
         return request_data
 
-    def _replace_string(self, body: str) -> str:
-        data = body.split("&")
+    @staticmethod
+    def replace_headers(headers: dict[str, str]) -> dict[str, str]:
+        """Заменить значения заголовков с учётными данными"""
+        return {
+            name: SECURE_VALUE if name.lower() in CREDENTIAL_HEADERS else value
+            for name, value in headers.items()
+        }
+
+    def replace_body(self, body: str) -> Any:
+        """
+        Заменить данные в теле запроса
+
+        :param body: Тело запроса
+        :return: Распарсенный JSON или строка с заменёнными значениями
+        """
+
+        body = body[: self.max_body_size]
+
+        try:
+            data = loads(body)
+        except (JSONDecodeError, RecursionError):
+            if body.lstrip().startswith(("{", "[")):
+                return self._replace_raw_json(body)
+            return self._replace_string(body)
 
-        for idx, field in enumerate(data):
-            try:
-                key, _ = field.split("=")
-            except ValueError:
-                return body
+        return self._replace_value(data, 0)
 
-            if any(pattern in key.lower() for pattern in self._exclude_patterns):
-                data.pop(idx)
-            elif any(pattern in key.lower() for pattern in self._pii_patterns):
-                data[idx] = f"{key}=<SECURE>"
+    def get_key_action(self, key: str) -> KeyAction:
+        """Что сделать со значением ключа: удалить, заменить или оставить (None)"""
+
+        try:
+            return self._key_actions[key]
+        except KeyError:
+            pass
+
+        action: KeyAction = None
+        if self._exclude_regex and self._exclude_regex.search(key):
+            action = "exclude"
+        elif self._pii_regex and self._pii_regex.search(key):
+            action = "secure"
+
+        if len(self._key_actions) >= KEY_CACHE_SIZE:
+            self._key_actions.clear()
+        self._key_actions[key] = action
+        return action
+
+    def _replace_value(self, value: Any, depth: int) -> Any:
+        if depth > MAX_DEPTH:
+            return SECURE_VALUE
+
+        if isinstance(value, dict):
+            result = {}
+            for key, item in value.items():
+                action = self.get_key_action(str(key))
+                if action == "exclude":
+                    continue
+                if action == "secure":
+                    result[key] = SECURE_VALUE
+                else:
+                    result[key] = self._replace_value(item, depth + 1)
+            return result
+
+        if isinstance(value, list):
+            return [self._replace_value(item, depth + 1) for item in value]
+
+        return value
+
+    def _replace_string(self, body: str) -> str:
+        if "=" not in body:
+            return body
+
+        data = []
+        for field in body.split("&"):
+            key, _, _ = field.partition("=")
+            action = self.get_key_action(unquote_plus(key))
+            if action == "exclude":
+                continue
+            if action == "secure":
+                data.append(f"{key}={SECURE_VALUE}")
+            else:
+                data.append(field)
 
         return "&".join(data)
 
-    def _replace_dict(self, body: dict[str, Any]) -> dict[str, Any]:
-        body_copy = body.copy()
-        for key in body_copy.keys():
-            if any(pattern in key.lower() for pattern in self._exclude_patterns):
-                body.pop(key)
-            elif any(pattern in key.lower() for pattern in self._pii_patterns):
-                body[key] = "<SECURE>"
+    def _replace_raw_json(self, body: str) -> str:
+        def replace_pair(match: re.Match) -> str:
+            if self.get_key_action(match["key"]) is None:
+                return match[0]
+            return f'"{match["key"]}": "{SECURE_VALUE}"'
+
+        return JSON_PAIR_REGEX.sub(replace_pair, body)
 
-        return body
+    @staticmethod
+    def _compile(patterns: Iterable[str]) -> Optional[re.Pattern]:
+        patterns = [pattern for pattern in patterns if pattern]
+        if not patterns:
+            return None
+        return re.compile("|".join(map(re.escape, patterns)), re.IGNORECASE)
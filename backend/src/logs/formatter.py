@@ -1,12 +1,32 @@
 from datetime import datetime
-from json import dumps
+from json import JSONEncoder
 from logging import Formatter, LogRecord
 from traceback import format_exception
-from typing import Iterable
+from typing import Callable, Iterable, Literal, Optional
 
 from src.core.config import settings
+from src.logs.dedup import ExceptionDeduplicator, get_exception_fingerprint
 from src.logs.filters import PIIFilter
-from src.logs.schemas import BaseJSONLogSchema
+from src.tracing import get_current_span
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def get_json_encoder(name: Literal["json", "orjson"]) -> Callable[[dict], str]:
+    """
+    Функция сериализации лог-записи.
+    `json` - стандартный формат `json.dumps(..., ensure_ascii=False)`,
+    `orjson` - быстрее, но без пробелов после разделителей. Если orjson
+    не установлен, используется `json`
+    """
+
+    if name == "orjson" and orjson is not None:
+        return lambda log_dict: orjson.dumps(log_dict).decode()
+
+    return JSONEncoder(ensure_ascii=False).encode
 
 
 class JSONLogFormatter(Formatter):
@@ -15,18 +35,28 @@ class JSONLogFormatter(Formatter):
 
     :param pii_patterns: Паттерны ключей, значения которых необходимо заменить
     :param exclude_patterns: Паттерны ключей, значения которых не нужно хранить в лог-записях
+    :param json_encoder: Сериализатор JSON: `json` или `orjson`
+    :param exception_dedup_window: Окно дедупликации трассировок в секундах,
+        `0` - трассировка пишется в каждую запись
     """
 
     def __init__(
         self,
         exclude_patterns: Iterable[str],
         pii_patterns: Iterable[str],
+        json_encoder: Optional[Literal["json", "orjson"]] = None,
+        exception_dedup_window: Optional[float] = None,
         *args,
         **kwargs,
     ) -> None:
         super().__init__(*args, **kwargs)
 
         self.pii_filter = PIIFilter(pii_patterns, exclude_patterns)
+        self.encode = get_json_encoder(json_encoder or settings.LOG.JSON_ENCODER)
+        self.exception_dedup = ExceptionDeduplicator(exception_dedup_window)
+        self.app_name = settings.PROJECT_NAME
+        self.app_env = settings.ENV_STATE
+        self._timestamp_cache: tuple[int, str] = (-1, "")
 
     def format(self, record: LogRecord, *args, **kwargs) -> str:
         """
@@ -36,8 +66,10 @@ class JSONLogFormatter(Formatter):
         :return: Строка JSON формата
         """
 
+        # Повторы из истёкших окон дедупликации пишутся отдельной записью
+        self.exception_dedup.sweep(record.created)
         log_dict = self._format_log_record(record)
-        return dumps(log_dict, ensure_ascii=False)
+        return self.encode(log_dict)
 
     def _format_log_record(self, record: LogRecord) -> dict:
         """
@@ -47,31 +79,31 @@ class JSONLogFormatter(Formatter):
         :return: Словарь с полями записи
         """
 
-        now = (
-            datetime.fromtimestamp(record.created)
-            .astimezone()
-            .replace(microsecond=0)
-            .isoformat()
-        )
         duration = record.duration if hasattr(record, "duration") else record.msecs
 
-        json_log = BaseJSONLogSchema(
-            thread=record.process,
-            timestamp=now,
-            level=record.levelno,
-            level_name=record.levelname,
-            message=record.getMessage(),
-            source=record.name,
-            duration=duration,
-            app_name=settings.PROJECT_NAME,
-            app_env=settings.ENV_STATE,
-        )
+        # Поля и их порядок совпадают с BaseJSONLogSchema.model_dump(exclude_unset=True)
+        json_log_dict = {
+            "thread": record.process,
+            "level": record.levelno,
+            "level_name": record.levelname,
+            "message": record.getMessage(),
+            "source": record.name,
+            "timestamp": self.format_timestamp(record.created),
+            "duration": duration,
+            "app_name": self.app_name,
+            "app_env": self.app_env,
+        }
         if record.exc_info:
-            json_log.exceptions = format_exception(*record.exc_info)
+            self._format_exception(record, json_log_dict)
         elif record.exc_text:
-            json_log.exceptions = record.exc_text
+            json_log_dict["exceptions"] = record.exc_text
 
-        json_log_dict = json_log.model_dump(exclude_unset=True)
+        span = get_current_span()
+        if span is not None:
+            json_log_dict["trace_id"] = span.trace_id
+            json_log_dict["span_id"] = span.span_id
+            if span.parent_id:
+                json_log_dict["parent_id"] = span.parent_id
 
         if hasattr(record, "request_fields"):
             filtered_request_fields = self.pii_filter.replace(
@@ -84,3 +116,42 @@ class JSONLogFormatter(Formatter):
             )
 
         return json_log_dict
+
+    def _format_exception(self, record: LogRecord, json_log_dict: dict) -> None:
+        """
+        Добавляет трассировку исключения записи.
+        Повторы одного исключения в окне дедупликации записываются
+        без трассировки, только с отпечатком и номером появления
+
+        :param record: Запись лога с `exc_info`
+        :param json_log_dict: Словарь с полями записи
+        """
+
+        exception = record.exc_info[1]  # pyright: ignore [reportOptionalSubscript]
+        if exception is None or not self.exception_dedup.enabled:
+            json_log_dict["exceptions"] = format_exception(*record.exc_info)
+            return
+
+        fingerprint = get_exception_fingerprint(exception)
+        occurrence = self.exception_dedup.register(fingerprint, record.created)
+        if occurrence.first:
+            json_log_dict["exceptions"] = format_exception(*record.exc_info)
+        json_log_dict["exception_fingerprint"] = fingerprint
+        json_log_dict["exception_count"] = occurrence.count
+        if occurrence.suppressed:
+            json_log_dict["exception_suppressed"] = occurrence.suppressed
+
+    def format_timestamp(self, created: float) -> str:
+        """
+        Время записи в ISO формате с точностью до секунды.
+        Значение кешируется на текущую секунду
+
+        :param created: Время создания записи
+        """
+
+        second = int(created)
+        cached_second, timestamp = self._timestamp_cache
+        if cached_second != second:
+            timestamp = datetime.fromtimestamp(second).astimezone().isoformat()
+            self._timestamp_cache = (second, timestamp)
+        return timestamp
@@ -1,25 +1,99 @@
 from logging import Handler, LogRecord
+from sys import stderr
+from typing import Optional
 
 from src.core.config import settings
-from src.logs.tasks import save_log_to_storage
+from src.logs.storage import LogStorageABC
+from src.logs.storage.exceptions import LogStorageError
 from src.logs.types import LOG_KIND
+from src.utils.batching import BatchQueue
+from src.utils.loading import import_string
 
 
 class StorageHandler(Handler):
-    """Logger Handler записывающий логи в переданной хранилище"""
+    """
+    Logger Handler записывающий логи в переданное хранилище.
 
-    def __init__(self, with_celery: bool = True, *args, **kwargs) -> None:
+    Отформатированные записи кладутся в ограниченную очередь в памяти,
+    фоновый поток отправляет их в хранилище пачками по размеру или по времени.
+    Если очередь переполнена, запись отбрасывается и учитывается в `dropped`
+
+    :param storage_path: Путь к классу хранилища логов
+    :param queue_size: Максимальный размер очереди записей
+    :param batch_size: Максимальный размер пачки записей
+    :param flush_interval: Максимальное время ожидания пачки в секундах
+    """
+
+    def __init__(
+        self,
+        storage_path: Optional[str] = None,
+        queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        *args,
+        **kwargs,
+    ) -> None:
         super().__init__(*args, **kwargs)
-        self.with_celery = with_celery
+        self.storage_path = storage_path or settings.LOG.STORAGE_PATH
+        self.batch_queue: BatchQueue[tuple[LOG_KIND, str]] = BatchQueue(
+            self._write_batch,
+            queue_size=queue_size or settings.LOG.QUEUE_SIZE,
+            batch_size=batch_size or settings.LOG.BATCH_SIZE,
+            flush_interval=flush_interval or settings.LOG.FLUSH_INTERVAL,
+            name="log-storage-handler",
+            on_start=self._reset_storage,
+        )
+        self._reported_dropped = 0
+        self._storage: Optional[LogStorageABC] = None
+
+    @property
+    def dropped(self) -> int:
+        return self.batch_queue.dropped
 
     def emit(self, record: LogRecord) -> None:
-        formatted_record = self.formatter.format(record)  # type: ignore
-        kind = get_record_kind(record)
+        try:
+            formatted_record = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        self.batch_queue.put((get_record_kind(record), formatted_record))
+
+    def flush(self) -> None:
+        """Синхронно отправляет в хранилище все записи из очереди"""
+        self.batch_queue.flush()
+
+    def close(self) -> None:
+        self.batch_queue.stop()
+        super().close()
+
+    @property
+    def storage(self) -> LogStorageABC:
+        if self._storage is None:
+            self._storage = import_string(self.storage_path)()
+        return self._storage
+
+    def _reset_storage(self) -> None:
+        """Соединение с хранилищем создаётся заново в каждом процессе"""
+        self._storage = None
+
+    def _write_batch(self, batch: list[tuple[LOG_KIND, str]]) -> None:
+        try:
+            self.storage.append_many(batch)
+        except LogStorageError as e:
+            self.batch_queue.add_dropped(len(batch))
+            stderr.write(f"{e.reason}: отброшено {len(batch)} лог-записей\n")
+        except Exception as e:
+            # Поток не должен завершиться из-за ошибки хранилища, иначе очередь
+            # заполнится и все следующие записи будут молча отброшены
+            self.batch_queue.add_dropped(len(batch))
+            stderr.write(
+                f"Ошибка хранилища логов: {e!r}, отброшено {len(batch)} лог-записей\n"
+            )
 
-        if self.with_celery:
-            save_log_to_storage.delay(kind, formatted_record, settings.LOG.STORAGE_PATH)  # type: ignore
-        else:
-            save_log_to_storage(kind, formatted_record)
+        if self.dropped != self._reported_dropped:
+            stderr.write(f"Всего отброшено лог-записей: {self.dropped}\n")
+            self._reported_dropped = self.dropped
 
 
 def get_record_kind(record: LogRecord) -> LOG_KIND:
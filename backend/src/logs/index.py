@@ -0,0 +1,292 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from itertools import accumulate
+from json import JSONDecodeError, dumps, loads
+from mmap import ACCESS_READ, mmap
+from os import fsync, replace, utime
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from src.core.config import settings
+from src.logs.compression import (
+    COMPRESSION,
+    COMPRESSION_SUFFIXES,
+    compress_bytes,
+    decompress_bytes,
+    get_compression,
+)
+from src.logs.segments import get_index_file
+
+INDEX_VERSION = 1
+
+
+class IndexBlock(NamedTuple):
+    """
+    Блок сегмента логов в разреженном индексе
+
+    :param offset: Смещение блока в несжатом сегменте
+    :param stored_offset: Смещение блока в файле сегмента на диске
+    :param stored_size: Размер блока в файле сегмента на диске
+    :param min_time: Минимальное время записи в блоке (unix time)
+    :param max_time: Максимальное время записи в блоке (unix time)
+    :param max_level: Максимальный уровень записи в блоке
+    :param count: Количество записей в блоке
+    """
+
+    offset: int
+    stored_offset: int
+    stored_size: int
+    min_time: float
+    max_time: float
+    max_level: int
+    count: int
+
+
+class SegmentIndex:
+    """
+    Разреженный индекс NDJSON сегмента: время и уровень записей блока -> смещение блока.
+
+    Записи в сегменте упорядочены по времени лишь примерно, поэтому поиск идёт
+    по префиксному максимуму `max_time` и суффиксному минимуму `min_time` блоков:
+    обе последовательности монотонны, и бинарный поиск по ним не пропускает записи
+
+    :param segment: Путь к файлу сегмента
+    :param compression: Алгоритм сжатия, каждый блок сжат отдельным фреймом
+    :param blocks: Блоки сегмента по порядку
+    """
+
+    def __init__(
+        self,
+        segment: Path,
+        compression: Optional[COMPRESSION],
+        blocks: list[IndexBlock],
+    ) -> None:
+        self.segment = segment
+        self.compression = compression
+        self.blocks = blocks
+        self._max_times = list(accumulate((b.max_time for b in blocks), max))
+        self._min_times = list(
+            accumulate((b.min_time for b in reversed(blocks)), min)
+        )[::-1]
+
+    @property
+    def min_time(self) -> float:
+        return self._min_times[0] if self.blocks else float("inf")
+
+    @property
+    def max_time(self) -> float:
+        return self._max_times[-1] if self.blocks else float("-inf")
+
+    @classmethod
+    def load(cls, segment: Path) -> Optional["SegmentIndex"]:
+        """Загружает индекс сегмента, если он есть"""
+
+        try:
+            data = loads(get_index_file(segment).read_text())
+        except (FileNotFoundError, JSONDecodeError):
+            return None
+
+        # Сегмент мог быть сжат после того, как его нашли, тогда индекс ему не подходит
+        if data.get("version") != INDEX_VERSION or data.get(
+            "compression"
+        ) != get_compression(segment):
+            return None
+
+        blocks = [IndexBlock(*block) for block in data["blocks"]]
+        return cls(segment, data["compression"], blocks)
+
+    def save(self) -> None:
+        """Атомарно сохраняет индекс рядом с сегментом"""
+
+        index_file = get_index_file(self.segment)
+        tmp_file = index_file.with_name(index_file.name + ".tmp")
+        data = {
+            "version": INDEX_VERSION,
+            "compression": self.compression,
+            "blocks": self.blocks,
+        }
+        with open(tmp_file, "w") as f:
+            f.write(dumps(data))
+            f.flush()
+            fsync(f.fileno())
+        replace(tmp_file, index_file)
+
+    def find_blocks(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        min_level: int = 0,
+    ) -> list[IndexBlock]:
+        """
+        Блоки, в которых могут быть записи из окна времени с уровнем не ниже `min_level`
+
+        :param since: Начало окна (unix time)
+        :param until: Конец окна (unix time)
+        :param min_level: Минимальный уровень записи
+        """
+
+        start = 0 if since is None else bisect_left(self._max_times, since)
+        end = len(self.blocks) if until is None else bisect_right(self._min_times, until)
+        return [
+            block for block in self.blocks[start:end] if block.max_level >= min_level
+        ]
+
+    def read_block(self, data: mmap, block: IndexBlock) -> bytes:
+        """Читает и при необходимости распаковывает блок из отображённого сегмента"""
+
+        stored = data[block.stored_offset : block.stored_offset + block.stored_size]
+        if self.compression is None:
+            return stored
+        return decompress_bytes(stored, self.compression)
+
+
+class RecordMeta:
+    """Разбор времени и уровня NDJSON записей с кешем разобранных меток времени"""
+
+    def __init__(self) -> None:
+        self._timestamps: dict[str, float] = {}
+
+    def parse(self, line: bytes) -> tuple[Optional[float], int]:
+        try:
+            record = loads(line)
+        except (JSONDecodeError, UnicodeDecodeError):
+            return None, 0
+        if not isinstance(record, dict):
+            return None, 0
+        level = record.get("level")
+        if not isinstance(level, int):
+            level = 0
+        return self.parse_timestamp(record.get("timestamp")), level
+
+    def parse_timestamp(self, timestamp) -> Optional[float]:
+        if not isinstance(timestamp, str):
+            return None
+
+        try:
+            return self._timestamps[timestamp]
+        except KeyError:
+            pass
+
+        try:
+            value = datetime.fromisoformat(timestamp).timestamp()
+        except ValueError:
+            return None
+
+        if len(self._timestamps) > 100_000:
+            self._timestamps.clear()
+        self._timestamps[timestamp] = value
+        return value
+
+
+def iter_lines(data: bytes) -> Iterator[tuple[int, bytes]]:
+    """Строки буфера вместе со смещением их начала"""
+
+    end = len(data)
+    position = 0
+    while position < end:
+        line_end = data.find(b"\n", position, end)
+        if line_end == -1:
+            line_end = end
+        yield position, data[position:line_end]
+        position = line_end + 1
+
+
+def build_segment_index(
+    segment: Path,
+    compression: Optional[COMPRESSION] = None,
+    block_size: Optional[int] = None,
+) -> SegmentIndex:
+    """
+    Строит разреженный индекс несжатого NDJSON сегмента.
+    Блоки заканчиваются на границе строки, как только набрали `block_size` байт.
+    Если передан `compression`, сегмент заменяется сжатым: каждый блок - отдельный
+    фрейм, поэтому при чтении распаковываются только нужные блоки
+
+    :param segment: Путь к несжатому сегменту
+    :param compression: Алгоритм сжатия
+    :param block_size: Размер блока в байтах
+    :return: Сохранённый индекс
+    """
+
+    block_size = block_size or settings.LOG.INDEX_BLOCK_SIZE
+    meta = RecordMeta()
+    stat = segment.stat()
+    raw_blocks: list[IndexBlock] = []
+
+    with open(segment, "rb") as f:
+        data = mmap(f.fileno(), 0, access=ACCESS_READ) if stat.st_size else b""
+        try:
+            block_start = 0
+            min_time, max_time, max_level, count = float("inf"), 0.0, 0, 0
+
+            for position, line in iter_lines(data):
+                created, level = meta.parse(line)
+                if created is not None:
+                    min_time = min(min_time, created)
+                    max_time = max(max_time, created)
+                max_level = max(max_level, level)
+                count += 1
+
+                block_end = position + len(line) + 1
+                if block_end - block_start >= block_size or block_end >= len(data):
+                    block_end = min(block_end, len(data))
+                    # Блок без меток времени не должен отсекаться при поиске
+                    if min_time > max_time:
+                        min_time, max_time = 0.0, float("inf")
+                    raw_blocks.append(
+                        IndexBlock(
+                            block_start,
+                            block_start,
+                            block_end - block_start,
+                            min_time,
+                            max_time,
+                            max_level,
+                            count,
+                        )
+                    )
+                    block_start = block_end
+                    min_time, max_time, max_level, count = float("inf"), 0.0, 0, 0
+
+            if compression is None:
+                index = SegmentIndex(segment, None, raw_blocks)
+            else:
+                index = _compress_segment(segment, data, raw_blocks, compression)
+        finally:
+            if isinstance(data, mmap):
+                data.close()
+
+    index.save()
+    if compression is not None:
+        utime(index.segment, (stat.st_atime, stat.st_mtime))
+        segment.unlink()
+    return index
+
+
+def _compress_segment(
+    segment: Path,
+    data: bytes,
+    raw_blocks: list[IndexBlock],
+    compression: COMPRESSION,
+) -> SegmentIndex:
+    """Записывает сжатую копию сегмента по блокам, исходный сегмент не удаляется"""
+
+    destination = segment.with_name(segment.name + COMPRESSION_SUFFIXES[compression])
+    tmp_destination = destination.with_name(destination.name + ".tmp")
+    blocks: list[IndexBlock] = []
+    stored_offset = 0
+
+    with open(tmp_destination, "wb") as f:
+        for block in raw_blocks:
+            frame = compress_bytes(
+                data[block.offset : block.offset + block.stored_size], compression
+            )
+            f.write(frame)
+            blocks.append(
+                block._replace(stored_offset=stored_offset, stored_size=len(frame))
+            )
+            stored_offset += len(frame)
+        f.flush()
+        fsync(f.fileno())
+
+    replace(tmp_destination, destination)
+    return SegmentIndex(destination, compression, blocks)
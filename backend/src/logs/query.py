@@ -0,0 +1,205 @@
+from argparse import ArgumentParser
+from datetime import datetime
+from json import JSONDecodeError, dumps, loads
+from logging import getLevelName
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+from sys import stdout
+from typing import Any, Iterable, Iterator, Optional, get_args
+
+from src.core.config import settings
+from src.logs.compression import get_compression, open_decompressed
+from src.logs.index import RecordMeta, SegmentIndex, iter_lines
+from src.logs.segments import get_segments
+from src.logs.types import LOG_KIND
+
+
+class LogQuery:
+    """
+    Условия поиска лог-записей
+
+    :param since: Начало окна времени
+    :param until: Конец окна времени
+    :param min_level: Минимальный уровень записи
+    :param contains: Подстрока, которая должна быть в записи
+    :param fields: Значения полей записи, например `{"request_path": "/api/auth"}`
+    """
+
+    def __init__(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        min_level: int = 0,
+        contains: Optional[str] = None,
+        fields: Optional[dict[str, Any]] = None,
+    ) -> None:
+        self.since = since.timestamp() if since else None
+        self.until = until.timestamp() if until else None
+        self.min_level = min_level
+        self.contains = contains.encode() if contains else None
+        self.fields = fields or {}
+        self._meta = RecordMeta()
+
+    def match(self, line: bytes) -> Optional[dict]:
+        """Запись, если строка подходит под условия, иначе None"""
+
+        # Дешёвая проверка подстроки до разбора JSON
+        if self.contains and self.contains not in line:
+            return None
+
+        try:
+            record = loads(line)
+        except (JSONDecodeError, UnicodeDecodeError):
+            return None
+        if not isinstance(record, dict):
+            return None
+
+        level = record.get("level")
+        if self.min_level and (not isinstance(level, int) or level < self.min_level):
+            return None
+
+        if self.since is not None or self.until is not None:
+            created = self._meta.parse_timestamp(record.get("timestamp"))
+            if created is None:
+                return None
+            if self.since is not None and created < self.since:
+                return None
+            if self.until is not None and created > self.until:
+                return None
+
+        for key, value in self.fields.items():
+            if str(record.get(key)) != str(value):
+                return None
+
+        return record
+
+    def match_lines(self, data: bytes) -> Iterator[dict]:
+        for _, line in iter_lines(data):
+            record = self.match(line)
+            if record is not None:
+                yield record
+
+
+def query_logs(
+    kind: LOG_KIND, query: LogQuery, directory: Optional[Path] = None
+) -> Iterator[dict]:
+    """
+    Ищет лог-записи в ротированных сегментах и текущем файле, от старых к новым.
+    Для сегментов с индексом читаются только блоки, подходящие по времени и уровню,
+    сегменты и текущий файл отображаются в память через mmap
+
+    :param kind: Тип логов
+    :param query: Условия поиска
+    :param directory: Директория логов
+    :return: Генератор подходящих записей
+    """
+
+    file = (directory or settings.LOG.DIR) / kind / f"{kind}.ndjson"
+
+    for segment in reversed(get_segments(file)):
+        index = SegmentIndex.load(segment)
+        if index is None:
+            yield from _scan_file(segment, query)
+            continue
+
+        if query.since is not None and index.max_time < query.since:
+            continue
+        if query.until is not None and index.min_time > query.until:
+            continue
+        yield from _scan_indexed(index, query)
+
+    if file.exists():
+        yield from _scan_file(file, query)
+
+
+def _scan_indexed(index: SegmentIndex, query: LogQuery) -> Iterator[dict]:
+    blocks = index.find_blocks(query.since, query.until, query.min_level)
+    if not blocks:
+        return
+
+    with open(index.segment, "rb") as f, mmap(f.fileno(), 0, access=ACCESS_READ) as data:
+        for block in blocks:
+            yield from query.match_lines(index.read_block(data, block))
+
+
+def _scan_file(file: Path, query: LogQuery) -> Iterator[dict]:
+    """Полный просмотр файла без индекса"""
+
+    compression = get_compression(file)
+    if compression is not None:
+        with open_decompressed(file, compression) as f:
+            for line in f:
+                record = query.match(line.rstrip(b"\n"))
+                if record is not None:
+                    yield record
+        return
+
+    if not file.stat().st_size:
+        return
+
+    with open(file, "rb") as f, mmap(f.fileno(), 0, access=ACCESS_READ) as data:
+        yield from query.match_lines(data)  # type: ignore[arg-type]
+
+
+def parse_level(value: str) -> int:
+    """Уровень логов числом или названием"""
+
+    if value.isdigit():
+        return int(value)
+
+    level = getLevelName(value.upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Неизвестный уровень логов: {value}")
+    return level
+
+
+def parse_field(value: str) -> tuple[str, str]:
+    key, separator, field_value = value.partition("=")
+    if not separator:
+        raise ValueError(f"Ожидается key=value: {value}")
+    return key, field_value
+
+
+def print_records(records: Iterable[dict], limit: Optional[int] = None) -> int:
+    count = 0
+    for record in records:
+        if limit is not None and count >= limit:
+            break
+        stdout.write(dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def main() -> None:
+    """
+    Поиск по записанным логам: выводит подходящие записи в формате NDJSON.
+
+    Пример: `python -m src.logs.query access --since 2024-10-01T10:00
+    --until 2024-10-01T11:00 --level WARNING --field request_path=/api/auth/login`
+    """
+
+    parser = ArgumentParser(description="Поиск по файлам логов")
+    parser.add_argument("kind", choices=get_args(LOG_KIND))
+    parser.add_argument("--since", type=datetime.fromisoformat, help="ISO время")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="ISO время")
+    parser.add_argument("--level", type=parse_level, default=0, help="DEBUG..CRITICAL")
+    parser.add_argument("--contains", help="Подстрока в записи")
+    parser.add_argument(
+        "--field", type=parse_field, action="append", default=[], help="key=value"
+    )
+    parser.add_argument("--limit", type=int, help="Максимум записей")
+    parser.add_argument("--dir", type=Path, help="Директория логов")
+    args = parser.parse_args()
+
+    query = LogQuery(
+        since=args.since,
+        until=args.until,
+        min_level=args.level,
+        contains=args.contains,
+        fields=dict(args.field),
+    )
+    print_records(query_logs(args.kind, query, args.dir), args.limit)
+
+
+if __name__ == "__main__":
+    main()
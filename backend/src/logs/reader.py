@@ -2,9 +2,11 @@ from typing import Union, get_args
 
 from celery.utils.log import get_logger
 
+from src.logs.checkpoint import Checkpoint, CheckpointStore, get_chunk_digest
 from src.logs.storage import LogStorageABC
 from src.logs.storage.exceptions import LogStorageError
 from src.logs.types import LOG_KIND
+from src.logs.writer import LogWriterABC
 from src.utils.loading import import_string
 
 logger = get_logger(__name__)
@@ -29,3 +31,52 @@ def read_logs_from_storage(
             logs[kind] = kind_logs
 
     return logs
+
+
+def drain_logs_from_storage(
+    storage: LogStorageABC,
+    log_writer: LogWriterABC,
+    kind: LOG_KIND,
+    chunk_size: int,
+    checkpoints: CheckpointStore,
+) -> int:
+    """
+    Переносит лог-записи одного типа из хранилища в writer порциями.
+
+    Перед записью порции сохраняется контрольная точка с её хешем и позицией в файле,
+    после записи порция подтверждается в хранилище. Если процесс упал до подтверждения,
+    при следующем запуске та же порция читается снова, запись откатывается
+    до сохранённой позиции и повторяется, поэтому записи не теряются и не дублируются.
+    За время простоя в хранилище могут прийти новые записи, поэтому после падения
+    сначала читается ровно столько записей, сколько было в незавершённой порции.
+    Вызывается под блокировкой `CheckpointStore.lock` для `kind`
+
+    :raises LogStorageError: Ошибка хранилища логов
+    :return: Количество записанных лог-записей
+    """
+
+    write_count = 0
+    checkpoint = checkpoints.load(kind)
+    while True:
+        count = checkpoint.count if checkpoint and checkpoint.count else chunk_size
+        chunk = storage.read_chunk(kind, count)
+        if not chunk.values:
+            break
+
+        digest = get_chunk_digest(chunk.values)
+        if checkpoint and checkpoint.digest == digest and checkpoint.position:
+            log_writer.restore(checkpoint.position)
+        checkpoint = None
+
+        position = log_writer.prepare(kind, chunk.values)
+        checkpoints.save(kind, Checkpoint(digest, position, len(chunk.values)))
+        write_count += log_writer.write(kind, chunk.values)
+        if not storage.commit_chunk(kind, chunk):
+            logger.warning("Порция логов %s уже удалена из хранилища", kind)
+        checkpoints.delete(kind)
+
+        # Остаток, пришедший во время выгрузки, заберёт следующий запуск
+        if len(chunk.values) < count:
+            break
+
+    return write_count
@@ -0,0 +1,65 @@
+from random import random
+from typing import Callable, Mapping, Optional
+
+from src.core.config import settings
+
+
+class AccessLogSampler:
+    """
+    Политика tail-сэмплирования access логов.
+    Решение принимается после завершения ответа: ошибки и медленные запросы
+    сохраняются всегда, остальные - с вероятностью, заданной для маршрута
+
+    :param default_rate: Доля сохраняемых запросов для маршрутов без своей настройки
+    :param route_rates: Доля сохраняемых запросов по шаблону маршрута (`/user/profile/me`)
+    :param slow_threshold: Порог длительности запроса в мс, после которого он сохраняется всегда
+    :param error_status_code: Минимальный код ответа, который считается ошибкой
+    """
+
+    def __init__(
+        self,
+        default_rate: Optional[float] = None,
+        route_rates: Optional[Mapping[str, float]] = None,
+        slow_threshold: Optional[int] = None,
+        error_status_code: int = 500,
+        random_func: Callable[[], float] = random,
+    ) -> None:
+        self.default_rate = (
+            settings.LOG.ACCESS_SAMPLE_RATE if default_rate is None else default_rate
+        )
+        if route_rates is None:
+            route_rates = settings.LOG.ACCESS_ROUTE_SAMPLE_RATES
+        self.route_rates = dict(route_rates)
+        self.slow_threshold = (
+            settings.LOG.ACCESS_SLOW_THRESHOLD
+            if slow_threshold is None
+            else slow_threshold
+        )
+        self.error_status_code = error_status_code
+        self._random = random_func
+
+    def should_keep(
+        self,
+        route: str,
+        status_code: int,
+        duration: int,
+        exception: Optional[BaseException] = None,
+    ) -> bool:
+        """
+        Нужно ли сохранить лог запроса
+
+        :param route: Шаблон маршрута или путь запроса, если маршрут не найден
+        :param status_code: Код ответа
+        :param duration: Длительность запроса в мс
+        :param exception: Исключение, возникшее при обработке запроса
+        """
+
+        if exception is not None or status_code >= self.error_status_code:
+            return True
+        if duration >= self.slow_threshold:
+            return True
+
+        rate = self.route_rates.get(route, self.default_rate)
+        if rate <= 0:
+            return False
+        return rate >= 1 or self._random() < rate
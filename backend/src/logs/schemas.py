@@ -16,6 +16,9 @@ class BaseJSONLogSchema(BaseModel):
     app_name: str
     app_env: Optional[str] = None
     exceptions: Optional[Union[list[str], str]] = None
+    exception_fingerprint: Optional[str] = None
+    exception_count: Optional[int] = None
+    exception_suppressed: Optional[int] = None
     trace_id: Optional[str] = None
     span_id: Optional[str] = None
     parent_id: Optional[str] = None
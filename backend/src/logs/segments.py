@@ -0,0 +1,60 @@
+from datetime import datetime
+from pathlib import Path
+from re import escape
+from re import compile as compile_regex
+
+from src.logs.compression import COMPRESSION_SUFFIXES
+
+SEGMENT_TIME_FORMAT = "%Y%m%dT%H%M%S"
+SEGMENT_NAME_PATTERN = r"(?P<timestamp>\d{8}T\d{6})(-(?P<number>\d+))?"
+INDEX_SUFFIX = ".idx"
+
+
+def get_segment_file(file: Path) -> Path:
+    """Путь для ротированного сегмента файла, помеченного временем ротации"""
+
+    timestamp = datetime.now().strftime(SEGMENT_TIME_FORMAT)
+    segment = file.with_name(f"{file.stem}.{timestamp}{file.suffix}")
+    counter = 1
+    while segment.exists() or _compressed_exists(segment):
+        segment = file.with_name(f"{file.stem}.{timestamp}-{counter}{file.suffix}")
+        counter += 1
+    return segment
+
+
+def get_segments(file: Path) -> list[Path]:
+    """Ротированные сегменты файла, сжатые и нет, от новых к старым"""
+
+    if not file.parent.exists():
+        return []
+
+    pattern = compile_regex(
+        rf"^{escape(file.stem)}\.{SEGMENT_NAME_PATTERN}{escape(file.suffix)}"
+        rf"({'|'.join(escape(s) for s in COMPRESSION_SUFFIXES.values())})?$"
+    )
+    segments = []
+    for segment in file.parent.iterdir():
+        match = pattern.match(segment.name)
+        if match:
+            # Номер `-N` получают сегменты той же секунды, они новее сегмента без номера
+            order = (match["timestamp"], int(match["number"] or 0))
+            segments.append((order, segment))
+
+    segments.sort(key=lambda item: item[0], reverse=True)
+    return [segment for _, segment in segments]
+
+
+def get_index_file(segment: Path) -> Path:
+    """Путь к индексу сегмента, общий для сжатого и несжатого сегмента"""
+
+    name = segment.name
+    for suffix in COMPRESSION_SUFFIXES.values():
+        name = name.removesuffix(suffix)
+    return segment.with_name(name + INDEX_SUFFIX)
+
+
+def _compressed_exists(file: Path) -> bool:
+    return any(
+        file.with_name(file.name + suffix).exists()
+        for suffix in COMPRESSION_SUFFIXES.values()
+    )
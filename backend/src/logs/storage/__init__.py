@@ -1,5 +1,12 @@
-from .base import LogStorageABC
+from .base import LogChunk, LogStorageABC
 from .redis import RedisStorage
+from .stream import StreamLogStorage
 from .locmem_storage import LocMemLogStorage
 
-__all__ = ["LogStorageABC", "RedisStorage", "LocMemLogStorage"]
+__all__ = [
+    "LogChunk",
+    "LogStorageABC",
+    "RedisStorage",
+    "StreamLogStorage",
+    "LocMemLogStorage",
+]
@@ -1,8 +1,21 @@
 from abc import ABC, abstractmethod
+from typing import Any, Iterable, NamedTuple
 
 from src.logs.types import LOG_KIND
 
 
+class LogChunk(NamedTuple):
+    """
+    Порция лог-записей, прочитанная из хранилища
+
+    :param values: Значения записей в порядке добавления
+    :param ids: Идентификаторы записей, если хранилище их поддерживает
+    """
+
+    values: list[bytes]
+    ids: tuple = ()
+
+
 class LogStorageABC(ABC):
     """Абстрактный класс для хранилища логов"""
 
@@ -16,6 +29,20 @@ class LogStorageABC(ABC):
         """
         raise NotImplementedError
 
+    def append_many(self, records: Iterable[tuple[LOG_KIND, Any]]) -> int:
+        """
+        Добавить несколько значений в хранилище логов
+
+        :param records: Пары из типа лога и значения
+        :raises LogStorageError: Ошибка хранилища логов
+        :return: Количество добавленных записей
+        """
+        count = 0
+        for kind, value in records:
+            self.append(kind, value)
+            count += 1
+        return count
+
     @abstractmethod
     def get(self, kind: LOG_KIND) -> list[bytes]:
         """
@@ -26,6 +53,32 @@ class LogStorageABC(ABC):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def read_chunk(self, kind: LOG_KIND, count: int) -> LogChunk:
+        """
+        Прочитать порцию самых старых записей, не удаляя их из хранилища.
+        Пока порция не подтверждена через `commit_chunk`,
+        повторное чтение возвращает те же записи
+
+        :param kind: Тип логов
+        :param count: Максимальное количество записей
+        :raises LogStorageError: Ошибка хранилища логов
+        :return: Порция записей, пустая - если записей нет
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def commit_chunk(self, kind: LOG_KIND, chunk: LogChunk) -> int:
+        """
+        Подтвердить обработку порции и удалить её записи из хранилища
+
+        :param kind: Тип логов
+        :param chunk: Порция, полученная из `read_chunk`
+        :raises LogStorageError: Ошибка хранилища логов
+        :return: Количество удалённых записей
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def clear(self) -> int:
         """
@@ -1,10 +1,25 @@
-import json
+from collections import deque
+from itertools import count as count_from
+from itertools import islice
+from threading import Lock
+from typing import Any, Iterable, Optional, get_args
 
-from src.logs.storage import LogStorageABC
+from src.core.config import settings
+from src.logs.storage.base import LogChunk, LogStorageABC
 from src.logs.types import LOG_KIND
 
 
 class LocMemLogStorage(LogStorageABC):
+    """
+    Хранение логов в памяти процесса.
+
+    Для каждого типа логов - кольцевой буфер `deque(maxlen)`: при переполнении
+    вытесняются самые старые записи, поэтому память ограничена.
+    Каждой записи присваивается порядковый номер, по нему подтверждаются порции
+
+    :param max_len: Максимальное количество записей каждого типа
+    """
+
     _instance = None
 
     def __new__(cls, *args, **kwargs):
@@ -13,33 +28,68 @@ class LocMemLogStorage(LogStorageABC):
             cls._instance.__initialized = False
         return cls._instance
 
-    def __init__(self):
+    def __init__(self, max_len: Optional[int] = None):
         if self.__initialized:
             return
         self.__initialized = True
-        self.storage = []
+        self.max_len = max_len or settings.LOG.LOCMEM_MAX_LEN
+        self.storage: dict[str, deque[tuple[int, bytes]]] = {
+            kind: deque(maxlen=self.max_len) for kind in get_args(LOG_KIND)
+        }
         self.name = "logs"
+        self._counter = count_from()
+        self._lock = Lock()
 
     def append(self, kind: LOG_KIND, value) -> int:
-        initial_size = len(self.storage)
-        log_name = f"{kind}_{self.name}"
-        log_dict = {log_name: value}
-        log_json = json.dumps(log_dict)
-        self.storage.append(log_json.encode("utf-8"))
-        return initial_size + 1
+        with self._lock:
+            buffer = self.storage[kind]
+            buffer.append((next(self._counter), self._to_bytes(value)))
+            return len(buffer)
+
+    def append_many(self, records: Iterable[tuple[LOG_KIND, Any]]) -> int:
+        appended = 0
+        with self._lock:
+            for kind, value in records:
+                value = self._to_bytes(value)
+                self.storage[kind].append((next(self._counter), value))
+                appended += 1
+        return appended
 
     def get(self, kind: LOG_KIND) -> list[bytes]:
-        filter_data = []
-        encode_kind = kind.encode("utf-8")
-        for item in self.storage:
-            if encode_kind in item:
-                key = json.loads(item)
-                key_data = key[f"{kind}_logs"]
-                json_data = json.dumps(key_data)
-                filter_data.append(json_data.encode("utf-8"))
-        return filter_data
+        with self._lock:
+            return [value for _, value in self.storage[kind]]
+
+    def read_chunk(self, kind: LOG_KIND, count: int) -> LogChunk:
+        with self._lock:
+            entries = list(islice(self.storage[kind], count))
+        return LogChunk(
+            [value for _, value in entries],
+            tuple(number for number, _ in entries),
+        )
+
+    def commit_chunk(self, kind: LOG_KIND, chunk: LogChunk) -> int:
+        if not chunk.ids:
+            return 0
+
+        # Пока порция записывалась, часть её могла быть вытеснена новыми записями
+        last_number = chunk.ids[-1]
+        removed = 0
+        with self._lock:
+            buffer = self.storage[kind]
+            while buffer and buffer[0][0] <= last_number:
+                buffer.popleft()
+                removed += 1
+        return removed
 
     def clear(self) -> int:
-        initial_size = len(self.storage)
-        self.storage.clear()
-        return initial_size
+        with self._lock:
+            removed = sum(len(buffer) for buffer in self.storage.values())
+            for buffer in self.storage.values():
+                buffer.clear()
+        return removed
+
+    @staticmethod
+    def _to_bytes(value) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode("utf-8")
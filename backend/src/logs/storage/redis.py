@@ -1,13 +1,39 @@
+from hashlib import sha1
+from typing import Any, Iterable
+
 from redis import Redis, RedisError
 
 from src.core.config import settings
-from src.logs.storage import LogStorageABC
+from src.logs.storage.base import LogChunk, LogStorageABC
 from src.logs.storage.exceptions import LogStorageError
 from src.logs.types import LOG_KIND
 
+# Удаляет порцию, только если голова списка всё ещё совпадает с ней по хешу,
+# иначе порцию уже подтвердил другой процесс, и LTRIM удалил бы чужие записи
+COMMIT_CHUNK_SCRIPT = """
+local count = tonumber(ARGV[1])
+local values = redis.call("LRANGE", KEYS[1], 0, count - 1)
+if #values ~= count then
+    return 0
+end
+local parts = {}
+for i, value in ipairs(values) do
+    parts[i] = #value .. ":" .. value
+end
+if redis.sha1hex(table.concat(parts)) ~= ARGV[2] then
+    return 0
+end
+redis.call("LTRIM", KEYS[1], count, -1)
+return count
+"""
+
 
 class RedisStorage(LogStorageABC):
-    """Реализация хранения логов в Redis"""
+    """
+    Реализация хранения логов в Redis.
+    Порция читается с головы списка и удаляется Lua скриптом, только если голова
+    не изменилась, поэтому параллельная выгрузка не удалит незаписанные записи
+    """
 
     def __init__(self) -> None:
         db_num = 3 if settings.REDIS.LOG_DB is None else settings.REDIS.LOG_DB
@@ -17,6 +43,7 @@ class RedisStorage(LogStorageABC):
             db=db_num,
         )
         self.name = "logs"
+        self._commit_chunk = self.redis.register_script(COMMIT_CHUNK_SCRIPT)
 
     def append(self, kind: LOG_KIND, value) -> int:
         try:
@@ -24,12 +51,55 @@ class RedisStorage(LogStorageABC):
         except RedisError:
             raise LogStorageError
 
+    def append_many(self, records: Iterable[tuple[LOG_KIND, Any]]) -> int:
+        values_by_key: dict[str, list] = {}
+        for kind, value in records:
+            values_by_key.setdefault(f"{kind}_{self.name}", []).append(value)
+
+        if not values_by_key:
+            return 0
+
+        pipeline = self.redis.pipeline(transaction=False)
+        for key, values in values_by_key.items():
+            pipeline.rpush(key, *values)
+
+        try:
+            pipeline.execute()
+        except RedisError:
+            raise LogStorageError
+
+        return sum(len(values) for values in values_by_key.values())
+
     def get(self, kind: LOG_KIND) -> list[bytes]:
         try:
             return self.redis.lrange(f"{kind}_{self.name}", 0, -1)  # type: ignore[union-attr]
         except RedisError:
             raise LogStorageError
 
+    def read_chunk(self, kind: LOG_KIND, count: int) -> LogChunk:
+        # LRANGE вместо LPOP count: записи удаляются только после commit_chunk,
+        # поэтому падение между чтением и записью в файл не теряет логи
+        try:
+            values = self.redis.lrange(f"{kind}_{self.name}", 0, count - 1)
+        except RedisError:
+            raise LogStorageError
+        return LogChunk(values)  # type: ignore[arg-type]
+
+    def commit_chunk(self, kind: LOG_KIND, chunk: LogChunk) -> int:
+        count = len(chunk.values)
+        if not count:
+            return 0
+
+        digest = sha1(usedforsecurity=False)
+        for value in chunk.values:
+            digest.update(b"%d:%s" % (len(value), value))
+        try:
+            return self._commit_chunk(
+                keys=[f"{kind}_{self.name}"], args=[count, digest.hexdigest()]
+            )
+        except RedisError:
+            raise LogStorageError
+
     def clear(self) -> int:
         keys = self._get_keys()
         try:
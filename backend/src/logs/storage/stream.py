@@ -0,0 +1,228 @@
+from os import getpid
+from socket import gethostname
+from typing import Any, Iterable, Optional, Union, get_args
+
+from redis import RedisError, ResponseError
+
+from src.core.config import settings
+from src.logs.storage.base import LogChunk
+from src.logs.storage.exceptions import LogStorageError
+from src.logs.storage.redis import RedisStorage
+from src.logs.types import LOG_KIND
+
+StreamEntry = tuple[bytes, bytes]
+
+
+class StreamLogStorage(RedisStorage):
+    """
+    Реализация хранения логов в Redis Streams.
+
+    Запись - `XADD` с приблизительным ограничением длины потока (`MAXLEN ~`).
+    Чтение - `XREADGROUP` группой потребителей порциями ограниченного размера,
+    запись удаляется из списка ожидающих только после `XACK`, поэтому доставка
+    происходит хотя бы один раз, а несколько процессов делят поток между собой
+
+    :param group: Название группы потребителей
+    :param consumer: Имя потребителя, по умолчанию `LOG.STREAM_CONSUMER` или hostname и pid
+    :param max_len: Приблизительная максимальная длина потока
+    :param claim_idle: Через сколько секунд неподтверждённые записи забирает другой потребитель
+    """
+
+    value_field = b"v"
+
+    def __init__(
+        self,
+        group: Optional[str] = None,
+        consumer: Optional[str] = None,
+        max_len: Optional[int] = None,
+        claim_idle: Optional[int] = None,
+    ) -> None:
+        super().__init__()
+        self.name = "logs_stream"
+        self.group = group or settings.LOG.STREAM_GROUP
+        self.consumer = (
+            consumer or settings.LOG.STREAM_CONSUMER or f"{gethostname()}-{getpid()}"
+        )
+        self.max_len = max_len or settings.LOG.STREAM_MAX_LEN
+        self.claim_idle = claim_idle or settings.LOG.STREAM_CLAIM_IDLE
+        self._groups: set[str] = set()
+
+    def append(self, kind: LOG_KIND, value) -> int:
+        try:
+            self.redis.xadd(
+                self._key(kind),
+                {self.value_field: value},
+                maxlen=self.max_len,
+                approximate=True,
+            )
+        except RedisError:
+            raise LogStorageError
+        return 1
+
+    def append_many(self, records: Iterable[tuple[LOG_KIND, Any]]) -> int:
+        pipeline = self.redis.pipeline(transaction=False)
+        count = 0
+        for kind, value in records:
+            pipeline.xadd(
+                self._key(kind),
+                {self.value_field: value},
+                maxlen=self.max_len,
+                approximate=True,
+            )
+            count += 1
+
+        if not count:
+            return 0
+
+        try:
+            pipeline.execute()
+        except RedisError:
+            raise LogStorageError
+        return count
+
+    def read(self, kind: LOG_KIND, count: int) -> list[StreamEntry]:
+        """
+        Прочитать порцию записей для текущего потребителя.
+        Сначала возвращаются собственные неподтверждённые записи (после перезапуска),
+        затем забираются давно не подтверждённые записи упавших потребителей,
+        затем - новые.
+        Записи, удалённые из потока при обрезке по `MAXLEN`, подтверждаются
+        и пропускаются, чтобы не занимать место в порции
+
+        :param kind: Тип логов
+        :param count: Максимальное количество записей
+        :raises LogStorageError: Ошибка хранилища логов
+        :return: Пары из id записи и значения
+        """
+
+        key = self._key(kind)
+        self._ensure_group(key)
+
+        entries: list[StreamEntry] = []
+        try:
+            self._read_pending(key, count, entries)
+            if len(entries) < count:
+                _, claimed, *_ = self.redis.xautoclaim(
+                    key,
+                    self.group,
+                    self.consumer,
+                    min_idle_time=self.claim_idle * 1000,
+                    count=count - len(entries),
+                )
+                # Удалённые записи Redis 7 сам убирает из списка ожидающих,
+                # Redis 6.2 возвращает их без значения
+                self._collect(key, claimed, entries)
+            if len(entries) < count:
+                new_entries = self._read_group(key, ">", count - len(entries))
+                self._collect(key, new_entries, entries)
+        except RedisError:
+            raise LogStorageError
+
+        return entries
+
+    def ack(self, kind: LOG_KIND, entry_ids: Iterable[bytes]) -> int:
+        """
+        Подтвердить обработку записей и удалить их из потока
+
+        :raises LogStorageError: Ошибка хранилища логов
+        :return: Количество подтверждённых записей
+        """
+
+        entry_ids = list(entry_ids)
+        if not entry_ids:
+            return 0
+
+        key = self._key(kind)
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.xack(key, self.group, *entry_ids)
+        pipeline.xdel(key, *entry_ids)
+        try:
+            acked, _ = pipeline.execute()
+        except RedisError:
+            raise LogStorageError
+        return acked
+
+    def read_chunk(self, kind: LOG_KIND, count: int) -> LogChunk:
+        entries = self.read(kind, count)
+        return LogChunk(
+            [value for _, value in entries],
+            tuple(entry_id for entry_id, _ in entries),
+        )
+
+    def commit_chunk(self, kind: LOG_KIND, chunk: LogChunk) -> int:
+        return self.ack(kind, chunk.ids)
+
+    def get(self, kind: LOG_KIND) -> list[bytes]:
+        try:
+            entries = self.redis.xrange(self._key(kind))
+        except RedisError:
+            raise LogStorageError
+        return [fields[self.value_field] for _, fields in entries]
+
+    def clear(self) -> int:
+        keys = [self._key(kind) for kind in get_args(LOG_KIND)]
+        try:
+            deleted = self.redis.delete(*keys)  # type: ignore[union-attr]
+        except RedisError:
+            raise LogStorageError(None, keys)
+        # Группы удалены вместе с потоками
+        self._groups.clear()
+        return deleted
+
+    def _key(self, kind: LOG_KIND) -> str:
+        return f"{kind}_{self.name}"
+
+    def _read_pending(self, key: str, count: int, entries: list[StreamEntry]) -> None:
+        """
+        Собственные неподтверждённые записи, начиная с самых старых,
+        пока не наберётся `count` живых записей или список не закончится
+        """
+
+        last_id: Union[str, bytes] = "0"
+        while len(entries) < count:
+            pending = self._read_group(key, last_id, count - len(entries))
+            if not pending:
+                return
+            self._collect(key, pending, entries)
+            last_id = pending[-1][0]
+
+    def _collect(self, key: str, response: list, entries: list[StreamEntry]) -> None:
+        """
+        Добавляет живые записи ответа в `entries`, записи без значения
+        (удалены из потока) подтверждает
+        """
+
+        deleted_ids = []
+        for entry_id, fields in response:
+            if entry_id is None:
+                continue
+            if fields:
+                entries.append((entry_id, fields[self.value_field]))
+            else:
+                deleted_ids.append(entry_id)
+
+        if deleted_ids:
+            self.redis.xack(key, self.group, *deleted_ids)
+
+    def _read_group(self, key: str, entry_id: Union[str, bytes], count: int) -> list:
+        response = self.redis.xreadgroup(
+            self.group, self.consumer, {key: entry_id}, count=count
+        )
+        entries: list = []
+        for _, stream_entries in response:
+            entries.extend(stream_entries)
+        return entries
+
+    def _ensure_group(self, key: str) -> None:
+        if key in self._groups:
+            return
+
+        try:
+            self.redis.xgroup_create(key, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise LogStorageError from e
+        except RedisError as e:
+            raise LogStorageError from e
+
+        self._groups.add(key)
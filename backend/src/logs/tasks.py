@@ -1,10 +1,11 @@
-from typing import Any, Optional
+from typing import Any, Optional, get_args
 
 from celery.utils.log import get_logger
 
 from src.core.celery import celery_app
 from src.core.config import settings
-from src.logs.reader import read_logs_from_storage
+from src.logs.checkpoint import CheckpointStore
+from src.logs.reader import drain_logs_from_storage
 from src.logs.storage import LogStorageABC
 from src.logs.storage.exceptions import LogStorageError
 from src.logs.types import LOG_KIND
@@ -14,26 +15,13 @@ from src.utils.loading import import_string
 logger = get_logger(__name__)
 
 
-@celery_app.task(name="log-save-storage")
-def save_log_to_storage(
-    kind: LOG_KIND, formatted_record: str, storage_path: Optional[str] = None
-):
-    """Сохраняет лог-запись в Storage"""
-
-    if storage_path is None:
-        storage_path = settings.LOG.STORAGE_PATH
-
-    storage_class = import_string(storage_path)
-    storage: LogStorageABC = storage_class()
-    try:
-        storage.append(kind, formatted_record)
-    except LogStorageError as e:
-        logger.error(e.reason, exc_info=e)
-
-
 @celery_app.task(name="log-write-file")
-def write_logs(writer_path: str, writer_kwargs: Optional[dict[str, Any]]):
-    """Записывает хранящиеся лог-записи из Storage в файл"""
+def write_logs(
+    writer_path: str,
+    writer_kwargs: Optional[dict[str, Any]],
+    chunk_size: Optional[int] = None,
+):
+    """Записывает хранящиеся лог-записи из Storage в файл порциями по `chunk_size`"""
 
     writer_class = import_string(writer_path)
 
@@ -44,13 +32,21 @@ def write_logs(writer_path: str, writer_kwargs: Optional[dict[str, Any]]):
     storage_path = settings.LOG.STORAGE_PATH
     storage: LogStorageABC = import_string(storage_path)()
 
-    logs = read_logs_from_storage(storage)
+    checkpoints = CheckpointStore()
+    chunk_size = chunk_size or settings.LOG.DRAIN_CHUNK_SIZE
 
     write_count = 0
-    for kind, values in logs.items():
-        count = log_writer.write(kind, values)
-        write_count += count
-
-    storage.clear()
+    for kind in get_args(LOG_KIND):
+        with checkpoints.lock(kind) as locked:
+            if not locked:
+                logger.info("Логи %s уже выгружает другой процесс", kind)
+                continue
+
+            try:
+                write_count += drain_logs_from_storage(
+                    storage, log_writer, kind, chunk_size, checkpoints
+                )
+            except LogStorageError as e:
+                logger.error(e.reason, exc_info=e)
 
     return write_count
@@ -1,30 +1,110 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
 from json import JSONDecodeError, dumps, loads
+from os import fsync, truncate
 from pathlib import Path
-from sys import getsizeof
+from time import monotonic, time
+from typing import Literal, NamedTuple, Optional
 
 from celery.utils.log import get_logger
 
 from src.core.config import settings
+from src.logs.compression import COMPRESSION, background_executor, compress_file
+from src.logs.index import build_segment_index
+from src.logs.segments import get_index_file, get_segment_file, get_segments
 from src.logs.types import LOG_KIND
 
+LOG_FILE_FORMAT = Literal["ndjson", "json"]
+FSYNC_POLICY = Literal["always", "interval", "never"]
+ROTATION_WHEN = Literal["hourly", "daily"]
+
+ROTATION_TIME_FORMATS: dict[str, str] = {"hourly": "%Y%m%d%H", "daily": "%Y%m%d"}
+
 logger = get_logger(__name__)
 
 
+class WritePosition(NamedTuple):
+    """
+    Позиция в файле, с которой начинается запись порции логов
+
+    :param file: Путь к файлу
+    :param offset: Смещение в файле
+    :param inode: Inode файла, по нему файл находится и после ротации в сегмент
+    """
+
+    file: str
+    offset: int
+    inode: int = 0
+
+
 class LogWriterABC(ABC):
     @abstractmethod
     def write(self, kind: LOG_KIND, logs: list[bytes]) -> int:
         raise NotImplementedError
 
+    def prepare(self, kind: LOG_KIND, logs: list[bytes]) -> Optional[WritePosition]:
+        """
+        Подготовить запись порции логов.
+        Позиция сохраняется в контрольной точке до записи, чтобы после падения
+        откатить недописанную или неподтверждённую порцию через `restore`
+
+        :return: Позиция начала записи или None, если откат не поддерживается
+        """
+        return None
+
+    def restore(self, position: WritePosition) -> None:
+        """Откатить запись до переданной позиции"""
+
 
 class FileWriterABC(LogWriterABC, ABC):
+    """
+    Базовый класс для записи логов в файлы
+
+    :param file_format: Формат файла JSON логов: `ndjson` - запись в конец файла
+        по строке на лог, `json` - JSON массив, перезаписываемый целиком
+    :param fsync_policy: Когда сбрасывать файл на диск: после каждой записи,
+        не чаще раза в `fsync_interval` секунд или никогда (решает ОС)
+    :param fsync_interval: Интервал fsync для политики `interval` в секундах
+    """
+
+    def __init__(
+        self,
+        file_format: Optional[LOG_FILE_FORMAT] = None,
+        fsync_policy: Optional[FSYNC_POLICY] = None,
+        fsync_interval: Optional[float] = None,
+    ) -> None:
+        self.file_format = file_format or settings.LOG.FILE_FORMAT
+        self.fsync_policy = fsync_policy or settings.LOG.FSYNC_POLICY
+        self.fsync_interval = fsync_interval or settings.LOG.FSYNC_INTERVAL
+        self._last_fsync = monotonic()
+
     def _write(self, file: Path, logs: list[bytes]) -> int:
         """Записывает логи в обычный файл"""
-        with open(file, "a") as f:
-            f.write("\n".join([log.decode() for log in logs]))
+        return self._append(file, logs)
+
+    def _write_ndjson(self, file: Path, logs: list[bytes]) -> int:
+        """Записывает логи в NDJSON файл, по одной JSON записи на строку"""
+        return self._append(file, logs)
+
+    def _append(self, file: Path, logs: list[bytes]) -> int:
+        """Дописывает логи в конец файла одной операцией записи"""
+        data = b"\n".join(logs) + b"\n"
+        with open(file, "ab") as f:
+            f.write(data)
+            if self._should_fsync():
+                f.flush()
+                fsync(f.fileno())
+                self._last_fsync = monotonic()
 
         return len(logs)
 
+    def _should_fsync(self) -> bool:
+        if self.fsync_policy == "always":
+            return True
+        if self.fsync_policy == "interval":
+            return monotonic() - self._last_fsync >= self.fsync_interval
+        return False
+
     def _write_json(self, file: Path, logs: list[bytes]) -> int:
         """Записывает логи в JSON файл"""
         file_text = file.read_text()
@@ -44,10 +124,6 @@ class FileWriterABC(LogWriterABC, ABC):
         file.write_text(data)
         return len(logs)
 
-    def rotate_file(self, file: Path, file_idx: int) -> Path:
-        destination = f"{file.stem}.{file_idx}{file.suffix}"
-        return file.parent / destination
-
     @abstractmethod
     def should_rollover(self, file: Path, logs: list[bytes]) -> bool:
         """Должна ли происходить замена файла"""
@@ -64,7 +140,7 @@ class FileWriterABC(LogWriterABC, ABC):
         except Exception:
             file_extension = "error"
         else:
-            file_extension = "json"
+            file_extension = self.file_format
 
         file = kind_dir / f"{kind}.{file_extension}"
         file.touch()
@@ -74,30 +150,109 @@ class FileWriterABC(LogWriterABC, ABC):
 
 class RotationFileWriter(FileWriterABC):
     """
-    Класс для записи логов в файлы
+    Класс для записи логов в файлы с ротацией.
+
+    Файл ротируется, если после записи порции его размер превысит `file_size`,
+    или, при `when`, если последняя запись в него была в прошлом часе/дне.
+    Ротированный сегмент получает в имени время ротации, сжатие сегментов
+    и удаление старых выполняются в фоновом потоке, не задерживая запись
 
     :param file_size: Максимальный размер главного файла логов в байтах
-    :param max_backups: Максимальное количество бэкапов предыдущих логов
+    :param backup_count: Максимальное количество бэкапов предыдущих логов
     :param allow_compression: Разрешить сжатие прошлых файлов логов
+    :param compression: Алгоритм сжатия: `gzip` или `zstd` (нужен пакет zstandard)
+    :param when: Ротация по времени: `hourly` или `daily`
+    :param max_age: Максимальный возраст бэкапа в секундах, `0` - не ограничен
     """
 
-    def __init__(self, file_size: int, backup_count: int = 5) -> None:
-        self.file_size = file_size
-        self.backup_count = backup_count
+    def __init__(
+        self,
+        file_size: Optional[int] = None,
+        backup_count: Optional[int] = None,
+        allow_compression: Optional[bool] = None,
+        compression: Optional[COMPRESSION] = None,
+        when: Optional[ROTATION_WHEN] = None,
+        max_age: Optional[int] = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.file_size = file_size or settings.LOG.MAX_FILE_SIZE
+        self.backup_count = (
+            settings.LOG.BACKUP_COUNT if backup_count is None else backup_count
+        )
+        self.allow_compression = (
+            settings.LOG.ALLOW_COMPRESSION
+            if allow_compression is None
+            else allow_compression
+        )
+        self.compression = compression or settings.LOG.COMPRESSION
+        self.when = when or settings.LOG.ROTATION_WHEN
+        self.max_age = settings.LOG.BACKUP_MAX_AGE if max_age is None else max_age
+        self._prepared: set[Path] = set()
+
+    def prepare(self, kind: LOG_KIND, logs: list[bytes]) -> Optional[WritePosition]:
+        if not logs:
+            return None
+
+        file_path, file_extension = self._get_file(kind, logs)
+        # JSON файл перезаписывается целиком, обрезать его до позиции нельзя
+        if file_extension == "json":
+            return None
+
+        if self.should_rollover(file_path, logs):
+            self._do_rollover(file_path)
+            file_path.touch()
+
+        # Ротация решена здесь, `write` порции пишет в тот же файл
+        self._prepared.add(file_path)
+        stat = file_path.stat()
+        return WritePosition(str(file_path), stat.st_size, stat.st_ino)
+
+    def restore(self, position: WritePosition) -> None:
+        file_path = self._find_file(position)
+        if file_path is None:
+            logger.warning("Файл %s для отката записи не найден", position.file)
+            return
+
+        if file_path.stat().st_size > position.offset:
+            truncate(file_path, position.offset)
+
+    def _find_file(self, position: WritePosition) -> Optional[Path]:
+        """Файл позиции: главный файл или, если он уже ротирован, несжатый сегмент"""
+
+        file_path = Path(position.file)
+        if file_path.exists() and (
+            not position.inode or file_path.stat().st_ino == position.inode
+        ):
+            return file_path
+        if not position.inode:
+            return None
+
+        for segment in get_segments(file_path):
+            if (
+                segment.suffix == file_path.suffix
+                and segment.stat().st_ino == position.inode
+            ):
+                return segment
+        return None
 
     def write(self, kind: LOG_KIND, logs: list[bytes]) -> int:
-        """Записывает список лог-записей в JSON файл"""
+        """Записывает список лог-записей в файл"""
         if not logs:
             return 0
 
         file_path, file_extension = self._get_file(kind, logs)
 
-        if self.should_rollover(file_path, logs):
+        if file_path in self._prepared:
+            self._prepared.discard(file_path)
+        elif self.should_rollover(file_path, logs):
             self._do_rollover(file_path)
 
         file_path.touch()
 
-        if file_extension == "json":
+        if file_extension == "ndjson":
+            write_count = self._write_ndjson(file_path, logs)
+        elif file_extension == "json":
             write_count = self._write_json(file_path, logs)
         else:
             write_count = self._write(file_path, logs)
@@ -105,31 +260,56 @@ class RotationFileWriter(FileWriterABC):
         return write_count
 
     def _do_rollover(self, file: Path) -> None:
-        """Переименовывает все файлы по номерам, самый последний - удаляет"""
+        """Переименовывает файл в сегмент и запускает фоновое обслуживание сегментов"""
 
-        if not self.backup_count:
+        if not file.stat().st_size:
             return
 
-        for i in range(self.backup_count - 1, 0, -1):
-            source_file = self.rotate_file(file, i)
-            destination_file = self.rotate_file(file, i + 1)
-
-            if source_file.exists():
-                destination_file.unlink(missing_ok=True)
-                source_file.rename(destination_file)
+        file.rename(get_segment_file(file))
+        background_executor.submit(self._maintain_segments, file)
 
-        destination_file = self.rotate_file(file, 1)
-        destination_file.unlink(missing_ok=True)
+    def _maintain_segments(self, file: Path) -> None:
+        """
+        Удаляет лишние по количеству и возрасту сегменты, строит индекс
+        для NDJSON сегментов и сжимает несжатые сегменты
+        """
 
-        file.rename(destination_file)
+        try:
+            segments = get_segments(file)
+            min_mtime = time() - self.max_age if self.max_age else None
+            compression = self.compression if self.allow_compression else None
+
+            for i, segment in enumerate(segments):
+                if i >= self.backup_count or (
+                    min_mtime and segment.stat().st_mtime < min_mtime
+                ):
+                    segment.unlink(missing_ok=True)
+                    get_index_file(segment).unlink(missing_ok=True)
+                elif segment.suffix != file.suffix:
+                    continue
+                elif segment.suffix == ".ndjson":
+                    if compression or not get_index_file(segment).exists():
+                        build_segment_index(segment, compression)
+                elif compression:
+                    compress_file(segment, compression)
+        except Exception as e:
+            logger.error("Ошибка при обслуживании файлов логов", exc_info=e)
 
     def should_rollover(self, file: Path, logs: list[bytes]) -> bool:
         """Необходимо ли переименование файлов логов"""
 
-        file_size = file.stat().st_size
-        logs_size = getsizeof(logs)
+        stat = file.stat()
+        if not stat.st_size:
+            return False
 
-        if file_size + logs_size > self.file_size:
+        # Порция пишется одним буфером: записи, разделённые переводами строк
+        logs_size = sum(len(log) + 1 for log in logs)
+        if stat.st_size + logs_size > self.file_size:
             return True
 
+        if self.when is not None:
+            time_format = ROTATION_TIME_FORMATS[self.when]
+            last_write = datetime.fromtimestamp(stat.st_mtime).strftime(time_format)
+            return last_write != datetime.now().strftime(time_format)
+
         return False
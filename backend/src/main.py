@@ -6,21 +6,46 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from src.api.v1.api import api_router
 from src.core.config import settings
+from src.database import async_engine
 from src.events import check_db_connection
 from src.logs.config import LOG_CONFIG
+from src.metrics import metrics_service
 from src.middlewares import LoggingMiddleware
 from src.offline import set_offline
+from src.services.auth.container import ServiceContainer
+from src.services.mail import email_service
+from src.services.mail.outbox import mail_outbox_dispatcher
+from src.services.renderers import TemplateRenderer
+from src.services.tasks import AsyncioTaskService, task_service
+from src.tracing import tracer
+from src.tracing.integrations import instrument_engine
 
 if settings.ENV_STATE != "TEST":
     dictConfig(LOG_CONFIG)
 
+instrument_engine(async_engine)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await check_db_connection()
+    app.state.container = ServiceContainer()
+    TemplateRenderer.warm_up()
+    metrics_service.start()
+    if isinstance(task_service, AsyncioTaskService):
+        # Без Celery beat outbox разбирает само приложение
+        task_service.add_periodic_task(
+            mail_outbox_dispatcher.dispatch, settings.EMAIL.OUTBOX_DISPATCH_INTERVAL
+        )
+    await task_service.start()
 
     yield
 
+    await email_service.backend.aclose()
+    await task_service.close()
+    metrics_service.stop()
+    tracer.shutdown()
+
 
 app = FastAPI(
     root_path="/api/v1",
@@ -0,0 +1,14 @@
+from .http import HTTPMetrics
+from .mail import MailMetrics
+from .registry import MetricsRegistry
+from .service import MetricsService, metrics_service
+from .tasks import TaskMetrics
+
+__all__ = [
+    "HTTPMetrics",
+    "MailMetrics",
+    "MetricsRegistry",
+    "MetricsService",
+    "TaskMetrics",
+    "metrics_service",
+]
@@ -0,0 +1,65 @@
+from typing import Optional
+
+from src.core.config import settings
+from src.metrics.registry import MetricsRegistry
+
+UNMATCHED_ROUTE = "<unmatched>"
+STATUS_CLASSES = ("0xx", "1xx", "2xx", "3xx", "4xx", "5xx")
+
+
+class HTTPMetrics:
+    """
+    Метрики HTTP запросов
+
+    :param registry: Реестр, в котором регистрируются метрики
+    :param buckets: Границы корзин гистограммы длительности в секундах
+    """
+
+    def __init__(
+        self, registry: MetricsRegistry, buckets: Optional[list[float]] = None
+    ) -> None:
+        self.duration = registry.histogram(
+            "http_request_duration_seconds",
+            "Длительность обработки HTTP запроса",
+            ("method", "route", "status"),
+            buckets or settings.METRICS.LATENCY_BUCKETS,
+        )
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight", "Количество обрабатываемых HTTP запросов"
+        ).labels()
+        self.request_size = registry.summary(
+            "http_request_size_bytes",
+            "Размер тела HTTP запроса",
+            ("method", "route"),
+        )
+        self.response_size = registry.summary(
+            "http_response_size_bytes",
+            "Размер тела HTTP ответа",
+            ("method", "route", "status"),
+        )
+
+    def observe(
+        self,
+        method: str,
+        route: Optional[str],
+        status_code: int,
+        duration: float,
+        request_size: int,
+        response_size: int,
+    ) -> None:
+        """
+        Записывает завершённый запрос
+
+        :param method: HTTP метод
+        :param route: Шаблон маршрута, None - маршрут не найден
+        :param status_code: Код ответа
+        :param duration: Длительность в секундах
+        :param request_size: Размер тела запроса в байтах
+        :param response_size: Размер тела ответа в байтах
+        """
+
+        route = route or UNMATCHED_ROUTE
+        status = STATUS_CLASSES[status_code // 100] if status_code < 600 else "5xx"
+        self.duration.labels(method, route, status).observe(duration)
+        self.request_size.labels(method, route).observe(request_size)
+        self.response_size.labels(method, route, status).observe(response_size)
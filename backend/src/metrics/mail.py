@@ -0,0 +1,40 @@
+from src.metrics.registry import MetricsRegistry
+
+
+class MailMetrics:
+    """
+    Метрики доставки писем по доменам получателей
+
+    :param registry: Реестр, в котором регистрируются метрики
+    """
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.delivered = registry.counter(
+            "mail_delivered_total",
+            "Количество доставленных писем",
+            ("domain",),
+        )
+        self.deferred = registry.counter(
+            "mail_deferred_total",
+            "Количество временных отказов сервера, после которых отправка повторяется",
+            ("domain",),
+        )
+        self.failed = registry.counter(
+            "mail_failed_total",
+            "Количество писем, которые не удалось доставить",
+            ("domain",),
+        )
+        self.delivery_duration = registry.summary(
+            "mail_delivery_duration_seconds",
+            "Длительность отправки письма на домен",
+            ("domain",),
+        )
+        self.throttled = registry.summary(
+            "mail_throttle_wait_seconds",
+            "Ожидание лимита домена перед отправкой",
+            ("domain",),
+        )
+        self.outbox_dead = registry.counter(
+            "mail_outbox_dead_total",
+            "Количество писем outbox, не отправленных за все попытки",
+        ).labels()
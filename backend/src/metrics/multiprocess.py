@@ -0,0 +1,137 @@
+from json import JSONDecodeError, dumps, loads
+from os import getpid, kill, replace
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Optional
+
+from src.metrics.registry import MetricsRegistry
+
+FILE_PREFIX = "metrics_"
+
+
+class MultiProcessStore:
+    """
+    Агрегация метрик процессов-воркеров через общую директорию.
+
+    Каждый процесс пишет снимок своих метрик в файл `metrics_<pid>.json`
+    в фоновом потоке раз в `flush_interval` секунд, сами наблюдения остаются
+    обычными операциями в памяти. При чтении снимки всех процессов складываются,
+    gauge'и учитываются только у живых процессов
+
+    :param directory: Общая директория воркеров
+    :param registry: Реестр метрик текущего процесса
+    :param flush_interval: Интервал записи снимка в секундах
+    """
+
+    def __init__(
+        self, directory: Path, registry: MetricsRegistry, flush_interval: float
+    ) -> None:
+        self.directory = directory
+        self.registry = registry
+        self.flush_interval = flush_interval
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._lock = Lock()
+
+    @property
+    def file(self) -> Path:
+        return self.directory / f"{FILE_PREFIX}{getpid()}.json"
+
+    def start(self) -> None:
+        """Запускает фоновую запись снимков в текущем процессе"""
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="metrics-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval * 2)
+        self.flush()
+
+    def flush(self) -> None:
+        """Записывает снимок метрик текущего процесса"""
+
+        data = dumps(self.registry.snapshot())
+        file = self.file
+        tmp_file = file.with_suffix(".tmp")
+        with self._lock:
+            tmp_file.write_text(data)
+            replace(tmp_file, file)
+
+    def collect(self) -> dict[str, dict]:
+        """Сумма снимков всех процессов директории"""
+
+        self.flush()
+        merged: dict[str, dict] = {}
+        for file in self.directory.glob(f"{FILE_PREFIX}*.json"):
+            try:
+                snapshot = loads(file.read_text())
+                pid = int(file.stem.removeprefix(FILE_PREFIX))
+            except (FileNotFoundError, JSONDecodeError, ValueError):
+                continue
+            merge_snapshot(merged, snapshot, is_alive(pid))
+
+        return merged
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+def merge_snapshot(
+    merged: dict[str, dict], snapshot: dict[str, dict], alive: bool
+) -> None:
+    """Прибавляет снимок процесса к общему"""
+
+    for name, metric in snapshot.items():
+        if metric["type"] == "gauge" and not alive:
+            continue
+
+        target = merged.setdefault(name, {**metric, "samples": []})
+        samples = {tuple(values): value for values, value in target["samples"]}
+
+        for values, value in metric["samples"]:
+            key = tuple(values)
+            current = samples.get(key)
+            if current is None:
+                samples[key] = value
+            elif metric["type"] == "histogram":
+                counts = [a + b for a, b in zip(current[0], value[0])]
+                samples[key] = [counts, current[1] + value[1]]
+            elif metric["type"] == "summary":
+                samples[key] = [current[0] + value[0], current[1] + value[1]]
+            else:
+                samples[key] = current + value
+
+        target["samples"] = [[list(key), value] for key, value in samples.items()]
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def clear_directory(directory: Path) -> None:
+    """
+    Удаляет снимки завершившихся процессов, вызывается в мастер-процессе при старте.
+    Снимки живых процессов, например Celery воркеров, которые пишут
+    в ту же директорию, не удаляются
+    """
+
+    if not directory.exists():
+        return
+    for file in directory.glob(f"{FILE_PREFIX}*"):
+        try:
+            pid = int(file.name.removeprefix(FILE_PREFIX).split(".", 1)[0])
+        except ValueError:
+            continue
+        if not is_alive(pid):
+            file.unlink(missing_ok=True)
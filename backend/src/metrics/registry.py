@@ -0,0 +1,237 @@
+from bisect import bisect_left
+from math import inf
+from typing import Iterable, Literal, Optional, Union
+
+METRIC_TYPE = Literal["counter", "gauge", "histogram", "summary"]
+LabelValues = tuple[str, ...]
+SampleValue = Union[float, list]
+
+
+class GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def snapshot(self) -> SampleValue:
+        return self.value
+
+
+class CounterChild(GaugeChild):
+    __slots__ = ()
+
+
+class SummaryChild:
+    """Сумма и количество наблюдений, без квантилей"""
+
+    __slots__ = ("count", "sum")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> SampleValue:
+        return [self.count, self.sum]
+
+
+class HistogramChild:
+    """
+    Гистограмма с фиксированными границами.
+    Хранит некумулятивные счётчики по корзинам, последняя - `+Inf`,
+    наблюдение - один бинарный поиск и два сложения
+    """
+
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def snapshot(self) -> SampleValue:
+        return [list(self.counts), self.sum]
+
+
+MetricChild = Union[CounterChild, GaugeChild, SummaryChild, HistogramChild]
+
+
+class Metric:
+    """
+    Метрика с набором меток. Для каждого набора значений меток
+    создаётся и кешируется дочерний объект, в который пишутся наблюдения
+
+    :param name: Название метрики
+    :param description: Описание для `# HELP`
+    :param metric_type: Тип метрики
+    :param label_names: Названия меток
+    :param buckets: Границы корзин гистограммы
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        metric_type: METRIC_TYPE,
+        label_names: Iterable[str] = (),
+        buckets: Optional[Iterable[float]] = None,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.type = metric_type
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets)) if buckets else ()
+        self._children: dict[LabelValues, MetricChild] = {}
+
+    def labels(self, *values: str) -> MetricChild:
+        try:
+            return self._children[values]
+        except KeyError:
+            pass
+
+        if len(values) != len(self.label_names):
+            raise ValueError(f"Метрика {self.name} ожидает метки {self.label_names}")
+
+        child: MetricChild
+        if self.type == "histogram":
+            child = HistogramChild(self.buckets)
+        elif self.type == "summary":
+            child = SummaryChild()
+        elif self.type == "counter":
+            child = CounterChild()
+        else:
+            child = GaugeChild()
+        return self._children.setdefault(values, child)
+
+    def snapshot(self) -> dict:
+        return {
+            "type": self.type,
+            "description": self.description,
+            "label_names": list(self.label_names),
+            "buckets": list(self.buckets),
+            "samples": [
+                [list(values), child.snapshot()]
+                for values, child in list(self._children.items())
+            ],
+        }
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса"""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def counter(
+        self, name: str, description: str, label_names: Iterable[str] = ()
+    ) -> Metric:
+        return self._register(Metric(name, description, "counter", label_names))
+
+    def gauge(
+        self, name: str, description: str, label_names: Iterable[str] = ()
+    ) -> Metric:
+        return self._register(Metric(name, description, "gauge", label_names))
+
+    def summary(
+        self, name: str, description: str, label_names: Iterable[str] = ()
+    ) -> Metric:
+        return self._register(Metric(name, description, "summary", label_names))
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        label_names: Iterable[str] = (),
+        buckets: Iterable[float] = (),
+    ) -> Metric:
+        return self._register(
+            Metric(name, description, "histogram", label_names, buckets)
+        )
+
+    def snapshot(self) -> dict[str, dict]:
+        """Текущие значения всех метрик в виде, пригодном для JSON"""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+def render(snapshot: dict[str, dict]) -> str:
+    """
+    Метрики в текстовом формате Prometheus (exposition format 0.0.4)
+
+    :param snapshot: Значения метрик из `MetricsRegistry.snapshot`
+    """
+
+    lines = []
+    for name, metric in snapshot.items():
+        metric_type = metric["type"]
+        lines.append(f"# HELP {name} {escape_help(metric['description'])}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        label_names = metric["label_names"]
+
+        for values, value in metric["samples"]:
+            labels = list(zip(label_names, values))
+            if metric_type == "histogram":
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip([*metric["buckets"], inf], counts):
+                    cumulative += count
+                    bucket_labels = [*labels, ("le", format_value(bound))]
+                    lines.append(
+                        f"{name}_bucket{format_labels(bucket_labels)} {cumulative}"
+                    )
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+                lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+            elif metric_type == "summary":
+                count, total = value
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+                lines.append(f"{name}_count{format_labels(labels)} {count}")
+            else:
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def format_labels(labels: list[tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{escape_label(value)}"' for key, value in labels)
+    return f"{{{pairs}}}"
+
+
+def format_value(value: float) -> str:
+    if value == inf:
+        return "+Inf"
+    if value == -inf:
+        return "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
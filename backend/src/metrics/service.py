@@ -0,0 +1,59 @@
+from pathlib import Path
+from typing import Optional
+
+from src.core.config import settings
+from src.metrics.http import HTTPMetrics
+from src.metrics.mail import MailMetrics
+from src.metrics.multiprocess import MultiProcessStore
+from src.metrics.registry import MetricsRegistry, render
+from src.metrics.tasks import TaskMetrics
+
+
+class MetricsService:
+    """
+    Метрики приложения и их выдача в формате Prometheus.
+    Если задана директория для нескольких процессов (gunicorn), метрики
+    всех воркеров складываются через неё, иначе выдаются метрики процесса
+
+    :param registry: Реестр метрик процесса
+    :param multiprocess_dir: Общая директория воркеров
+    :param flush_interval: Интервал записи снимка метрик процесса в секундах
+    """
+
+    def __init__(
+        self,
+        registry: Optional[MetricsRegistry] = None,
+        multiprocess_dir: Optional[Path] = None,
+        flush_interval: Optional[float] = None,
+    ) -> None:
+        self.registry = registry or MetricsRegistry()
+        self.http = HTTPMetrics(self.registry)
+        self.mail = MailMetrics(self.registry)
+        self.tasks = TaskMetrics(self.registry)
+
+        multiprocess_dir = multiprocess_dir or settings.METRICS.MULTIPROCESS_DIR
+        self.store = (
+            MultiProcessStore(
+                multiprocess_dir,
+                self.registry,
+                flush_interval or settings.METRICS.FLUSH_INTERVAL,
+            )
+            if multiprocess_dir
+            else None
+        )
+
+    def start(self) -> None:
+        """Вызывается при старте воркера, после fork"""
+        if self.store is not None:
+            self.store.start()
+
+    def stop(self) -> None:
+        if self.store is not None:
+            self.store.stop()
+
+    def render(self) -> str:
+        snapshot = self.store.collect() if self.store else self.registry.snapshot()
+        return render(snapshot)
+
+
+metrics_service = MetricsService()
@@ -0,0 +1,32 @@
+from typing import Optional
+
+from src.core.config import settings
+from src.metrics.registry import MetricsRegistry
+
+
+class TaskMetrics:
+    """
+    Метрики постановки фоновых задач
+
+    :param registry: Реестр, в котором регистрируются метрики
+    :param buckets: Границы корзин гистограммы длительности в секундах
+    """
+
+    def __init__(
+        self, registry: MetricsRegistry, buckets: Optional[list[float]] = None
+    ) -> None:
+        self.enqueue_duration = registry.histogram(
+            "task_enqueue_duration_seconds",
+            "Длительность постановки задачи в очередь, включая ожидание публикации",
+            ("task",),
+            buckets or settings.METRICS.LATENCY_BUCKETS,
+        )
+        self.enqueue_failures = registry.counter(
+            "task_enqueue_failures_total",
+            "Количество задач, которые не удалось поставить в очередь",
+            ("task",),
+        )
+        self.pending = registry.gauge(
+            "task_enqueue_pending",
+            "Количество задач, ожидающих публикации",
+        ).labels()
@@ -1,144 +1,302 @@
 from http import HTTPStatus
-from logging import getLogger
+from logging import ERROR, INFO, WARNING, getLogger
 from math import ceil
-from time import time
+from time import perf_counter
 from typing import Optional
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.datastructures import URL, Headers
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from src.core.config import settings
+from src.logs.sampling import AccessLogSampler
 from src.logs.schemas import RequestJSONLogSchema
+from src.metrics import HTTPMetrics, metrics_service
+from src.tracing import Span, Tracer, extract
+from src.tracing import tracer as default_tracer
 
 EMPTY_VALUE = ""
 
 logger = getLogger(__name__)
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware для логирования запросов-ответов"""
+class RequestLogContext:
+    """
+    Состояние одного запроса для логирования.
+    Создаётся на каждый запрос, поэтому конкурентные запросы не делят данные
 
-    @staticmethod
-    async def get_protocol(request: Request) -> str:
-        protocol = str(request.scope.get("type", ""))
-        http_version = str(request.scope.get("http_version", ""))
+    :param max_body_size: Сколько байт тела запроса/ответа сохранять, `0` - не сохранять
+    """
 
-        if protocol.lower() == "http" and http_version:
-            return f"{protocol.upper()}/{http_version}"
-        return EMPTY_VALUE
+    __slots__ = (
+        "max_body_size",
+        "start_time",
+        "request_body",
+        "response_body",
+        "request_size",
+        "response_status_code",
+        "response_headers",
+        "response_size",
+        "response_started",
+    )
 
-    @staticmethod
-    async def set_body(request: Request, body: bytes) -> None:
-        async def receive() -> dict:
-            return {"type": "http_request", "body": body}
+    def __init__(self, max_body_size: int) -> None:
+        self.max_body_size = max_body_size
+        self.start_time = perf_counter()
+        self.request_body = bytearray()
+        self.response_body = bytearray()
+        self.request_size = 0
+        self.response_status_code: int = HTTPStatus.INTERNAL_SERVER_ERROR.value
+        self.response_headers: list[tuple[bytes, bytes]] = []
+        self.response_size = 0
+        self.response_started = False
 
-        request._receive = receive
+    @property
+    def elapsed(self) -> float:
+        """Длительность запроса в секундах"""
+        return perf_counter() - self.start_time
 
-    async def get_body(self, request: Request) -> bytes:
-        body = await request.body()
-        await self.set_body(request, body)
-        return body
+    @property
+    def duration(self) -> int:
+        """Длительность запроса в мс"""
+        return ceil(self.elapsed * 1000)
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint):
-        start_time = time()
+    def tee(self, buffer: bytearray, chunk: bytes) -> None:
+        """Сохраняет часть тела, пока не превышен лимит, без промежуточной копии"""
+        free = self.max_body_size - len(buffer)
+        if free > 0 and chunk:
+            buffer += memoryview(chunk)[:free]
 
-        self.request_body = await self._get_request_body(request)
-        server: tuple = request.get("host", ("localhost", 8000))
-        self.request_headers = dict(request.headers.items())
 
-        (
-            response,
-            self.response_headers,
-            self.response_body,
-            exception,
-        ) = await self._get_response(request, call_next)
+class LoggingMiddleware:
+    """
+    ASGI Middleware для логирования запросов-ответов.
+    Тела запроса и ответа копируются по мере передачи, не более `max_body_size` байт,
+    сам ответ не буферизуется, поэтому стриминг не ломается
 
-        self.duration = ceil((time() - start_time) * 1000)
-        request_fields = await self._get_request_fields(request, response, server)
+    Какие запросы попадут в лог, решает `sampler` уже после завершения ответа,
+    поля лога (заголовки, тела) формируются только для сохранённых запросов.
+    Тело запроса копируется до решения: ошибки и медленные запросы сохраняются
+    всегда, а тело к этому моменту уже прочитано приложением. Поэтому каждый
+    запрос в обработке держит до `max_body_size` байт, в том числе отброшенный
+    сэмплером; при большом числе параллельных загрузок лимит стоит уменьшить
+    или отключить `capture_body`.
+    Тело ответа сохраняется только для ответов с ошибкой сервера.
+    Если приложение упало после начала ответа, исключение после записи лога
+    пробрасывается дальше, иначе клиенту отдаётся 500
 
-        message = (
-            f'{"Ошибка" if exception else "Ответ"} '
-            f"с кодом {response.status_code} "
-            f'на запрос {request.method} "{str(request.url)}", '
-            f"за {self.duration} мс"
-        )
+    :param capture_body: Сохранять ли тела запроса и ответа
+    :param max_body_size: Максимальный размер сохраняемого тела в байтах
+    :param sampler: Политика сэмплирования access логов
+    :param tracer: Трассировщик, на каждый запрос открывается span
+    :param metrics: HTTP метрики, по умолчанию берутся из `metrics_service`,
+        если метрики включены
+    """
 
-        if exception:
-            logger.error(
-                message,
-                extra={"request_fields": request_fields},
-                exc_info=exception,
-            )
+    def __init__(
+        self,
+        app: ASGIApp,
+        capture_body: Optional[bool] = None,
+        max_body_size: Optional[int] = None,
+        sampler: Optional[AccessLogSampler] = None,
+        tracer: Optional[Tracer] = None,
+        metrics: Optional[HTTPMetrics] = None,
+    ) -> None:
+        self.app = app
+        if metrics is None and settings.METRICS.ENABLED:
+            metrics = metrics_service.http
+        self.metrics = metrics
+        self.sampler = sampler or AccessLogSampler()
+        self.tracer = tracer or default_tracer
+        capture_body = (
+            settings.LOG.CAPTURE_BODY if capture_body is None else capture_body
+        )
+        max_body_size = (
+            settings.LOG.MAX_BODY_SIZE if max_body_size is None else max_body_size
+        )
+        self.max_body_size = max_body_size if capture_body else 0
 
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def _get_request_body(self, request: Request) -> str:
+        context = RequestLogContext(self.max_body_size)
+        span = self.tracer.start_span(
+            f'{scope["method"]} {scope["path"]}',
+            kind="server",
+            parent=extract(Headers(scope=scope)),
+        )
+        token = self.tracer.activate(span)
         try:
-            # Необходимо, чтобы не перезатереть данные из body
-            raw_request_body = await request.body()
-            await self.set_body(request, raw_request_body)
-            raw_request_body = await self.get_body(request)
-            request_body = raw_request_body.decode()
-        except Exception:
-            request_body = EMPTY_VALUE
-
-        return request_body
-
-    async def _get_response(
-        self, request: Request, call_next
-    ) -> tuple[Response, dict, bytes, Optional[Exception]]:
+            await self.handle(scope, receive, send, context, span)
+        finally:
+            span.end()
+            self.tracer.deactivate(token)
+
+    async def handle(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        context: RequestLogContext,
+        span: Span,
+    ) -> None:
+        """Выполняет запрос, копируя данные для лога, и пишет лог"""
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                context.request_size += len(body)
+                if context.max_body_size:
+                    context.tee(context.request_body, body)
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                context.response_started = True
+                context.response_status_code = message["status"]
+                context.response_headers = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                context.response_size += len(body)
+                # Тело успешного ответа может содержать токены, сохраняются только ошибки
+                if (
+                    context.max_body_size
+                    and context.response_status_code
+                    >= HTTPStatus.INTERNAL_SERVER_ERROR
+                ):
+                    context.tee(context.response_body, body)
+            await send(message)
+
+        exception: Optional[Exception] = None
+        reraise = False
+        if self.metrics is not None:
+            self.metrics.in_flight.inc()
         try:
-            response = await call_next(request)
+            await self.app(scope, receive_wrapper, send_wrapper)
         except Exception as ex:
             exception = ex
-            response_headers = {}
-            response_body = bytes(HTTPStatus.INTERNAL_SERVER_ERROR.phrase.encode())
+            span.record_exception(ex)
+            if context.response_started:
+                # Начатый ответ не исправить, сервер должен оборвать соединение
+                reraise = True
+            else:
+                response = Response(
+                    content=HTTPStatus.INTERNAL_SERVER_ERROR.phrase,
+                    status_code=HTTPStatus.INTERNAL_SERVER_ERROR.value,
+                )
+                await response(scope, receive, send_wrapper)
+        finally:
+            if self.metrics is not None:
+                self.metrics.in_flight.dec()
 
-            response = Response(
-                content=response_body,
-                status_code=HTTPStatus.INTERNAL_SERVER_ERROR.real,
+        if self.metrics is not None:
+            self.metrics.observe(
+                scope["method"],
+                getattr(scope.get("route"), "path", None),
+                context.response_status_code,
+                context.elapsed,
+                context.request_size,
+                context.response_size,
             )
+
+        duration = context.duration
+        route = self.get_route(scope)
+        if span.sampled:
+            span.name = f'{scope["method"]} {route}'
+            span.set_attribute("http.method", scope["method"])
+            span.set_attribute("http.route", route)
+            span.set_attribute("http.status_code", context.response_status_code)
+
+        if self.sampler.should_keep(
+            route,
+            context.response_status_code,
+            duration,
+            exception,
+        ):
+            self.log(scope, context, duration, exception)
+
+        if reraise and exception is not None:
+            raise exception
+
+    def log(
+        self,
+        scope: Scope,
+        context: RequestLogContext,
+        duration: int,
+        exception: Optional[Exception] = None,
+    ) -> None:
+        """Записывает лог запроса-ответа"""
+
+        if exception:
+            level = ERROR
+        elif context.response_status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            level = WARNING
         else:
-            exception = None
-            response_headers = dict(response.headers.items())
-            response_body = b""
-            async for chunk in response.body_iterator:
-                response_body += chunk
-
-            response = Response(
-                content=response_body,
-                status_code=response.status_code,
-                headers=dict(response.headers),
-                media_type=response.media_type,
-            )
+            level = INFO
 
-        return response, response_headers, response_body, exception
+        if not logger.isEnabledFor(level):
+            return
 
-    async def _get_request_fields(
-        self, request: Request, response: Response, server: tuple
-    ):
-        try:
-            remote_ip: str = request.client[0]  # pyright: ignore [reportOptionalSubscript]
-        except TypeError:
-            remote_ip = request.get("x-forwarded-for", "")
-
-        request_fields = RequestJSONLogSchema(
-            request_uri=str(request.url),
-            request_referer=self.request_headers.get("referer", EMPTY_VALUE),
-            request_protocol=await self.get_protocol(request),
-            request_method=request.method,
-            request_path=request.url.path,
+        message = (
+            f'{"Ошибка" if exception else "Ответ"} '
+            f"с кодом {context.response_status_code} "
+            f'на запрос {scope["method"]} "{URL(scope=scope)}", '
+            f"за {duration} мс"
+        )
+        request_fields = self.get_request_fields(scope, context, duration)
+        logger.log(
+            level,
+            message,
+            extra={"request_fields": request_fields},
+            exc_info=exception,
+        )
+
+    @staticmethod
+    def get_route(scope: Scope) -> str:
+        """Шаблон маршрута, найденного роутером, или путь запроса"""
+        route = scope.get("route")
+        return getattr(route, "path", scope["path"])
+
+    @staticmethod
+    def get_protocol(scope: Scope) -> str:
+        protocol = str(scope.get("type", ""))
+        http_version = str(scope.get("http_version", ""))
+
+        if protocol.lower() == "http" and http_version:
+            return f"{protocol.upper()}/{http_version}"
+        return EMPTY_VALUE
+
+    def get_request_fields(
+        self, scope: Scope, context: RequestLogContext, duration: int
+    ) -> dict:
+        request_headers = Headers(scope=scope)
+        response_headers = Headers(raw=context.response_headers)
+        server = scope.get("server") or ("localhost", 8000)
+        client = scope.get("client")
+        if client:
+            remote_ip = client[0]
+        else:
+            remote_ip = request_headers.get("x-forwarded-for", EMPTY_VALUE)
+
+        return RequestJSONLogSchema(
+            request_uri=str(URL(scope=scope)),
+            request_referer=request_headers.get("referer", EMPTY_VALUE),
+            request_protocol=self.get_protocol(scope),
+            request_method=scope["method"],
+            request_path=scope["path"],
             request_host=f"{server[0]}:{server[1]}",
-            request_size=int(self.request_headers.get("content-length", 0)),
-            request_content_type=self.request_headers.get("content-type", EMPTY_VALUE),
-            request_headers=self.request_headers,
-            request_body=self.request_body,
+            request_size=context.request_size,
+            request_content_type=request_headers.get("content-type", EMPTY_VALUE),
+            request_headers=dict(request_headers.items()),
+            request_body=context.request_body.decode(errors="replace"),
             request_direction="in",
             remote_ip=remote_ip,
-            response_status_code=response.status_code,
-            response_size=int(self.response_headers.get("content-length", 0)),
-            response_headers=self.response_headers,
-            response_body=self.response_body.decode(),
-            duration=self.duration,
+            response_status_code=context.response_status_code,
+            response_size=context.response_size,
+            response_headers=dict(response_headers.items()),
+            response_body=context.response_body.decode(errors="replace"),
+            duration=duration,
         ).model_dump()
-
-        return request_fields
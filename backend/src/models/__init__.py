@@ -1,3 +1,4 @@
+from .mail import MailOutboxModel
 from .user import BaseModel
 
-__all__ = ["BaseModel"]
+__all__ = ["BaseModel", "MailOutboxModel"]
@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, SmallInteger, String, Text, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.database import BaseModel
+from src.models.types import bigint_pk, created_at, str_255
+
+
+class MailOutboxModel(BaseModel):
+    """
+    Письмо, ожидающее отправки.
+    Записывается в одной транзакции с изменением, из-за которого отправляется,
+    после отправки удаляется
+    """
+
+    __tablename__ = "mail_outbox"
+
+    id: Mapped[bigint_pk]
+    subject: Mapped[str_255] = mapped_column(comment="Тема письма")
+    template: Mapped[str_255] = mapped_column(comment="Шаблон тела письма")
+    context: Mapped[dict] = mapped_column(
+        server_default=text("'{}'::jsonb"), comment="Данные для шаблона"
+    )
+    recipients: Mapped[list[str]] = mapped_column(
+        ARRAY(String(length=320)), comment="Получатели"
+    )
+    from_email: Mapped[Optional[str]] = mapped_column(
+        String(length=320), comment="Отправитель"
+    )
+    attempts: Mapped[int] = mapped_column(
+        SmallInteger, server_default=text("0"), comment="Попыток отправки"
+    )
+    last_error: Mapped[Optional[str]] = mapped_column(
+        Text, comment="Ошибка последней попытки"
+    )
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        server_default=text("TIMEZONE('utc', now())"),
+        index=True,
+        comment="Не отправлять раньше",
+    )
+    created_at: Mapped[created_at]
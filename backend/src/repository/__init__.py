@@ -1,6 +1,9 @@
+from .mail import IMailOutboxRepository, MailOutboxRepository
 from .users import IUserRepository, UserRepository
 
 __all__ = [
+    "IMailOutboxRepository",
     "IUserRepository",
+    "MailOutboxRepository",
     "UserRepository",
 ]
@@ -0,0 +1,118 @@
+from abc import abstractmethod
+from datetime import datetime
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import DBAPIError
+
+from src.core.types import ID
+from src.models.mail import MailOutboxModel
+from src.utils.clock import Clock
+from src.utils.repository import SQLAlchemyRepository
+from src.utils.repository.base import RepositoryABC
+from src.utils.repository.exceptions import RepositoryException
+
+
+class IMailOutboxRepository(RepositoryABC[MailOutboxModel, ID]):
+    @abstractmethod
+    async def claim_batch(
+        self, limit: int, max_attempts: int, lease_until: datetime
+    ) -> list[MailOutboxModel]:
+        """
+        Захватить пачку писем, готовых к отправке.
+        Строки, заблокированные другой транзакцией, пропускаются. Захваченным письмам
+        засчитывается попытка, и они скрываются от других диспетчеров до `lease_until`,
+        поэтому после фиксации транзакции письма можно отправлять без блокировок.
+        Если диспетчер упал, письма снова станут доступны после `lease_until`
+
+        :param limit: Максимальный размер пачки
+        :param max_attempts: Письма с таким количеством попыток не отправляются
+        :param lease_until: До какого времени письма скрываются от других диспетчеров
+        :raises RepositoryException: Ошибка при получении
+        :return: Захваченные письма в порядке добавления,
+            `attempts` - количество попыток до захвата
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def postpone(self, record_id: ID, error: str, available_at: datetime) -> None:
+        """
+        Отложить письмо после неудачной попытки отправки.
+        Попытка уже засчитана при захвате
+
+        :param record_id: Id письма
+        :param error: Причина ошибки
+        :param available_at: Время следующей попытки
+        :raises RepositoryException: Ошибка при обновлении
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_exhausted(self, max_attempts: int) -> int:
+        """
+        Удалить письма, исчерпавшие попытки отправки.
+        Удаляются только письма с истёкшим захватом: их диспетчер упал
+        до фиксации результата. В контексте таких писем остаются ссылки с токенами,
+        поэтому хранить их нельзя
+
+        :param max_attempts: Максимальное количество попыток отправки письма
+        :raises RepositoryException: Ошибка при удалении
+        :return: Количество удалённых писем
+        """
+        raise NotImplementedError
+
+
+class MailOutboxRepository(
+    IMailOutboxRepository[int], SQLAlchemyRepository[MailOutboxModel, int]
+):
+    model = MailOutboxModel
+
+    async def claim_batch(
+        self, limit: int, max_attempts: int, lease_until: datetime
+    ) -> list[MailOutboxModel]:
+        query = (
+            select(self.model)
+            .where(
+                self.model.available_at <= Clock.utc_now(),
+                self.model.attempts < max_attempts,
+            )
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        try:
+            result = await self.session.execute(query)
+            records = list(result.scalars().all())
+            if records:
+                await self.session.execute(
+                    update(self.model)
+                    .where(self.model.id.in_([record.id for record in records]))
+                    .values(attempts=self.model.attempts + 1, available_at=lease_until)
+                    .execution_options(synchronize_session=False)
+                )
+        except DBAPIError as e:
+            raise RepositoryException("Ошибка при получении писем") from e
+
+        return records
+
+    async def postpone(
+        self, record_id: int, error: str, available_at: datetime
+    ) -> None:
+        await self.update(
+            record_id, {"last_error": error, "available_at": available_at}
+        )
+
+    async def delete_exhausted(self, max_attempts: int) -> int:
+        stmt = (
+            delete(self.model)
+            .where(
+                self.model.available_at <= Clock.utc_now(),
+                self.model.attempts >= max_attempts,
+            )
+            .returning(self.model.id)
+        )
+        try:
+            result = await self.session.execute(stmt)
+        except DBAPIError as e:
+            raise RepositoryException("Ошибка при удалении писем") from e
+
+        return len(result.scalars().all())
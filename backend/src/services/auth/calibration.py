@@ -0,0 +1,146 @@
+from argparse import ArgumentParser
+from math import ceil
+from time import perf_counter
+from typing import Iterable, NamedTuple, Optional
+
+from passlib.context import CryptContext
+from passlib.exc import MissingBackendError
+
+PASSWORD = "calibration-password-1234"
+
+
+class CalibrationResult(NamedTuple):
+    scheme: str
+    params: dict[str, int]
+    p50_ms: float
+    p99_ms: float
+
+    @property
+    def env(self) -> dict[str, str]:
+        """Переменные окружения для AuthSettings"""
+
+        # bcrypt остаётся в списке, чтобы существующие хеши проверялись
+        # и заменялись новыми при входе (deprecated="auto")
+        schemes = '["argon2","bcrypt"]' if self.scheme == "argon2" else '["bcrypt"]'
+        env = {"AUTH_PASSWORD_SCHEMES": schemes}
+        if self.scheme == "bcrypt":
+            env["AUTH_BCRYPT_ROUNDS"] = str(self.params["rounds"])
+        else:
+            env["AUTH_ARGON2_TIME_COST"] = str(self.params["time_cost"])
+            env["AUTH_ARGON2_MEMORY_COST"] = str(self.params["memory_cost"])
+        return env
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Значение перцентиля методом ближайшего ранга"""
+
+    ordered = sorted(values)
+    rank = max(ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def measure(context: CryptContext, samples: int) -> tuple[float, float]:
+    """
+    Замеряет время проверки пароля
+
+    :param context: CryptContext с одной схемой
+    :param samples: Количество замеров
+    :return: p50 и p99 в миллисекундах
+    """
+
+    hashed = context.hash(PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = perf_counter()
+        context.verify(PASSWORD, hashed)
+        timings.append((perf_counter() - start) * 1000)
+
+    return percentile(timings, 50), percentile(timings, 99)
+
+
+def calibrate_scheme(
+    scheme: str,
+    candidates: Iterable[dict[str, int]],
+    target_ms: float,
+    samples: int,
+) -> Optional[CalibrationResult]:
+    """
+    Находит самые дорогие параметры схемы, укладывающиеся в целевое время.
+    Кандидаты должны идти по возрастанию стоимости
+
+    :return: Лучший результат или None, если ни один кандидат не подошёл
+    """
+
+    best: Optional[CalibrationResult] = None
+    for params in candidates:
+        scheme_settings = {f"{scheme}__{key}": v for key, v in params.items()}
+        context = CryptContext(schemes=[scheme], **scheme_settings)
+        try:
+            p50, p99 = measure(context, samples)
+        except MissingBackendError:
+            return None
+
+        print(f"{scheme} {params}: p50={p50:.1f} мс, p99={p99:.1f} мс")
+        if p99 > target_ms:
+            break
+        best = CalibrationResult(scheme, params, p50, p99)
+
+    return best
+
+
+def get_candidate_series(scheme: str) -> list[list[dict[str, int]]]:
+    """Серии кандидатов схемы, внутри серии стоимость возрастает"""
+
+    if scheme == "bcrypt":
+        return [[{"rounds": rounds} for rounds in range(10, 17)]]
+
+    return [
+        [
+            {"time_cost": time_cost, "memory_cost": memory_cost}
+            for time_cost in range(1, 5)
+        ]
+        for memory_cost in (19456, 47104, 65536)
+    ]
+
+
+def main() -> None:
+    """
+    Замеряет время проверки пароля для разных параметров bcrypt/argon2 на текущей машине
+    и выводит самые дорогие параметры, p99 которых укладывается в целевое время входа
+    """
+
+    parser = ArgumentParser(description="Подбор стоимости хеширования паролей")
+    parser.add_argument(
+        "--target-ms", type=float, default=250, help="Целевой p99 проверки пароля"
+    )
+    parser.add_argument("--samples", type=int, default=30, help="Замеров на параметр")
+    parser.add_argument(
+        "--schemes", nargs="+", default=["bcrypt", "argon2"], choices=["bcrypt", "argon2"]
+    )
+    args = parser.parse_args()
+
+    results: list[CalibrationResult] = []
+    for scheme in args.schemes:
+        scheme_results = []
+        for candidates in get_candidate_series(scheme):
+            result = calibrate_scheme(scheme, candidates, args.target_ms, args.samples)
+            if result is not None:
+                scheme_results.append(result)
+
+        if not scheme_results:
+            print(f"{scheme}: нет подходящих параметров или не установлен бэкенд")
+            continue
+        results.append(max(scheme_results, key=lambda r: r.p99_ms))
+
+    if not results:
+        raise SystemExit("Не удалось подобрать параметры хеширования")
+
+    # argon2 предпочтительнее bcrypt, если он доступен
+    chosen = next((r for r in results if r.scheme == "argon2"), results[0])
+    print(f"\nВыбрано: {chosen.scheme} {chosen.params} (p99={chosen.p99_ms:.1f} мс)")
+    for key, value in chosen.env.items():
+        print(f"{key}={value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,19 @@
-from src.core.config import settings
+from fastapi import Depends
+
 from src.services.auth.authenticator import Authenticator
 from src.services.auth.backend import AuthenticationBackend
-from src.services.auth.strategy import JWTStrategy
+from src.services.auth.container import ServiceContainer, get_service_container
+from src.services.auth.strategy import StrategyABC
 from src.services.auth.transport import BearerTransport, CookieTransport
 
 bearer_transport = BearerTransport(token_url="auth/login")
 cookie_transport = CookieTransport()
 
 
-def get_jwt_strategy() -> JWTStrategy:
-    return JWTStrategy(
-        settings.AUTH.SECRET,
-        access_lifetime_seconds=settings.AUTH.JWT_ACCESS_TOKEN_LIFETIME,
-        refresh_lifetime_seconds=settings.AUTH.JWT_REFRESH_TOKEN_LIFETIME,
-        algorithm=settings.AUTH.JWT_ALGORITHM,
-    )
+def get_jwt_strategy(
+    container: ServiceContainer = Depends(get_service_container),
+) -> StrategyABC:
+    return container.jwt_strategy
 
 
 bearer_jwt_backend = AuthenticationBackend(
@@ -0,0 +1,67 @@
+from typing import Optional
+
+from fastapi import Request
+
+from src.core.config import settings
+from src.services.auth.mixins import load_password_validators
+from src.services.auth.password import PasslibPasswordHelper, PasswordHelperABC
+from src.services.auth.strategy import JWTStrategy, StrategyABC
+from src.services.secrets import CryptoUserTokenGenerator, UserTokenGeneratorABC
+from src.services.validators.base import ValidatorABC
+
+
+def build_jwt_strategy() -> JWTStrategy:
+    return JWTStrategy(
+        settings.AUTH.SECRET,
+        access_lifetime_seconds=settings.AUTH.JWT_ACCESS_TOKEN_LIFETIME,
+        refresh_lifetime_seconds=settings.AUTH.JWT_REFRESH_TOKEN_LIFETIME,
+        algorithm=settings.AUTH.JWT_ALGORITHM,
+    )
+
+
+class ServiceContainer:
+    """
+    Контейнер stateless-зависимостей сервисов.
+    Создаётся один раз в lifespan приложения, на каждый запрос создаётся только UoW
+
+    :param password_helper: Помощник хеширования паролей
+    :param token_generator: Генератор токенов пользователя
+    :param jwt_strategy: Стратегия JWT аутентификации
+    :param password_validators: Валидаторы пароля
+    """
+
+    password_helper: PasswordHelperABC
+    token_generator: UserTokenGeneratorABC
+    jwt_strategy: StrategyABC
+    password_validators: list[ValidatorABC]
+
+    def __init__(
+        self,
+        password_helper: Optional[PasswordHelperABC] = None,
+        token_generator: Optional[UserTokenGeneratorABC] = None,
+        jwt_strategy: Optional[StrategyABC] = None,
+        password_validators: Optional[list[ValidatorABC]] = None,
+    ):
+        self.password_helper = password_helper or PasslibPasswordHelper()
+        self.token_generator = token_generator or CryptoUserTokenGenerator()
+        self.jwt_strategy = jwt_strategy or build_jwt_strategy()
+        self.password_validators = (
+            password_validators
+            if password_validators is not None
+            else load_password_validators()
+        )
+
+
+def get_service_container(request: Request) -> ServiceContainer:
+    """
+    Получить контейнер сервисов, созданный в lifespan приложения.
+    Если lifespan не запускался (например, в тестах), контейнер создаётся при первом запросе
+    """
+    container: Optional[ServiceContainer] = getattr(
+        request.app.state, "container", None
+    )
+    if container is None:
+        container = ServiceContainer()
+        request.app.state.container = container
+
+    return container
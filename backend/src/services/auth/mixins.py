@@ -1,4 +1,4 @@
-from typing import Union
+from typing import Optional, Union
 from uuid import UUID
 
 from src.core.config import settings
@@ -12,10 +12,22 @@ from src.utils.repository.exceptions import RepositoryException
 from src.utils.uow import UoWABC
 
 
+def load_password_validators() -> list[ValidatorABC]:
+    """Создаёт экземпляры валидаторов пароля, указанных в настройках"""
+
+    validators: list[ValidatorABC] = []
+    for validator_str in settings.AUTH.PASSWORD_VALIDATORS:
+        validator = import_string(validator_str)
+        validators.append(validator())
+
+    return validators
+
+
 class UserHelperMixin:
     """Класс для валидации данных, связанных с пользователем"""
 
     uow: UoWABC
+    _password_validators: Optional[list[ValidatorABC]] = None
 
     async def get_by_id(self, id_: UUID) -> UserProtocol:
         """
@@ -84,9 +96,7 @@ class UserHelperMixin:
 
     @property
     def password_validators(self) -> list[ValidatorABC]:
-        validators: list[ValidatorABC] = []
-        for validator_str in settings.AUTH.PASSWORD_VALIDATORS:
-            validator = import_string(validator_str)
-            validators.append(validator())
+        if self._password_validators is None:
+            self._password_validators = load_password_validators()
 
-        return validators
+        return self._password_validators
@@ -4,6 +4,7 @@ from typing import Optional
 from passlib import pwd
 from passlib.context import CryptContext
 
+from src.core.config import settings
 from src.services.auth.exceptions import InvalidPassword
 
 
@@ -44,10 +45,31 @@ class PasswordHelperABC(ABC):
         raise NotImplementedError  # pragma: no cover
 
 
+def build_crypt_context() -> CryptContext:
+    """
+    Создаёт CryptContext по настройкам.
+    Стоимость хеширования подбирается командой `src.services.auth.calibration`.
+    Хеши с меньшей стоимостью, чем указанная, считаются устаревшими и обновляются при входе
+    """
+
+    schemes = settings.AUTH.PASSWORD_SCHEMES
+    schemes_kwargs = {}
+    if "bcrypt" in schemes and settings.AUTH.BCRYPT_ROUNDS:
+        schemes_kwargs["bcrypt__default_rounds"] = settings.AUTH.BCRYPT_ROUNDS
+        schemes_kwargs["bcrypt__min_rounds"] = settings.AUTH.BCRYPT_ROUNDS
+    if "argon2" in schemes:
+        if settings.AUTH.ARGON2_TIME_COST:
+            schemes_kwargs["argon2__time_cost"] = settings.AUTH.ARGON2_TIME_COST
+        if settings.AUTH.ARGON2_MEMORY_COST:
+            schemes_kwargs["argon2__memory_cost"] = settings.AUTH.ARGON2_MEMORY_COST
+
+    return CryptContext(schemes=schemes, deprecated="auto", **schemes_kwargs)
+
+
 class PasslibPasswordHelper(PasswordHelperABC):
     def __init__(self, context: Optional[CryptContext] = None):
         if not context:
-            self.context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+            self.context = build_crypt_context()
         else:
             self.context = context
 
@@ -3,7 +3,7 @@ from logging import getLogger
 from typing import Any, AsyncGenerator, Optional, Union
 from uuid import UUID
 
-from fastapi import Request
+from fastapi import BackgroundTasks, Depends, Request
 from pydantic import HttpUrl
 
 from src.core.types.user import UserProtocol
@@ -12,6 +12,7 @@ from src.schemas.user import (
     UserPasswordChangeSchema,
     UserUpdateSchema,
 )
+from src.services.auth.container import ServiceContainer, get_service_container
 from src.services.auth.exceptions import (
     AuthServiceError,
     PasswordMatch,
@@ -23,12 +24,12 @@ from src.services.auth.exceptions import (
 from src.services.auth.exceptions import InvalidTokenError as AuthInvalidToken
 from src.services.auth.mixins import UserHelperMixin
 from src.services.auth.password import PasslibPasswordHelper, PasswordHelperABC
+from src.services.mail import MassEmailItem
+from src.services.mail.outbox import MailOutbox
 from src.services.parsers import URLParser
-from src.services.renderers import TemplateRenderer
 from src.services.secrets import CryptoUserTokenGenerator, UserTokenGeneratorABC
 from src.services.secrets.exceptions import InvalidToken
-from src.services.tasks import TaskServiceABC, celery_task_service
-from src.tasks.mailing import send_mail
+from src.services.validators.base import ValidatorABC
 from src.templates import TemplatePath
 from src.utils.repository.exceptions import IntegrityError, RepositoryException
 from src.utils.uow import SQLAlchemyUoW, UoWABC
@@ -42,14 +43,13 @@ class UserService(ABC, UserHelperMixin):
     uow: UoWABC
     password_helper: PasswordHelperABC
     token_generator: UserTokenGeneratorABC
-    task_service: TaskServiceABC
 
     def __init__(
         self,
         uow: Optional[UoWABC] = None,
         password_helper: Optional[PasswordHelperABC] = None,
         token_generator: Optional[UserTokenGeneratorABC] = None,
-        task_service: TaskServiceABC = celery_task_service,
+        password_validators: Optional[list[ValidatorABC]] = None,
     ):
         self.uow = uow if uow else SQLAlchemyUoW()
         self.password_helper = (
@@ -58,7 +58,7 @@ class UserService(ABC, UserHelperMixin):
         self.token_generator = (
             token_generator if token_generator else CryptoUserTokenGenerator()
         )
-        self.task_service = task_service
+        self._password_validators = password_validators
 
     async def create(
         self,
@@ -135,12 +135,22 @@ class UserService(ABC, UserHelperMixin):
 
         return updated_user
 
-    async def authenticate(self, email: str, password: str) -> Optional[UserProtocol]:
+    async def authenticate(
+        self,
+        email: str,
+        password: str,
+        background_tasks: Optional[BackgroundTasks] = None,
+    ) -> Optional[UserProtocol]:
         """
-        Аутентифицирует пользователя по его email/password, и возвращает его
+        Аутентифицирует пользователя по его email/password, и возвращает его.
+        Аутентификация только читает БД: если хеш пароля устарел, его замена
+        выполняется в `background_tasks` после отправки ответа, новый хеш
+        хранится только в памяти процесса. Без `background_tasks` хеш заменится
+        при следующем входе
 
         :param email: Email адрес пользователя
         :param password: Пароль пользователя
+        :param background_tasks: Задачи, выполняемые после отправки ответа
         :return: Пользователь
         """
 
@@ -157,16 +167,40 @@ class UserService(ABC, UserHelperMixin):
         if not verified:
             return None
 
-        if updated_password_hash is not None:
-            async with self.uow:
-                await self.uow.users.update(
-                    user.id, {"hashed_password": updated_password_hash}
-                )
-
-                await self.uow.commit()
+        if updated_password_hash is not None and background_tasks is not None:
+            background_tasks.add_task(
+                self.update_password_hash,
+                user.id,
+                user.hashed_password,
+                updated_password_hash,
+            )
 
         return user
 
+    async def update_password_hash(
+        self, user_id: UUID, old_hash: str, new_hash: str
+    ) -> None:
+        """
+        Заменяет хеш пароля на более стойкий после входа.
+        Хеш заменяется, только если пароль не менялся с момента входа,
+        ошибка записи только логируется
+
+        :param user_id: Id пользователя
+        :param old_hash: Хеш, с которым пользователь вошёл
+        :param new_hash: Новый хеш того же пароля
+        """
+
+        async with self.uow:
+            try:
+                await self.uow.users.update_by_filters(
+                    {"hashed_password": new_hash}, id=user_id, hashed_password=old_hash
+                )
+            except RepositoryException as e:
+                logger.warning("Не удалось обновить хеш пароля", exc_info=e)
+                return
+
+            await self.uow.commit()
+
     async def change_password(
         self, user: UserProtocol, password_data: UserPasswordChangeSchema
     ) -> UserProtocol:
@@ -217,7 +251,7 @@ class UserService(ABC, UserHelperMixin):
         :param email: Email для отправки
         :param frontend_url: URL, по которому необходимо будет перейти для подтверждения
         :raises UserAlreadyExist: Пользователь уже существует
-        :raises MailServiceError: Ошибка отправки сообщения
+        :raises MailServiceError: Ошибка постановки письма в очередь
         """
 
         user_exist = await self.exists(email=email)
@@ -236,16 +270,17 @@ class UserService(ABC, UserHelperMixin):
         template_data = {
             "url": absolute_url,
         }
-        body = TemplateRenderer.render_template(
-            template_data, TemplatePath.EMAIL_EMAIL_CHANGE_TXT
-        )
-
-        await self.task_service.create_task(
-            send_mail,
-            subject="Подтверждение изменения почты",
-            body=body,
-            recipients=[email],
-        )
+        async with self.uow:
+            await MailOutbox.add(
+                self.uow,
+                MassEmailItem(
+                    subject="Подтверждение изменения почты",
+                    template=TemplatePath.EMAIL_EMAIL_CHANGE_TXT,
+                    context=template_data,
+                    recipients=[email],
+                ),
+            )
+            await self.uow.commit()
 
     async def change_email(self, token: str, email: str) -> UserProtocol:
         """
@@ -283,5 +318,12 @@ class UserService(ABC, UserHelperMixin):
         return updated_user
 
 
-async def get_user_service() -> AsyncGenerator[UserService, Any]:
-    yield UserService()
+async def get_user_service(
+    container: ServiceContainer = Depends(get_service_container),
+) -> AsyncGenerator[UserService, Any]:
+    yield UserService(
+        uow=SQLAlchemyUoW(),
+        password_helper=container.password_helper,
+        token_generator=container.token_generator,
+        password_validators=container.password_validators,
+    )
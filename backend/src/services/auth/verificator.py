@@ -1,19 +1,21 @@
 from typing import Any, AsyncGenerator, Optional, Union
 from uuid import UUID
 
+from fastapi import Depends
 from pydantic import HttpUrl
 
 from src.core.types.user import UserProtocol
+from src.services.auth.container import ServiceContainer, get_service_container
 from src.services.auth.exceptions import InvalidTokenError as AuthInvalidToken
 from src.services.auth.exceptions import UserAlreadyVerified
 from src.services.auth.mixins import UserHelperMixin
 from src.services.auth.password import PasslibPasswordHelper, PasswordHelperABC
+from src.services.mail import MassEmailItem
+from src.services.mail.outbox import MailOutbox
 from src.services.parsers import URLParser
-from src.services.renderers import template_renderer
 from src.services.secrets import CryptoUserTokenGenerator, UserTokenGeneratorABC
 from src.services.secrets.exceptions import InvalidToken
-from src.services.tasks import TaskServiceABC, celery_task_service
-from src.tasks import send_mail
+from src.services.validators.base import ValidatorABC
 from src.templates import TemplatePath
 from src.utils.uow import SQLAlchemyUoW, UoWABC
 
@@ -24,14 +26,13 @@ class UserVerificator(UserHelperMixin):
     uow: UoWABC
     password_helper: PasswordHelperABC
     token_generator: UserTokenGeneratorABC
-    task_service: TaskServiceABC
 
     def __init__(
         self,
         uow: Optional[UoWABC] = None,
         password_helper: Optional[PasswordHelperABC] = None,
         token_generator: Optional[UserTokenGeneratorABC] = None,
-        task_service: TaskServiceABC = celery_task_service,
+        password_validators: Optional[list[ValidatorABC]] = None,
     ):
         self.uow = uow if uow else SQLAlchemyUoW()
         self.password_helper = (
@@ -40,24 +41,22 @@ class UserVerificator(UserHelperMixin):
         self.token_generator = (
             token_generator if token_generator else CryptoUserTokenGenerator()
         )
-        self.task_service = task_service
+        self._password_validators = password_validators
 
     async def verify_email_request(
         self,
         user: UserProtocol,
         frontend_url: Union[str, HttpUrl],
         template: TemplatePath = TemplatePath.EMAIL_EMAIL_VERIFY_TXT,
-        fail_silently: bool = False,
     ) -> None:
         """
         Отправляет запрос на подтверждение почты
 
         :param user: Пользователь
         :param frontend_url: URL адрес frontend
-        :param mail_service: Сервис по отправке email
-        :param fail_silently: Не возбуждать ошибок при отправке
+        :param template: Шаблон письма
         :raises UserAlreadyVerified: Пользователь уже подтвердил свой email
-        :raises MailServiceError: Ошибка отправки сообщения
+        :raises MailServiceError: Ошибка постановки письма в очередь
         """
 
         if user.is_verified:
@@ -69,17 +68,17 @@ class UserVerificator(UserHelperMixin):
         base_url = base_url.rstrip("/")
         absolute_url = f"{base_url}?token={token_encoded}"
 
-        body = template_renderer.render_template(
-            {"url": absolute_url}, template
-        )
-
-        await self.task_service.create_task(
-            send_mail,
-            subject="Подтверждение почты",
-            body=body,
-            recipients=[user.email],
-            fail_silently=fail_silently,
-        )
+        async with self.uow:
+            await MailOutbox.add(
+                self.uow,
+                MassEmailItem(
+                    subject="Подтверждение почты",
+                    template=template,
+                    context={"url": absolute_url},
+                    recipients=[user.email],
+                ),
+            )
+            await self.uow.commit()
 
     async def verify_email(self, token: str) -> UserProtocol:
         """
@@ -109,15 +108,12 @@ class UserVerificator(UserHelperMixin):
         self,
         email: str,
         frontend_url: Union[str, HttpUrl],
-        fail_silently: bool = False,
     ) -> None:
         """
         Отравляет ссылку для смены пароля на email пользователя
 
         :param email: Email телефона пользователя
         :param frontend_url: URL адреса frontend
-        :param mail_service: Сервис по отправке
-        :param fail_silently: Не возбуждать ошибок при отправке
         :raises UserNotExist: Такого пользователя не существует
         """
 
@@ -129,18 +125,17 @@ class UserVerificator(UserHelperMixin):
         base_url = base_url.rstrip("/")
         absolute_url = f"{base_url}?token={token_encoded}"
 
-        body = template_renderer.render_template(
-            {"url": absolute_url},
-            TemplatePath.EMAIL_PASSWORD_RESET_TXT,
-        )
-
-        await self.task_service.create_task(
-            send_mail,
-            subject="Восстановление пароля",
-            body=body,
-            recipients=[user.email],
-            fail_silently=fail_silently,
-        )
+        async with self.uow:
+            await MailOutbox.add(
+                self.uow,
+                MassEmailItem(
+                    subject="Восстановление пароля",
+                    template=TemplatePath.EMAIL_PASSWORD_RESET_TXT,
+                    context={"url": absolute_url},
+                    recipients=[user.email],
+                ),
+            )
+            await self.uow.commit()
 
     async def reset_password(self, token: str, new_password: str) -> UserProtocol:
         """
@@ -176,5 +171,12 @@ class UserVerificator(UserHelperMixin):
         return user
 
 
-async def get_user_verificator() -> AsyncGenerator[UserVerificator, Any]:
-    yield UserVerificator()
+async def get_user_verificator(
+    container: ServiceContainer = Depends(get_service_container),
+) -> AsyncGenerator[UserVerificator, Any]:
+    yield UserVerificator(
+        uow=SQLAlchemyUoW(),
+        password_helper=container.password_helper,
+        token_generator=container.token_generator,
+        password_validators=container.password_validators,
+    )
@@ -1,11 +1,14 @@
 from .email.backend import (
+    EmailAsyncSMTPBackend,
     EmailBackendABC,
     EmailConsoleBackend,
     EmailLocmemBackend,
+    EmailSchedulerBackend,
     EmailSMTPBackend,
 )
 from .email.backend.exceptions import EmailBackendError
 from .email.message import EmailMessage, EmailMultiAlternatives
+from .email.schemas import MassEmailItem, MassEmailResult
 from .email.service import (
     EmailService,
     email_service,
@@ -15,13 +18,17 @@ from .email.service import (
 email_outbox: list[EmailMessage] = []
 
 __all__ = [
+    "EmailAsyncSMTPBackend",
     "EmailBackendABC",
     "EmailConsoleBackend",
     "EmailLocmemBackend",
+    "EmailSchedulerBackend",
     "EmailSMTPBackend",
     "EmailBackendError",
     "EmailMultiAlternatives",
     "EmailMessage",
+    "MassEmailItem",
+    "MassEmailResult",
     "EmailService",
     "email_service",
     "get_email_service",
@@ -1,11 +1,16 @@
-from .base import EmailBackendABC
+from .base import EmailBackendABC, SendResult
 from .smtp import EmailSMTPBackend
+from .aiosmtp import EmailAsyncSMTPBackend
 from .console import EmailConsoleBackend
 from .locmem import EmailLocmemBackend
+from .scheduler import EmailSchedulerBackend
 
 __all__ = [
     "EmailBackendABC",
     "EmailSMTPBackend",
+    "EmailAsyncSMTPBackend",
     "EmailConsoleBackend",
     "EmailLocmemBackend",
+    "EmailSchedulerBackend",
+    "SendResult",
 ]
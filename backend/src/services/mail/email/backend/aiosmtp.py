@@ -0,0 +1,558 @@
+import asyncio
+import smtplib
+from base64 import b64encode
+from collections import deque
+from collections.abc import Iterable
+from functools import cached_property
+from logging import getLogger
+from re import compile as compile_regex
+from socket import getfqdn
+from ssl import PROTOCOL_TLS_CLIENT, SSLContext, SSLError, create_default_context
+from threading import Lock
+from time import monotonic
+from typing import BinaryIO, Optional, Union
+from weakref import WeakKeyDictionary
+
+from src.core.config import settings
+from src.services.mail.email.backend.base import (
+    NOT_SENT_REASON,
+    EmailBackendABC,
+    SendResult,
+)
+from src.services.mail.email.backend.exceptions import EmailBackendError
+from src.services.mail.email.backend.smtp import get_error_code, iter_quoted_data
+from src.services.mail.email.message import EmailMessage
+from src.tracing import tracer
+
+logger = getLogger(__name__)
+
+CRLF = b"\r\n"
+LEADING_PERIOD_REGEX = compile_regex(rb"(?m)^\.")
+BARE_EOL_REGEX = compile_regex(rb"(?:\r\n|\n|\r(?!\n))")
+ACCEPTED_RCPT_CODES = (250, 251)
+# Ответ вместо команды, которая не была отправлена
+NOT_SENT_REPLY = (503, b"")
+MAX_REPLY_LINE = 8192
+
+
+class AsyncSMTPConnection:
+    """
+    SMTP сессия поверх asyncio потоков.
+
+    Поддерживает SSL и STARTTLS, AUTH PLAIN/LOGIN и расширение PIPELINING:
+    команды MAIL, RCPT и DATA одной транзакции отправляются одной записью,
+    ответы читаются после. Ошибки - исключения `smtplib`, как у синхронного бэкенда
+
+    :param host: Хост SMTP сервера
+    :param port: Порт SMTP сервера
+    :param timeout: Таймаут подключения и ответа сервера в секундах
+    :param ssl_context: SSL контекст для SSL и STARTTLS
+    :param use_ssl: Подключаться по SSL
+    :param use_tls: Переходить на TLS командой STARTTLS
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float],
+        ssl_context: SSLContext,
+        use_ssl: bool = False,
+        use_tls: bool = False,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self.use_ssl = use_ssl
+        self.use_tls = use_tls
+        self.extensions: dict[str, str] = {}
+        self.created_at = monotonic()
+        self.last_used = self.created_at
+        self.sent_count = 0
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self, username: Optional[str], password: Optional[str]) -> None:
+        """
+        Подключение, приветствие, STARTTLS и авторизация
+
+        :raises smtplib.SMTPException: Ошибка SMTP
+        :raises OSError: Ошибка подключения
+        """
+
+        async with asyncio.timeout(self.timeout):
+            self._reader, self._writer = await asyncio.open_connection(
+                self.host,
+                self.port,
+                ssl=self.ssl_context if self.use_ssl else None,
+                limit=MAX_REPLY_LINE,
+            )
+
+        try:
+            code, message = await self._read_reply()
+            if code != 220:
+                raise smtplib.SMTPConnectError(code, message)
+            await self._ehlo()
+
+            if self.use_tls:
+                if "starttls" not in self.extensions:
+                    raise smtplib.SMTPNotSupportedError(
+                        "Сервер не поддерживает STARTTLS"
+                    )
+                await self._command(b"STARTTLS", 220)
+                async with asyncio.timeout(self.timeout):
+                    await self._writer.start_tls(
+                        self.ssl_context, server_hostname=self.host
+                    )
+                await self._ehlo()
+
+            if username and password:
+                await self._login(username, password)
+        except BaseException:
+            self.close()
+            raise
+
+    async def send(
+        self, from_email: str, recipients: list[str], data: Union[bytes, BinaryIO]
+    ) -> dict[str, tuple[int, bytes]]:
+        """
+        Отправляет одно сообщение
+
+        :param from_email: Отправитель
+        :param recipients: Получатели
+        :param data: Сообщение или файл сообщения с переводами строк CRLF,
+            файл передаётся серверу частями
+        :raises smtplib.SMTPSenderRefused: Сервер не принял отправителя
+        :raises smtplib.SMTPRecipientsRefused: Сервер не принял ни одного получателя
+        :raises smtplib.SMTPDataError: Сервер не принял сообщение
+        :return: Получатели, которых не принял сервер
+        """
+
+        commands = [f"MAIL FROM:<{from_email}>".encode()]
+        commands.extend(f"RCPT TO:<{email}>".encode() for email in recipients)
+        commands.append(b"DATA")
+
+        if "pipelining" in self.extensions:
+            self._write(CRLF.join(commands) + CRLF)
+            await self._drain()
+            replies = [await self._read_reply() for _ in commands]
+        else:
+            replies = await self._exchange_sequentially(commands)
+
+        mail_reply, *rcpt_replies, data_reply = replies
+        refused = {
+            email: reply
+            for email, reply in zip(recipients, rcpt_replies)
+            if reply[0] not in ACCEPTED_RCPT_CODES
+        }
+
+        failed = mail_reply[0] != 250 or len(refused) == len(recipients)
+        if data_reply[0] == 354 and failed:
+            # Сервер начал приём тела, хотя транзакция не сложилась
+            self._write(b"." + CRLF)
+            await self._read_reply()
+            data_reply = NOT_SENT_REPLY
+
+        if mail_reply[0] != 250:
+            await self._reset()
+            raise smtplib.SMTPSenderRefused(*mail_reply, from_email)
+        if len(refused) == len(recipients):
+            await self._reset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+        if data_reply[0] != 354:
+            await self._reset()
+            raise smtplib.SMTPDataError(*data_reply)
+
+        if isinstance(data, bytes):
+            self._write(quote_data(data))
+        else:
+            for chunk in iter_quoted_data(data, settings.EMAIL.STREAM_BUFFER_SIZE):
+                self._write(chunk)
+                await self._drain()
+        self._write(b"." + CRLF)
+        await self._drain()
+        code, message = await self._read_reply()
+        if code != 250:
+            await self._reset()
+            raise smtplib.SMTPDataError(code, message)
+
+        self.sent_count += 1
+        self.last_used = monotonic()
+        return refused
+
+    async def _exchange_sequentially(
+        self, commands: list[bytes]
+    ) -> list[tuple[int, bytes]]:
+        """
+        Команды транзакции по одной, для серверов без PIPELINING.
+        Команды после отказа в MAIL или во всех RCPT не отправляются
+        """
+
+        replies = []
+        for command in commands:
+            self._write(command + CRLF)
+            replies.append(await self._read_reply())
+            if len(replies) == 1 and replies[0][0] != 250:
+                break
+            if len(replies) == len(commands) - 1 and not any(
+                code in ACCEPTED_RCPT_CODES for code, _ in replies[1:]
+            ):
+                break
+
+        return replies + [NOT_SENT_REPLY] * (len(commands) - len(replies))
+
+    async def noop(self) -> bool:
+        """Проверка соединения командой NOOP"""
+
+        try:
+            self._write(b"NOOP" + CRLF)
+            code, _ = await self._read_reply()
+        except (smtplib.SMTPException, OSError):
+            return False
+        return code == 250
+
+    async def quit(self) -> None:
+        try:
+            self._write(b"QUIT" + CRLF)
+            await self._read_reply()
+        except (smtplib.SMTPException, OSError):
+            pass
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _ehlo(self) -> None:
+        self._write(b"EHLO " + self.local_hostname + CRLF)
+        code, message = await self._read_reply()
+        if code != 250:
+            await self._command(b"HELO " + self.local_hostname, 250)
+            self.extensions = {}
+            return
+
+        extensions = {}
+        for line in message.decode("latin-1").splitlines()[1:]:
+            name, _, params = line.partition(" ")
+            extensions[name.lower()] = params.strip()
+        self.extensions = extensions
+
+    async def _login(self, username: str, password: str) -> None:
+        mechanisms = self.extensions.get("auth", "").upper().split()
+        try:
+            if "PLAIN" in mechanisms or "LOGIN" not in mechanisms:
+                token = b64encode(f"\0{username}\0{password}".encode())
+                await self._command(b"AUTH PLAIN " + token, 235)
+            else:
+                await self._command(b"AUTH LOGIN", 334)
+                await self._command(b64encode(username.encode()), 334)
+                await self._command(b64encode(password.encode()), 235)
+        except smtplib.SMTPResponseException as e:
+            raise smtplib.SMTPAuthenticationError(e.smtp_code, e.smtp_error)
+
+    async def _reset(self) -> None:
+        try:
+            await self._command(b"RSET", 250)
+        except smtplib.SMTPResponseException:
+            pass
+
+    async def _command(self, command: bytes, expected_code: int) -> bytes:
+        self._write(command + CRLF)
+        code, message = await self._read_reply()
+        if code != expected_code:
+            raise smtplib.SMTPResponseException(code, message)
+        return message
+
+    def _write(self, data: bytes) -> None:
+        if not self.is_connected:
+            raise smtplib.SMTPServerDisconnected("Соединение с сервером закрыто")
+        self._writer.write(data)
+
+    async def _drain(self) -> None:
+        async with asyncio.timeout(self.timeout):
+            await self._writer.drain()
+
+    async def _read_reply(self) -> tuple[int, bytes]:
+        """Многострочный ответ сервера: код и текст строк через перевод строки"""
+
+        if self._reader is None:
+            raise smtplib.SMTPServerDisconnected("Соединение с сервером закрыто")
+
+        lines = []
+        async with asyncio.timeout(self.timeout):
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    self.close()
+                    raise smtplib.SMTPServerDisconnected(
+                        "Сервер неожиданно закрыл соединение"
+                    )
+                lines.append(line[4:].strip())
+                try:
+                    code = int(line[:3])
+                except ValueError:
+                    self.close()
+                    raise smtplib.SMTPServerDisconnected("Некорректный ответ сервера")
+                if line[3:4] != b"-":
+                    break
+
+        return code, b"\n".join(lines)
+
+    @cached_property
+    def local_hostname(self) -> bytes:
+        return getfqdn().encode("idna")
+
+
+def quote_data(data: bytes) -> bytes:
+    """Приводит переводы строк к CRLF и экранирует точки в начале строк"""
+
+    data = LEADING_PERIOD_REGEX.sub(b"..", BARE_EOL_REGEX.sub(CRLF, data))
+    if not data.endswith(CRLF):
+        data += CRLF
+    return data
+
+
+class LoopConnectionPool:
+    """
+    Простаивающие соединения и семафор одного event loop.
+    Транспорт соединения привязан к loop, в котором открыт
+
+    :param max_connections: Максимальное количество одновременных соединений
+    """
+
+    __slots__ = ("idle", "semaphore")
+
+    def __init__(self, max_connections: int) -> None:
+        self.idle: deque[AsyncSMTPConnection] = deque()
+        self.semaphore = asyncio.Semaphore(max_connections)
+
+
+class EmailAsyncSMTPBackend(EmailBackendABC):
+    """
+    Отправка сообщений через SMTP на asyncio потоках.
+
+    Не блокирует event loop, поэтому подходит для отправки из FastAPI
+    и asyncio воркеров. Сообщения отправляются конкурентно через несколько
+    соединений, не более `max_connections`, простаивающие соединения
+    переиспользуются так же, как в пуле синхронного бэкенда.
+    Синхронный `send_messages` запускает отправку в собственном event loop.
+    Пул свой у каждого event loop, поэтому экземпляр можно использовать
+    из нескольких потоков и loop'ов одновременно, лимит соединений - на loop
+
+    :param max_connections: Максимальное количество одновременных соединений
+    """
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        timeout: Optional[int] = None,
+        use_tls: Optional[bool] = None,
+        use_ssl: Optional[bool] = None,
+        ssl_keyfile=None,
+        ssl_certfile=None,
+        fail_silently: bool = False,
+        max_connections: Optional[int] = None,
+        **kwargs,
+    ):
+        super().__init__(fail_silently=fail_silently)
+
+        self.host = host or settings.EMAIL.HOST
+        self.port = int(port or settings.EMAIL.PORT)
+        self.username = settings.EMAIL.USERNAME if username is None else username
+        self.password = settings.EMAIL.PASSWORD if password is None else password
+        self.use_tls = settings.EMAIL.USE_TLS if use_tls is None else use_tls
+        self.use_ssl = settings.EMAIL.USE_SSL if use_ssl is None else use_ssl
+        self.timeout = settings.EMAIL.TIMEOUT if timeout is None else timeout
+
+        if self.use_ssl and self.use_tls:
+            raise ValueError("Нельзя передавать сразу и use_ssl и use_tls")
+
+        self.ssl_keyfile = (
+            settings.EMAIL.SSL_KEYFILE if ssl_keyfile is None else ssl_keyfile
+        )
+        self.ssl_certfile = (
+            settings.EMAIL.SSL_CERTFILE if ssl_certfile is None else ssl_certfile
+        )
+        self.max_connections = max_connections or settings.EMAIL.POOL_SIZE
+        self.idle_timeout = settings.EMAIL.POOL_IDLE_TIMEOUT
+        self.keepalive_interval = settings.EMAIL.POOL_KEEPALIVE_INTERVAL
+        self.max_messages = settings.EMAIL.POOL_MAX_MESSAGES
+
+        self._pools: WeakKeyDictionary[
+            asyncio.AbstractEventLoop, LoopConnectionPool
+        ] = WeakKeyDictionary()
+        self._pools_lock = Lock()
+
+    def send_messages(
+        self, messages: Union[list[EmailMessage], Iterable[EmailMessage]]
+    ) -> int:
+        return asyncio.run(self._send_messages_in_new_loop(list(messages)))
+
+    def send_batch(
+        self, messages: Union[list[EmailMessage], Iterable[EmailMessage]]
+    ) -> list[SendResult]:
+        return asyncio.run(self._send_batch_in_new_loop(list(messages)))
+
+    async def asend_messages(
+        self, messages: Union[list[EmailMessage], Iterable[EmailMessage]]
+    ) -> int:
+        results = await self.asend_batch(messages)
+        errors = [result.error for result in results if not result.sent]
+        if errors and not self.fail_silently:
+            raise EmailBackendError(reason=errors[0])
+        return sum(result.sent for result in results)
+
+    async def asend_batch(
+        self, messages: Union[list[EmailMessage], Iterable[EmailMessage]]
+    ) -> list[SendResult]:
+        """Отправляет сообщения конкурентно, каждое через своё соединение из пула"""
+        return list(
+            await asyncio.gather(*(self._send_result(message) for message in messages))
+        )
+
+    async def aclose(self) -> None:
+        """Закрывает простаивающие соединения текущего event loop"""
+
+        with self._pools_lock:
+            pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is None:
+            return
+
+        while pool.idle:
+            await pool.idle.pop().quit()
+
+    async def _send_result(self, message: EmailMessage) -> SendResult:
+        if not message.recipients:
+            return SendResult(False, NOT_SENT_REASON)
+
+        pool = self._get_pool()
+        async with pool.semaphore:
+            try:
+                await self._send(pool, message)
+            except (smtplib.SMTPException, SSLError, OSError, TimeoutError) as e:
+                logger.warning("Ошибка при отправке сообщения", exc_info=e)
+                return SendResult(
+                    False, str(e) or e.__class__.__name__, get_error_code(e)
+                )
+
+        return SendResult(True)
+
+    async def _send(
+        self, pool: LoopConnectionPool, message: EmailMessage
+    ) -> None:
+        attributes = {"smtp.host": self.host, "smtp.recipients": len(message.recipients)}
+        with tracer.span("smtp.send", kind="client", attributes=attributes):
+            # Кодирование вложений читает файлы, event loop не блокируется
+            message_file = await asyncio.to_thread(message.message_file)
+            with message_file:
+                connection = await self._acquire(pool)
+                try:
+                    await self._send_over(connection, message, message_file)
+                except smtplib.SMTPServerDisconnected:
+                    # Соединение из пула закрыто сервером, повторяем через новое
+                    connection.close()
+                    connection = await self._acquire(pool, reuse=False)
+                    message_file.seek(0)
+                    await self._send_over(connection, message, message_file)
+                finally:
+                    await self._release(pool, connection)
+
+    @staticmethod
+    async def _send_over(
+        connection: AsyncSMTPConnection,
+        message: EmailMessage,
+        data: Union[bytes, BinaryIO],
+    ) -> None:
+        try:
+            await connection.send(message.from_email, message.recipients, data)
+        except (TimeoutError, OSError, smtplib.SMTPServerDisconnected):
+            # Состояние сессии неизвестно, соединение не переиспользуется
+            connection.close()
+            raise
+
+    async def _acquire(
+        self, pool: LoopConnectionPool, reuse: bool = True
+    ) -> AsyncSMTPConnection:
+        while reuse and pool.idle:
+            connection = pool.idle.pop()
+            idle_time = monotonic() - connection.last_used
+            if idle_time >= self.idle_timeout or not connection.is_connected:
+                await connection.quit()
+            elif idle_time < self.keepalive_interval or await connection.noop():
+                return connection
+            else:
+                connection.close()
+
+        connection = AsyncSMTPConnection(
+            self.host,
+            self.port,
+            self.timeout,
+            self.ssl_context,
+            use_ssl=self.use_ssl,
+            use_tls=self.use_tls,
+        )
+        await connection.connect(self.username, self.password)
+        return connection
+
+    async def _release(
+        self, pool: LoopConnectionPool, connection: AsyncSMTPConnection
+    ) -> None:
+        if (
+            connection.is_connected
+            and connection.sent_count < self.max_messages
+            and len(pool.idle) < self.max_connections
+        ):
+            connection.last_used = monotonic()
+            pool.idle.append(connection)
+        else:
+            await connection.quit()
+
+    def _get_pool(self) -> LoopConnectionPool:
+        """Пул текущего event loop, удаляется вместе с завершённым loop"""
+
+        loop = asyncio.get_running_loop()
+        with self._pools_lock:
+            pool = self._pools.get(loop)
+            if pool is None:
+                pool = self._pools[loop] = LoopConnectionPool(self.max_connections)
+        return pool
+
+    async def _send_messages_in_new_loop(self, messages: list[EmailMessage]) -> int:
+        try:
+            return await self.asend_messages(messages)
+        finally:
+            await self.aclose()
+
+    async def _send_batch_in_new_loop(
+        self, messages: list[EmailMessage]
+    ) -> list[SendResult]:
+        try:
+            return await self.asend_batch(messages)
+        finally:
+            await self.aclose()
+
+    def _open(self) -> Optional[bool]:
+        # Соединения открываются в event loop при отправке
+        pass
+
+    def _close(self) -> None:
+        pass
+
+    @cached_property
+    def ssl_context(self) -> SSLContext:
+        if self.ssl_certfile or self.ssl_keyfile:
+            ssl_context = SSLContext(protocol=PROTOCOL_TLS_CLIENT)
+            ssl_context.load_cert_chain(self.ssl_certfile, self.ssl_keyfile)
+            return ssl_context
+
+        return create_default_context()
@@ -1,8 +1,30 @@
 from abc import ABC, abstractmethod
-from typing import Iterable, Optional, Union
+from asyncio import to_thread
+from typing import Iterable, NamedTuple, Optional, Union
 
 from src.services.mail.email.message import EmailMessage
 
+NOT_SENT_REASON = "Сообщение не отправлено"
+
+
+class SendResult(NamedTuple):
+    """
+    Результат отправки одного сообщения пачки
+
+    :param sent: Отправлено ли сообщение
+    :param error: Причина ошибки отправки
+    :param code: Код ответа SMTP сервера при ошибке
+    """
+
+    sent: bool
+    error: Optional[str] = None
+    code: Optional[int] = None
+
+    @property
+    def transient(self) -> bool:
+        """Временная ошибка (4xx), отправку можно повторить позже"""
+        return self.code is not None and 400 <= self.code < 500
+
 
 class EmailBackendABC(ABC):
     """Абстрактный класс бэкенда отправки сообщений"""
@@ -22,6 +44,47 @@ class EmailBackendABC(ABC):
         """
         raise NotImplementedError
 
+    def send_batch(
+        self, messages: Union[list[EmailMessage], Iterable[EmailMessage]]
+    ) -> list[SendResult]:
+        """
+        Отправляет сообщения по одному, ошибка отправки одного сообщения
+        не прерывает отправку остальных
+
+        :param messages: Список из экземпляров EmailMessage
+        :return: Результат отправки каждого сообщения в порядке передачи
+        """
+
+        results = []
+        for message in messages:
+            try:
+                sent = self.send_messages([message])
+            except Exception as e:
+                results.append(SendResult(False, str(e)))
+            else:
+                error = None if sent else NOT_SENT_REASON
+                results.append(SendResult(bool(sent), error))
+        return results
+
+    async def asend_messages(
+        self, messages: Union[list[EmailMessage], Iterable[EmailMessage]]
+    ) -> int:
+        """
+        Асинхронная отправка сообщений.
+        По умолчанию синхронная отправка выполняется в отдельном потоке
+        """
+        return await to_thread(self.send_messages, list(messages))
+
+    async def asend_batch(
+        self, messages: Union[list[EmailMessage], Iterable[EmailMessage]]
+    ) -> list[SendResult]:
+        """Асинхронный вариант `send_batch`"""
+        return await to_thread(self.send_batch, list(messages))
+
+    async def aclose(self) -> None:
+        """Асинхронный вариант `close`"""
+        self.close()
+
     @abstractmethod
     def _open(self) -> Optional[bool]:
         """Открывает соединение"""
@@ -32,6 +95,10 @@ class EmailBackendABC(ABC):
         """Закрывает соединение"""
         raise NotImplementedError
 
+    def close(self) -> None:
+        """Закрывает соединения, которые бэкенд держит между отправками"""
+        pass
+
     def __enter__(self):
         self._open()
         return self
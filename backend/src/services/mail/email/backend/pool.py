@@ -0,0 +1,140 @@
+import smtplib
+from collections import deque
+from logging import getLogger
+from os import getpid
+from ssl import SSLError
+from threading import Lock
+from time import monotonic
+from typing import Callable, Optional
+
+logger = getLogger(__name__)
+
+NOOP_OK_CODE = 250
+
+
+class PooledConnection:
+    """
+    Соединение с SMTP сервером из пула
+
+    :param connection: Открытое и авторизованное соединение
+    """
+
+    __slots__ = ("connection", "created_at", "last_used", "sent_count")
+
+    def __init__(self, connection: smtplib.SMTP) -> None:
+        self.connection = connection
+        self.created_at = monotonic()
+        self.last_used = self.created_at
+        self.sent_count = 0
+
+
+class SMTPConnectionPool:
+    """
+    Пул SMTP соединений процесса.
+
+    Соединение, простоявшее дольше `keepalive_interval` секунд, перед выдачей
+    проверяется командой NOOP, дольше `idle_timeout` - закрывается.
+    После `max_messages` отправленных сообщений соединение закрывается,
+    чтобы сервер не разрывал его по своему лимиту посреди отправки.
+    После fork пул процесса начинается пустым
+
+    :param connect: Функция, открывающая новое соединение
+    :param max_size: Максимальное количество простаивающих соединений
+    :param idle_timeout: Время простоя в секундах, после которого соединение закрывается
+    :param keepalive_interval: Время простоя в секундах, после которого соединение проверяется
+    :param max_messages: Максимальное количество сообщений на одно соединение
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], smtplib.SMTP],
+        max_size: int,
+        idle_timeout: float,
+        keepalive_interval: float,
+        max_messages: int,
+    ) -> None:
+        self.connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.max_messages = max_messages
+        self._idle: deque[PooledConnection] = deque()
+        self._lock = Lock()
+        self._pid = getpid()
+
+    def acquire(self) -> PooledConnection:
+        """
+        Живое соединение из пула или новое
+
+        :raises OSError: Ошибка подключения
+        :raises smtplib.SMTPException: Ошибка SMTP при подключении
+        """
+
+        while True:
+            pooled = self._pop_idle()
+            if pooled is None:
+                return PooledConnection(self.connect())
+
+            idle_time = monotonic() - pooled.last_used
+            if idle_time >= self.idle_timeout:
+                self.discard(pooled)
+            elif idle_time < self.keepalive_interval or self._is_alive(pooled):
+                return pooled
+
+    def release(self, pooled: PooledConnection) -> None:
+        """Возвращает соединение в пул после отправки"""
+
+        pooled.last_used = monotonic()
+        if self.is_exhausted(pooled):
+            self.discard(pooled)
+            return
+
+        with self._lock:
+            if self._pid == getpid() and len(self._idle) < self.max_size:
+                self._idle.append(pooled)
+                return
+        self.discard(pooled)
+
+    def discard(self, pooled: PooledConnection) -> None:
+        """Закрывает соединение, не возвращая его в пул"""
+
+        try:
+            pooled.connection.quit()
+        except (smtplib.SMTPException, SSLError, OSError):
+            pooled.connection.close()
+
+    def is_exhausted(self, pooled: PooledConnection) -> bool:
+        """Исчерпан ли лимит сообщений соединения"""
+        return pooled.sent_count >= self.max_messages
+
+    def close(self) -> None:
+        """Закрывает все простаивающие соединения"""
+
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        if self._pid != getpid():
+            return
+        for pooled in idle:
+            self.discard(pooled)
+
+    def _pop_idle(self) -> Optional[PooledConnection]:
+        with self._lock:
+            if self._pid != getpid():
+                # Сокеты родительского процесса не используются и не закрываются
+                self._idle.clear()
+                self._pid = getpid()
+            # Последнее возвращённое соединение простаивало меньше всех
+            return self._idle.pop() if self._idle else None
+
+    def _is_alive(self, pooled: PooledConnection) -> bool:
+        try:
+            code, _ = pooled.connection.noop()
+        except (smtplib.SMTPException, SSLError, OSError):
+            code = None
+
+        if code == NOOP_OK_CODE:
+            return True
+
+        logger.debug("SMTP соединение из пула закрыто сервером")
+        pooled.connection.close()
+        return False
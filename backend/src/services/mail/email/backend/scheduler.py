@@ -0,0 +1,493 @@
+from collections.abc import Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from heapq import heappop, heappush
+from itertools import count
+from logging import getLogger
+from random import uniform
+from threading import Lock, local
+from time import monotonic, sleep
+from typing import NamedTuple, Optional, Union
+
+from src.core.config import settings
+from src.metrics import MailMetrics, metrics_service
+from src.services.mail.email.backend.base import (
+    NOT_SENT_REASON,
+    EmailBackendABC,
+    SendResult,
+)
+from src.services.mail.email.backend.exceptions import EmailBackendError
+from src.services.mail.email.message import EmailMessage
+from src.utils.loading import import_string
+
+logger = getLogger(__name__)
+
+# Как часто проверять домен, все отправки которого заняты другим вызовом
+BUSY_DOMAIN_POLL_INTERVAL = 0.05
+# Как часто удалять состояние простаивающих доменов, в секундах
+IDLE_DOMAINS_SWEEP_INTERVAL = 60
+# Метка метрик для доменов без своих лимитов, домены получателей не ограничены
+OTHER_DOMAIN_LABEL = "other"
+
+
+class DomainLimits(NamedTuple):
+    """
+    Лимиты отправки на один домен
+
+    :param rate: Сообщений в секунду
+    :param burst: Сообщений, которые можно отправить сразу после простоя
+    :param concurrency: Одновременных отправок
+    """
+
+    rate: float
+    burst: int
+    concurrency: int
+
+
+class DeliveryResult(NamedTuple):
+    """
+    Результат доставки сообщения получателям одного домена
+
+    :param index: Номер сообщения в переданных
+    :param domain: Домен получателей
+    :param recipients: Получатели
+    :param sent: Доставлено ли сообщение
+    :param attempts: Количество попыток
+    :param error: Причина ошибки последней попытки
+    :param code: Код ответа SMTP сервера последней попытки
+    """
+
+    index: int
+    domain: str
+    recipients: list[str]
+    sent: bool
+    attempts: int
+    error: Optional[str] = None
+    code: Optional[int] = None
+
+
+class TokenBucket:
+    """
+    Ограничение частоты: `rate` токенов в секунду, не больше `capacity`
+
+    :param rate: Скорость пополнения в секунду
+    :param capacity: Размер корзины
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = monotonic()
+
+    def reserve(self, now: float) -> float:
+        """
+        Берёт токен, если он есть
+
+        :param now: Текущее время `monotonic`
+        :return: `0` - токен взят, иначе через сколько секунд он появится
+        """
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class DomainState:
+    """Лимиты и текущая нагрузка на домен"""
+
+    __slots__ = ("limits", "bucket", "active", "paused_until")
+
+    def __init__(self, limits: DomainLimits) -> None:
+        self.limits = limits
+        self.bucket = TokenBucket(limits.rate, limits.burst)
+        self.active = 0
+        self.paused_until = 0.0
+
+    def is_idle(self, now: float) -> bool:
+        """Совпадает ли состояние с новым: нет отправок, пауз и потраченных токенов"""
+
+        bucket = self.bucket
+        return (
+            not self.active
+            and now >= self.paused_until
+            and bucket.tokens + (now - bucket.updated) * bucket.rate >= bucket.capacity
+        )
+
+
+class Delivery:
+    """Сообщение для получателей одного домена"""
+
+    __slots__ = ("position", "index", "domain", "message", "attempts", "ready_at")
+
+    def __init__(
+        self, position: int, index: int, domain: str, message: EmailMessage
+    ) -> None:
+        self.position = position
+        self.index = index
+        self.domain = domain
+        self.message = message
+        self.attempts = 0
+        self.ready_at = 0.0
+
+
+class EmailSchedulerBackend(EmailBackendABC):
+    """
+    Доставка сообщений с учётом лимитов доменов получателей.
+
+    Получатели сообщения группируются по доменам, копия сообщения на каждый
+    домен отправляется отдельно. Для домена действуют token bucket и лимит
+    одновременных отправок, поэтому большая рассылка на один домен
+    не задерживает остальные. Временные отказы (4xx, обрыв соединения)
+    повторяются с экспоненциальной задержкой со случайной составляющей,
+    а домен после отказа ненадолго приостанавливается.
+    Состояние простаивающих доменов удаляется, метрики по доменам без своих
+    лимитов собираются под меткой `other`, так как домены задают пользователи.
+
+    Сообщения отправляются в `workers` потоках, у каждого потока свой
+    экземпляр бэкенда `backend` со своими соединениями
+
+    :param backend: Путь к классу бэкенда, через который отправляются сообщения
+    :param workers: Количество потоков отправки
+    :param max_attempts: Максимальное количество попыток доставки на домен
+    :param retry_delay: Задержка перед второй попыткой в секундах
+    :param max_retry_delay: Максимальная задержка между попытками в секундах
+    :param default_limits: Лимиты доменов по умолчанию
+    :param domain_limits: Лимиты отдельных доменов
+    :param metrics: Метрики доставки
+    :param kwargs: Параметры бэкенда `backend`
+    """
+
+    def __init__(
+        self,
+        fail_silently: bool = False,
+        backend: Optional[str] = None,
+        workers: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+        max_retry_delay: Optional[float] = None,
+        default_limits: Optional[DomainLimits] = None,
+        domain_limits: Optional[dict[str, DomainLimits]] = None,
+        metrics: Optional[MailMetrics] = None,
+        **kwargs,
+    ):
+        super().__init__(fail_silently=fail_silently)
+
+        self.backend_class = import_string(backend or settings.EMAIL.DELIVERY_BACKEND)
+        self.backend_kwargs = kwargs
+        self.workers = workers or settings.EMAIL.DELIVERY_WORKERS
+        self.max_attempts = max_attempts or settings.EMAIL.DELIVERY_MAX_ATTEMPTS
+        self.retry_delay = (
+            settings.EMAIL.DELIVERY_RETRY_DELAY if retry_delay is None else retry_delay
+        )
+        self.max_retry_delay = (
+            max_retry_delay or settings.EMAIL.DELIVERY_MAX_RETRY_DELAY
+        )
+        self.default_limits = default_limits or DomainLimits(
+            settings.EMAIL.DOMAIN_RATE,
+            settings.EMAIL.DOMAIN_BURST,
+            settings.EMAIL.DOMAIN_CONCURRENCY,
+        )
+        if domain_limits is None:
+            domain_limits = {
+                domain: DomainLimits(*limits)
+                for domain, limits in settings.EMAIL.DOMAIN_LIMITS.items()
+            }
+        self.domain_limits = domain_limits
+        self.metrics = metrics or metrics_service.mail
+
+        self._domains: dict[str, DomainState] = {}
+        self._swept_at = monotonic()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._backends: list[EmailBackendABC] = []
+        self._local = local()
+        self._lock = Lock()
+
+    def send_messages(
+        self, messages: Union[list[EmailMessage], Iterable[EmailMessage]]
+    ) -> int:
+        results = self.send_batch(messages)
+        failed = [result for result in results if not result.sent]
+        if failed and not self.fail_silently:
+            raise EmailBackendError(reason=failed[0].error)
+        return len(results) - len(failed)
+
+    def send_batch(
+        self, messages: Union[list[EmailMessage], Iterable[EmailMessage]]
+    ) -> list[SendResult]:
+        """
+        Доставляет сообщения, сообщение отправлено, если оно доставлено
+        на все домены получателей
+        """
+
+        messages = list(messages)
+        results = [SendResult(bool(message.recipients)) for message in messages]
+        for delivery in self.deliver(messages):
+            if not delivery.sent and results[delivery.index].sent:
+                results[delivery.index] = SendResult(
+                    False, delivery.error, delivery.code
+                )
+        return [
+            result
+            if result.sent or result.error
+            else SendResult(False, NOT_SENT_REASON)
+            for result in results
+        ]
+
+    def deliver(
+        self, messages: Union[list[EmailMessage], Iterable[EmailMessage]]
+    ) -> list[DeliveryResult]:
+        """
+        Доставляет сообщения получателям с учётом лимитов их доменов
+
+        :param messages: Сообщения
+        :return: Результат доставки на каждый домен каждого сообщения
+        """
+
+        deliveries = self._split(messages)
+        if not deliveries:
+            return []
+
+        started = monotonic()
+        results: dict[int, DeliveryResult] = {}
+        sequence = count()
+        ready: list[tuple[float, int, Delivery]] = []
+        busy: list[Delivery] = []
+        running: dict[Future, Delivery] = {}
+        deferred = 0
+
+        for delivery in deliveries:
+            delivery.ready_at = started
+            heappush(ready, (started, next(sequence), delivery))
+
+        while ready or busy or running:
+            now = monotonic()
+            while ready and ready[0][0] <= now:
+                _, _, delivery = heappop(ready)
+                wait_time = self._acquire(delivery.domain, now)
+                if wait_time is None:
+                    busy.append(delivery)
+                elif wait_time > 0:
+                    heappush(ready, (now + wait_time, next(sequence), delivery))
+                else:
+                    label = self.get_label(delivery.domain)
+                    self.metrics.throttled.labels(label).observe(
+                        now - delivery.ready_at
+                    )
+                    delivery.attempts += 1
+                    running[self.executor.submit(self._send, delivery)] = delivery
+
+            timeout = max(ready[0][0] - monotonic(), 0) if ready else None
+            if busy:
+                timeout = min(
+                    BUSY_DOMAIN_POLL_INTERVAL if timeout is None else timeout,
+                    BUSY_DOMAIN_POLL_INTERVAL,
+                )
+            if not running:
+                sleep(timeout or 0)
+                done = set()
+            else:
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            now = monotonic()
+            for future in done:
+                delivery = running.pop(future)
+                result = future.result()
+                retry_at = self._complete(delivery, result, now)
+                if retry_at is None:
+                    results[delivery.position] = DeliveryResult(
+                        delivery.index,
+                        delivery.domain,
+                        delivery.message.recipients,
+                        result.sent,
+                        delivery.attempts,
+                        result.error,
+                        result.code,
+                    )
+                else:
+                    deferred += 1
+                    delivery.ready_at = retry_at
+                    heappush(ready, (retry_at, next(sequence), delivery))
+
+            # Освободившиеся слоты доменов снова доступны ожидающим
+            for delivery in busy:
+                heappush(ready, (now, next(sequence), delivery))
+            busy.clear()
+
+        elapsed = monotonic() - started
+        delivered = sum(result.sent for result in results.values())
+        logger.info(
+            "Доставлено %s из %s писем за %.2f с (%.1f в секунду), временных отказов %s",
+            delivered,
+            len(results),
+            elapsed,
+            delivered / elapsed if elapsed else delivered,
+            deferred,
+        )
+        return [results[position] for position in range(len(deliveries))]
+
+    def get_retry_delay(self, attempt: int) -> float:
+        """
+        Задержка перед следующей попыткой в секундах:
+        экспоненциальная, со случайной составляющей до половины задержки
+
+        :param attempt: Номер неудавшейся попытки
+        """
+        delay = min(self.retry_delay * 2 ** (attempt - 1), self.max_retry_delay)
+        return uniform(delay / 2, delay)
+
+    def get_limits(self, domain: str) -> DomainLimits:
+        return self.domain_limits.get(domain, self.default_limits)
+
+    def get_label(self, domain: str) -> str:
+        """Метка домена в метриках, у доменов без своих лимитов - общая"""
+        return domain if domain in self.domain_limits else OTHER_DOMAIN_LABEL
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="mail-delivery"
+                )
+            return self._executor
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            backends, self._backends = self._backends, []
+        if executor is not None:
+            executor.shutdown(wait=True)
+        for backend in backends:
+            backend.close()
+
+    def _split(
+        self, messages: Union[list[EmailMessage], Iterable[EmailMessage]]
+    ) -> list[Delivery]:
+        """Копии сообщений по доменам получателей"""
+
+        deliveries: list[Delivery] = []
+        for index, message in enumerate(messages):
+            domains: dict[str, list[str]] = {}
+            for email in message.recipients:
+                domain = email.rpartition("@")[2].lower()
+                domains.setdefault(domain, []).append(email)
+
+            for domain, recipients in domains.items():
+                if len(domains) > 1:
+                    domain_message = message.for_recipients(recipients)
+                else:
+                    domain_message = message
+                deliveries.append(
+                    Delivery(len(deliveries), index, domain, domain_message)
+                )
+
+        return deliveries
+
+    def _acquire(self, domain: str, now: float) -> Optional[float]:
+        """
+        Занимает слот отправки на домен
+
+        :return: `0` - слот занят, `None` - все слоты домена заняты,
+            иначе через сколько секунд повторить
+        """
+
+        with self._lock:
+            if now - self._swept_at >= IDLE_DOMAINS_SWEEP_INTERVAL:
+                self._evict_idle_domains(now)
+
+            state = self._domains.get(domain)
+            if state is None:
+                state = self._domains[domain] = DomainState(self.get_limits(domain))
+
+            if now < state.paused_until:
+                return state.paused_until - now
+            if state.active >= state.limits.concurrency:
+                return None
+            wait_time = state.bucket.reserve(now)
+            if wait_time == 0:
+                state.active += 1
+            return wait_time
+
+    def _evict_idle_domains(self, now: float) -> None:
+        """Удаляет состояния простаивающих доменов, вызывается под `_lock`"""
+
+        self._domains = {
+            domain: state
+            for domain, state in self._domains.items()
+            if not state.is_idle(now)
+        }
+        self._swept_at = now
+
+    def _complete(
+        self, delivery: Delivery, result: SendResult, now: float
+    ) -> Optional[float]:
+        """
+        Освобождает слот домена и учитывает результат попытки
+
+        :return: Время следующей попытки, None - доставка завершена
+        """
+
+        domain = delivery.domain
+        label = self.get_label(domain)
+        retry = result.transient and delivery.attempts < self.max_attempts
+        with self._lock:
+            state = self._domains[domain]
+            state.active -= 1
+            if result.transient:
+                # Сервер домена просит подождать, новые отправки туда тоже ждут
+                pause = uniform(self.retry_delay / 2, self.retry_delay)
+                state.paused_until = max(state.paused_until, now + pause)
+
+        if result.sent:
+            self.metrics.delivered.labels(label).inc()
+        elif retry:
+            self.metrics.deferred.labels(label).inc()
+            logger.debug(
+                "Временный отказ домена %s (%s), попытка %s",
+                domain,
+                result.code,
+                delivery.attempts,
+            )
+            return now + self.get_retry_delay(delivery.attempts)
+        else:
+            self.metrics.failed.labels(label).inc()
+            logger.warning(
+                "Письмо на домен %s не доставлено после %s попыток: %s",
+                domain,
+                delivery.attempts,
+                result.error,
+            )
+        return None
+
+    def _send(self, delivery: Delivery) -> SendResult:
+        """Отправка в потоке через бэкенд потока"""
+
+        started = monotonic()
+        try:
+            [result] = self._get_backend().send_batch([delivery.message])
+        except Exception as e:
+            logger.warning("Ошибка при отправке сообщения", exc_info=e)
+            result = SendResult(False, str(e))
+        self.metrics.delivery_duration.labels(
+            self.get_label(delivery.domain)
+        ).observe(monotonic() - started)
+        return result
+
+    def _get_backend(self) -> EmailBackendABC:
+        backend = getattr(self._local, "backend", None)
+        if backend is None:
+            backend = self.backend_class(**self.backend_kwargs)
+            self._local.backend = backend
+            with self._lock:
+                self._backends.append(backend)
+        return backend
+
+    def _open(self) -> Optional[bool]:
+        """Соединения открывают бэкенды потоков"""
+        return None
+
+    def _close(self) -> None:
+        pass
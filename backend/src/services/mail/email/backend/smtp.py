@@ -1,20 +1,43 @@
 import smtplib
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
 from functools import cached_property
 from logging import getLogger
 from ssl import PROTOCOL_TLS_CLIENT, SSLContext, SSLError, create_default_context
 from threading import RLock
-from typing import Optional, Union
+from typing import BinaryIO, Optional, Union
 
 from src.core.config import settings
-from src.services.mail.email.backend.base import EmailBackendABC
+from src.services.mail.email.backend.base import (
+    NOT_SENT_REASON,
+    EmailBackendABC,
+    SendResult,
+)
 from src.services.mail.email.backend.exceptions import EmailBackendError
+from src.services.mail.email.backend.pool import PooledConnection, SMTPConnectionPool
 from src.services.mail.email.message import EmailMessage
+from src.tracing import tracer
 
 logger = getLogger(__name__)
 
+CRLF = b"\r\n"
+ACCEPTED_RCPT_CODES = (250, 251)
+SERVICE_NOT_AVAILABLE_CODE = 421
+
 
 class EmailSMTPBackend(EmailBackendABC):
+    """
+    Отправка сообщений через SMTP сервер.
+
+    По умолчанию соединения берутся из пула процесса и не закрываются после
+    отправки, поэтому подключение, TLS и авторизация выполняются один раз
+    на несколько задач. Если сервер разорвал соединение, сообщение один раз
+    отправляется повторно через новое соединение.
+    Сообщение передаётся серверу из временного файла частями
+    по `EMAIL.STREAM_BUFFER_SIZE` байт, вложения в памяти целиком не хранятся
+
+    :param use_pool: Переиспользовать соединения между отправками
+    """
+
     def __init__(
         self,
         host: Optional[str] = None,
@@ -27,6 +50,7 @@ class EmailSMTPBackend(EmailBackendABC):
         ssl_keyfile=None,
         ssl_certfile=None,
         fail_silently: bool = False,
+        use_pool: Optional[bool] = None,
         **kwargs,
     ):
         super().__init__(fail_silently=fail_silently)
@@ -49,9 +73,25 @@ class EmailSMTPBackend(EmailBackendABC):
             settings.EMAIL.SSL_CERTFILE if ssl_certfile is None else ssl_certfile
         )
 
-        self.connection: Optional[smtplib.SMTP] = None
+        use_pool = settings.EMAIL.POOL_ENABLED if use_pool is None else use_pool
+        self.pool = (
+            SMTPConnectionPool(
+                self._connect,
+                max_size=settings.EMAIL.POOL_SIZE,
+                idle_timeout=settings.EMAIL.POOL_IDLE_TIMEOUT,
+                keepalive_interval=settings.EMAIL.POOL_KEEPALIVE_INTERVAL,
+                max_messages=settings.EMAIL.POOL_MAX_MESSAGES,
+            )
+            if use_pool
+            else None
+        )
+        self._pooled: Optional[PooledConnection] = None
         self._lock = RLock()
 
+    @property
+    def connection(self) -> Optional[smtplib.SMTP]:
+        return self._pooled.connection if self._pooled is not None else None
+
     def send_messages(
         self, messages: Union[list[EmailMessage], Iterable[EmailMessage]]
     ) -> int:
@@ -68,28 +108,158 @@ class EmailSMTPBackend(EmailBackendABC):
                     sent = self._send(message)
                     if sent:
                         num_sent += 1
-            except smtplib.SMTPException as e:
+            except (smtplib.SMTPException, SSLError, OSError) as e:
+                # Состояние сессии после ошибки неизвестно, в пул не возвращаем
+                self._discard()
                 if not self.fail_silently:
                     logger.warning("Ошибка при отправке сообщения", exc_info=e)
                     raise EmailBackendError(reason=str(e))
             finally:
-                self._close()
+                if new_conn:
+                    self._close()
 
         return num_sent
 
+    def send_batch(
+        self, messages: Union[list[EmailMessage], Iterable[EmailMessage]]
+    ) -> list[SendResult]:
+        """
+        Отправляет сообщения через одно соединение.
+        Отказ сервера принять сообщение не прерывает сессию, при обрыве
+        соединения открывается новое для оставшихся сообщений
+        """
+
+        results = []
+        with self._lock:
+            new_conn = self._open_silently()
+            try:
+                for message in messages:
+                    results.append(self._send_result(message))
+            finally:
+                if new_conn:
+                    self._close()
+
+        return results
+
+    def _send_result(self, message: EmailMessage) -> SendResult:
+        if self.connection is None:
+            self._open_silently()
+        if self.connection is None:
+            return SendResult(
+                False, EmailBackendError.reason, SERVICE_NOT_AVAILABLE_CODE
+            )
+
+        try:
+            sent = self._send(message)
+        except (
+            smtplib.SMTPRecipientsRefused,
+            smtplib.SMTPSenderRefused,
+            smtplib.SMTPDataError,
+        ) as e:
+            # Транзакция сброшена через RSET, соединение можно использовать
+            return SendResult(False, str(e), get_error_code(e))
+        except (smtplib.SMTPException, SSLError, OSError) as e:
+            self._discard()
+            logger.warning("Ошибка при отправке сообщения", exc_info=e)
+            return SendResult(False, str(e), get_error_code(e))
+
+        return SendResult(True) if sent else SendResult(False, NOT_SENT_REASON)
+
+    def _open_silently(self) -> Optional[bool]:
+        """Открывает соединение, ошибка подключения только логируется"""
+
+        try:
+            return self._open()
+        except EmailBackendError as e:
+            logger.warning("Ошибка подключения к SMTP серверу", exc_info=e)
+            return None
+
     def _send(self, message: EmailMessage) -> bool:
         if not message.recipients:
             return False
 
-        msg = message.mime_message()
-        self.connection.sendmail(
-            message.from_email, message.recipients, msg.as_bytes(linesep="\r\n")
-        )
+        attributes = {"smtp.host": self.host, "smtp.recipients": len(message.recipients)}
+        with (
+            tracer.span("smtp.send", kind="client", attributes=attributes),
+            message.message_file() as message_file,
+        ):
+            self._rotate_exhausted()
+            if self.connection is None:
+                return False
+            try:
+                self._transfer(self.connection, message, message_file)
+            except smtplib.SMTPServerDisconnected:
+                if self.pool is None:
+                    raise
+                # Соединение из пула закрыто сервером, повторяем через новое
+                self._discard()
+                self._open()
+                if self.connection is None:
+                    raise
+                message_file.seek(0)
+                self._transfer(self.connection, message, message_file)
+            self._pooled.sent_count += 1
         return True
 
-    def _open(self) -> Optional[bool]:
-        if self.connection:
-            return False
+    @staticmethod
+    def _transfer(
+        connection: smtplib.SMTP, message: EmailMessage, message_file: BinaryIO
+    ) -> dict[str, tuple[int, bytes]]:
+        """
+        SMTP транзакция как в `smtplib.SMTP.sendmail`, но тело сообщения
+        передаётся из файла частями
+
+        :raises smtplib.SMTPSenderRefused: Сервер не принял отправителя
+        :raises smtplib.SMTPRecipientsRefused: Сервер не принял ни одного получателя
+        :raises smtplib.SMTPDataError: Сервер не принял сообщение
+        :return: Получатели, которых не принял сервер
+        """
+
+        connection.ehlo_or_helo_if_needed()
+        code, response = connection.mail(message.from_email)
+        if code != 250:
+            if code == SERVICE_NOT_AVAILABLE_CODE:
+                connection.close()
+            else:
+                reset_silently(connection)
+            raise smtplib.SMTPSenderRefused(code, response, message.from_email)
+
+        refused = {}
+        for email in message.recipients:
+            code, response = connection.rcpt(email)
+            if code not in ACCEPTED_RCPT_CODES:
+                refused[email] = (code, response)
+            if code == SERVICE_NOT_AVAILABLE_CODE:
+                connection.close()
+                raise smtplib.SMTPRecipientsRefused(refused)
+        if len(refused) == len(message.recipients):
+            reset_silently(connection)
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        code, response = connection.docmd("data")
+        if code != 354:
+            reset_silently(connection)
+            raise smtplib.SMTPDataError(code, response)
+
+        for chunk in iter_quoted_data(message_file, settings.EMAIL.STREAM_BUFFER_SIZE):
+            connection.send(chunk)
+        connection.send(b"." + CRLF)
+
+        code, response = connection.getreply()
+        if code != 250:
+            reset_silently(connection)
+            raise smtplib.SMTPDataError(code, response)
+        return refused
+
+    def _rotate_exhausted(self) -> None:
+        """Заменяет соединение, исчерпавшее лимит сообщений"""
+
+        if self.pool is not None and self.pool.is_exhausted(self._pooled):
+            self._close()
+            self._open()
+
+    def _connect(self) -> smtplib.SMTP:
+        """Открывает и авторизует новое соединение"""
 
         connection_params = {}
         if self.timeout:
@@ -97,40 +267,73 @@ class EmailSMTPBackend(EmailBackendABC):
         if self.use_ssl:
             connection_params["context"] = self.ssl_context
 
+        connection = self.connection_class(
+            self.host,
+            self.port,
+            **connection_params,
+        )
         try:
-            self.connection = self.connection_class(
-                self.host,
-                self.port,
-                **connection_params,
-            )
-
             if not self.use_ssl and self.use_tls:
-                self.connection.starttls()
+                connection.starttls()
             if self.username and self.password:
-                self.connection.login(self.username, self.password)
-        except ConnectionError:
-            if not self.fail_silently:
-                raise EmailBackendError("Ошибка внешнего сервиса отправки")
+                connection.login(self.username, self.password)
+        except BaseException:
+            connection.close()
+            raise
+        return connection
+
+    def _open(self) -> Optional[bool]:
+        if self._pooled is not None:
+            return False
+
+        try:
+            if self.pool is not None:
+                self._pooled = self.pool.acquire()
+            else:
+                self._pooled = PooledConnection(self._connect())
         except (smtplib.SMTPException, SSLError) as e:
             if not self.fail_silently:
                 raise EmailBackendError(reason=str(e))
+        except OSError:
+            if not self.fail_silently:
+                raise EmailBackendError("Ошибка внешнего сервиса отправки")
 
         return True
 
     def _close(self) -> None:
-        if self.connection is None:
+        """Возвращает соединение в пул, без пула - закрывает его"""
+
+        if self._pooled is None:
+            return
+
+        pooled, self._pooled = self._pooled, None
+        if self.pool is not None:
+            self.pool.release(pooled)
             return
 
         try:
-            self.connection.quit()
+            pooled.connection.quit()
         except (SSLError, smtplib.SMTPServerDisconnected):
-            self.connection.close()
+            pooled.connection.close()
         except smtplib.SMTPException:
             if not self.fail_silently:
                 raise EmailBackendError
 
-        finally:
-            self.connection = None
+    def _discard(self) -> None:
+        """Закрывает текущее соединение, не возвращая его в пул"""
+
+        if self._pooled is None:
+            return
+
+        pooled, self._pooled = self._pooled, None
+        if self.pool is not None:
+            self.pool.discard(pooled)
+        else:
+            pooled.connection.close()
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
 
     @cached_property
     def ssl_context(self):
@@ -144,3 +347,57 @@ class EmailSMTPBackend(EmailBackendABC):
     @property
     def connection_class(self):
         return smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+
+
+def get_error_code(error: BaseException) -> int:
+    """
+    Код ответа SMTP сервера для ошибки отправки.
+    Обрыв соединения и сетевые ошибки считаются временными (421)
+
+    :param error: Ошибка отправки
+    """
+
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        # Постоянный отказ хотя бы одному получателю важнее временных
+        codes = [code for code, _ in error.recipients.values()]
+        return max(codes, default=SERVICE_NOT_AVAILABLE_CODE)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code
+    return SERVICE_NOT_AVAILABLE_CODE
+
+
+def reset_silently(connection: smtplib.SMTP) -> None:
+    """Сбрасывает транзакцию командой RSET, обрыв соединения игнорируется"""
+
+    try:
+        connection.rset()
+    except smtplib.SMTPServerDisconnected:
+        pass
+
+
+def iter_quoted_data(message_file: BinaryIO, buffer_size: int) -> Iterator[bytes]:
+    """
+    Тело сообщения для команды DATA частями не меньше `buffer_size` байт:
+    с переводами строк CRLF, экранированными точками в начале строк
+    и переводом строки в конце
+
+    :param message_file: Файл сообщения
+    :param buffer_size: Размер части в байтах
+    """
+
+    buffer: list[bytes] = []
+    buffered = 0
+    for line in message_file:
+        if line.startswith(b"."):
+            line = b"." + line
+        if not line.endswith(CRLF):
+            line = line.rstrip(b"\r\n") + CRLF
+        buffer.append(line)
+        buffered += len(line)
+        if buffered >= buffer_size:
+            yield b"".join(buffer)
+            buffer.clear()
+            buffered = 0
+
+    if buffer:
+        yield b"".join(buffer)
@@ -1,3 +1,5 @@
+from base64 import encodebytes
+from copy import copy
 from email import generator, encoders, charset as charset_module
 from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
@@ -7,7 +9,10 @@ from io import StringIO, BytesIO
 from mimetypes import guess_type
 from os import PathLike
 from pathlib import Path
-from typing import Iterable, Optional, Any, Union
+from re import compile as compile_regex
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Iterable, Optional, Any, Union
+from uuid import uuid4
 
 from src.core.config import settings
 
@@ -35,6 +40,11 @@ utf8_charset_qp.body_encoding = charset_module.QP
 
 DEFAULT_MIME_TYPE = "application/octet-stream"
 
+# 57 байт исходных данных - одна строка base64 из 76 символов
+BASE64_LINE_SIZE = 57
+BASE64_CHUNK_SIZE = BASE64_LINE_SIZE * 1024
+LAZY_PLACEHOLDER_REGEX = compile_regex(rb"LAZYATTACHMENT([0-9a-f]{32})")
+
 RecipientsType = Union[list[str], tuple[str, ...]]
 
 
@@ -78,6 +88,54 @@ class SafeMIMEMultipart(MIMEMixin, MIMEMultipart):
         MIMEMultipart.__init__(self, _subtype, boundary, _subparts, **_params)
 
 
+class LazyAttachment:
+    """
+    Содержимое вложения, которое читается из файла только при отправке
+
+    :param path: Путь к файлу
+    """
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def read(self) -> bytes:
+        return self.path.read_bytes()
+
+
+class LazyMIMEAttachment(MIMEBase):
+    """
+    Base64 вложение, тело которого при генерации сообщения заменено меткой.
+    Вместо метки содержимое файла дописывается по частям в `EmailMessage.message_file`
+    """
+
+    def __init__(self, basetype: str, subtype: str, attachment: LazyAttachment):
+        super().__init__(basetype, subtype)
+        self.path = attachment.path
+        self.placeholder = f"LAZYATTACHMENT{uuid4().hex}"
+        self["Content-Transfer-Encoding"] = "base64"
+        self.set_payload(self.placeholder)
+
+
+def write_base64(source: BinaryIO, destination: BinaryIO, linesep: bytes) -> None:
+    """
+    Кодирует файл в base64 по частям, строки по 76 символов
+
+    :param source: Исходный файл
+    :param destination: Файл, в который пишется результат
+    :param linesep: Перевод строки, после последней строки не пишется
+    """
+
+    separator = b""
+    while chunk := source.read(BASE64_CHUNK_SIZE):
+        encoded = encodebytes(chunk).rstrip(b"\n")
+        if linesep != b"\n":
+            encoded = encoded.replace(b"\n", linesep)
+        destination.write(separator + encoded)
+        separator = linesep
+
+
 class EmailMessage:
     content_subtype = "plain"
     encoding = "utf-8"
@@ -110,12 +168,18 @@ class EmailMessage:
 
         self.reply_to = reply_to or []
         self.extra_headers = headers or {}
+        # Получатели SMTP транзакции, если отличаются от получателей в заголовках
+        self.envelope_recipients: Optional[list[str]] = None
 
-    def mime_message(self) -> MIMEMultipart | SafeMIMEText:
-        """Получить сообщение в его MIME представлении"""
+    def mime_message(self, lazy: bool = False) -> MIMEMultipart | SafeMIMEText:
+        """
+        Получить сообщение в его MIME представлении
+
+        :param lazy: Не читать файлы вложений, а оставить вместо них метки LazyMIMEAttachment
+        """
 
         msg = SafeMIMEText(self.body, self.content_subtype, self.encoding)
-        msg = self._create_message(msg)
+        msg = self._create_message(msg, lazy)
 
         msg["Subject"] = self.subject
         msg["From"] = self.extra_headers.get("From", self.from_email)
@@ -134,10 +198,44 @@ class EmailMessage:
 
         return msg
 
+    def message_file(self, linesep: str = "\r\n") -> SpooledTemporaryFile:
+        """
+        Сообщение целиком во временном файле.
+        Файлы вложений кодируются в base64 по частям прямо в этот файл,
+        поэтому в памяти не держится ни файл, ни его закодированная копия.
+        Небольшие сообщения остаются в памяти, до `EMAIL.SPOOL_MAX_SIZE` байт
+
+        :param linesep: Перевод строки
+        :return: Файл, установленный на начало
+        """
+
+        msg = self.mime_message(lazy=True)
+        lazy_parts = {
+            part.placeholder.encode(): part.path
+            for part in msg.walk()
+            if isinstance(part, LazyMIMEAttachment)
+        }
+        data = msg.as_bytes(linesep=linesep)
+
+        message_file = SpooledTemporaryFile(max_size=settings.EMAIL.SPOOL_MAX_SIZE)
+        position = 0
+        for match in LAZY_PLACEHOLDER_REGEX.finditer(data):
+            path = lazy_parts.get(match.group(0))
+            if path is None:
+                continue
+            message_file.write(data[position : match.start()])
+            with path.open("rb") as source:
+                write_base64(source, message_file, linesep.encode())
+            position = match.end()
+        message_file.write(data[position:])
+
+        message_file.seek(0)
+        return message_file
+
     def attach(
         self,
         filename: Union[str, MIMEBase, None] = None,
-        content: Union[str, bytes, None] = None,
+        content: Union[str, bytes, LazyAttachment, None] = None,
         mimetype: Optional[str] = None,
     ) -> None:
         """Прикрепить файл к сообщению"""
@@ -152,6 +250,8 @@ class EmailMessage:
         attachment_mimetype = mimetype or guess_type(filename)[0] or DEFAULT_MIME_TYPE
         basetype, subtype = attachment_mimetype.split("/", 1)
 
+        if basetype == "text" and isinstance(content, LazyAttachment):
+            content = content.read()
         if basetype == "text":
             if isinstance(content, bytes):
                 try:
@@ -162,19 +262,23 @@ class EmailMessage:
         self.attachments.append((filename, content, attachment_mimetype))
 
     def attach_file(self, path: PathLike, mimetype: Optional[str] = None) -> None:
-        """Прикрепить файл из файловой системы ОС к сообщению"""
+        """
+        Прикрепить файл из файловой системы ОС к сообщению.
+        Файл читается только при отправке, текстовые файлы - сразу
+        """
         file_path = Path(path)
-        content = file_path.read_bytes()
+        if not file_path.is_file():
+            raise FileNotFoundError(file_path)
 
-        self.attach(file_path.name, content, mimetype)
+        self.attach(file_path.name, LazyAttachment(file_path), mimetype)
 
     def _create_message(
-        self, message: SafeMIMEText
+        self, message: SafeMIMEText, lazy: bool = False
     ) -> SafeMIMEMultipart | SafeMIMEText:
-        return self._create_attachments(message)
+        return self._create_attachments(message, lazy)
 
     def _create_attachments(
-        self, message: SafeMIMEText | SafeMIMEMultipart
+        self, message: SafeMIMEText | SafeMIMEMultipart, lazy: bool = False
     ) -> SafeMIMEText | SafeMIMEMultipart:
         """Создаёт и добавляет к message все добавленные вложения"""
         if self.attachments:
@@ -188,15 +292,19 @@ class EmailMessage:
                     message.attach(attachment)
                 # TODO подумать надо ли такое
                 else:
-                    message.attach(self._create_attachment(*attachment))
+                    message.attach(self._create_attachment(*attachment, lazy=lazy))
 
         return message
 
     def _create_attachment(
-        self, filename: str, content, mimetype: Optional[str] = None
+        self,
+        filename: str,
+        content,
+        mimetype: Optional[str] = None,
+        lazy: bool = False,
     ) -> MIMEBase:
         """Создаёт вложение, которое можно отправлять по emails"""
-        attachment = self._create_mime_attachment(content, mimetype)
+        attachment = self._create_mime_attachment(content, mimetype, lazy)
         if filename:
             file_header = ("utf-8", "", filename)
             attachment.add_header(
@@ -205,10 +313,17 @@ class EmailMessage:
 
         return attachment
 
-    def _create_mime_attachment(self, content, mimetype: str) -> MIMEBase:
+    def _create_mime_attachment(
+        self, content, mimetype: str, lazy: bool = False
+    ) -> MIMEBase:
         """Создаёт вложение в MIME классе"""
         basetype, subtype = mimetype.split("/", 1)
 
+        if isinstance(content, LazyAttachment):
+            if lazy:
+                return LazyMIMEAttachment(basetype, subtype, content)
+            content = content.read()
+
         if basetype == "text":
             attachment = SafeMIMEText(content, subtype, self.encoding)
         else:
@@ -238,9 +353,28 @@ class EmailMessage:
                 value = ", ".join(str(v) for v in values)
             message[header_name] = value
 
+    def for_recipients(self, recipients: list[str]) -> "EmailMessage":
+        """
+        Копия сообщения, которая отправляется только части получателей.
+        Заголовки To и Cc и Message-ID у копий общие
+
+        :param recipients: Получатели из `recipients`
+        """
+
+        header_names = [key.lower() for key in self.extra_headers]
+        if "message-id" not in header_names:
+            self.extra_headers["Message-ID"] = make_msgid()
+
+        message = copy(self)
+        message.extra_headers = dict(self.extra_headers)
+        message.envelope_recipients = list(recipients)
+        return message
+
     @property
     def recipients(self) -> list[str]:
         """Список получателей"""
+        if self.envelope_recipients is not None:
+            return self.envelope_recipients
         return [email for email in (self.to + self.bcc + self.cc) if email]
 
 
@@ -275,9 +409,9 @@ class EmailMultiAlternatives(EmailMessage):
         self.alternatives.append((content, mimetype))
 
     def _create_message(
-        self, message: SafeMIMEText
+        self, message: SafeMIMEText, lazy: bool = False
     ) -> SafeMIMEText | SafeMIMEMultipart:
-        return self._create_attachments(self._create_alternatives(message))
+        return self._create_attachments(self._create_alternatives(message), lazy)
 
     def _create_alternatives(
         self, message: SafeMIMEText | SafeMIMEMultipart
@@ -0,0 +1,40 @@
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field
+
+from src.templates import TemplatePath
+
+
+class MassEmailItem(BaseModel):
+    """
+    Письмо массовой рассылки.
+    Тело рендерится из шаблона при отправке
+
+    :param subject: Тема письма
+    :param template: Шаблон тела письма
+    :param context: Данные для шаблона
+    :param recipients: Получатели
+    :param from_email: Отправитель, по умолчанию `EMAIL.FROM_EMAIL`
+    """
+
+    subject: str
+    template: TemplatePath
+    context: dict[str, Any] = Field(default_factory=dict)
+    recipients: list[str]
+    from_email: Optional[str] = None
+
+
+class MassEmailResult(BaseModel):
+    """
+    Результат отправки письма массовой рассылки
+
+    :param index: Порядковый номер письма в рассылке
+    :param recipients: Получатели
+    :param sent: Отправлено ли письмо
+    :param error: Причина ошибки рендеринга или отправки
+    """
+
+    index: int
+    recipients: list[str]
+    sent: bool
+    error: Optional[str] = None
@@ -1,12 +1,20 @@
-from typing import Optional
+from itertools import batched
+from logging import getLogger
+from typing import Iterable, Optional
+
+from jinja2 import TemplateError
 
 from src.core.config import settings
 from src.services.mail.email.backend import EmailBackendABC
 from src.services.mail.email.backend.exceptions import EmailBackendError
 from src.services.mail.email.message import EmailMultiAlternatives
+from src.services.mail.email.schemas import MassEmailItem, MassEmailResult
 from src.services.mail.exceptions import MailServiceError
+from src.services.renderers import TemplateRenderer
 from src.utils.loading import import_string
 
+logger = getLogger(__name__)
+
 
 class EmailService:
     """
@@ -59,6 +67,117 @@ class EmailService:
 
         return sent_count
 
+    async def asend_email(
+        self,
+        subject: str,
+        body: str,
+        recipients: list[str],
+        from_email: Optional[str] = None,
+        bcc: Optional[list[str]] = None,
+        cc: Optional[list[str]] = None,
+        attachments: Optional[list] = None,
+        reply_to: Optional[list[str]] = None,
+        alternatives: Optional[list] = None,
+        fail_silently: bool = False,
+    ) -> int:
+        """
+        Отправить Email сообщение, не блокируя event loop.
+        С EmailAsyncSMTPBackend отправка выполняется на asyncio, с остальными
+        бэкендами - в отдельном потоке
+
+        :raises EmailServiceError: Ошибка отправки сообщения
+        :return: Количество успешно отправленных сообщений
+        """
+        self.backend.fail_silently = fail_silently
+
+        message = EmailMultiAlternatives(
+            recipients,
+            subject,
+            body,
+            from_email,
+            bcc,
+            cc,
+            attachments,
+            reply_to=reply_to,
+            alternatives=alternatives,
+        )
+
+        try:
+            sent_count = await self.backend.asend_messages([message])
+        except EmailBackendError as e:
+            raise MailServiceError(reason=e.reason) from e
+
+        return sent_count
+
+    def send_mass_email(
+        self,
+        items: Iterable[MassEmailItem],
+        chunk_size: Optional[int] = None,
+        fail_silently: bool = False,
+    ) -> list[MassEmailResult]:
+        """
+        Отправить письма массовой рассылки через одно соединение.
+        Письма рендерятся и отправляются пачками по `chunk_size`,
+        ошибка рендеринга или отправки письма не прерывает рассылку
+
+        :param items: Письма рассылки
+        :param chunk_size: Количество писем, которые рендерятся и отправляются за раз
+        :raises MailServiceError: Ошибка подключения к сервису отправки
+        :return: Результат отправки каждого письма в порядке передачи
+        """
+        self.backend.fail_silently = fail_silently
+        chunk_size = chunk_size or settings.EMAIL.MASS_CHUNK_SIZE
+
+        results: list[MassEmailResult] = []
+        try:
+            with self.backend as email_backend:
+                for chunk in batched(enumerate(items), chunk_size):
+                    results.extend(self._send_mass_chunk(email_backend, chunk))
+        except EmailBackendError as e:
+            raise MailServiceError(reason=e.reason) from e
+
+        return results
+
+    @staticmethod
+    def _send_mass_chunk(
+        email_backend: EmailBackendABC,
+        chunk: tuple[tuple[int, MassEmailItem], ...],
+    ) -> list[MassEmailResult]:
+        """Рендерит и отправляет пачку писем рассылки"""
+
+        results: dict[int, MassEmailResult] = {}
+        messages: list[EmailMultiAlternatives] = []
+        message_indexes: list[int] = []
+
+        for index, item in chunk:
+            try:
+                body = TemplateRenderer.render_template(item.context, item.template)
+            except (TemplateError, OSError) as e:
+                logger.warning("Ошибка рендеринга письма рассылки", exc_info=e)
+                results[index] = MassEmailResult(
+                    index=index, recipients=item.recipients, sent=False, error=str(e)
+                )
+                continue
+
+            messages.append(
+                EmailMultiAlternatives(
+                    item.recipients, item.subject, body, item.from_email
+                )
+            )
+            message_indexes.append(index)
+
+        for index, message, send_result in zip(
+            message_indexes, messages, email_backend.send_batch(messages)
+        ):
+            results[index] = MassEmailResult(
+                index=index,
+                recipients=message.to,
+                sent=send_result.sent,
+                error=send_result.error,
+            )
+
+        return [results[index] for index, _ in chunk]
+
 
 backend_class = import_string(settings.EMAIL.BACKEND)
 backend = backend_class(
@@ -0,0 +1,232 @@
+import asyncio
+from datetime import timedelta
+from logging import getLogger
+from typing import Callable, Optional
+
+from pydantic import ValidationError
+
+from src.core.config import settings
+from src.metrics import MailMetrics, metrics_service
+from src.models.mail import MailOutboxModel
+from src.services.mail.email.schemas import MassEmailItem, MassEmailResult
+from src.services.mail.email.service import EmailService, email_service
+from src.services.mail.exceptions import MailServiceError
+from src.utils.clock import Clock
+from src.utils.repository.exceptions import RepositoryException
+from src.utils.uow import SQLAlchemyUoW, UoWABC
+
+logger = getLogger(__name__)
+
+MAX_RETRY_DELAY = 60 * 60
+
+
+class MailOutbox:
+    """
+    Outbox писем.
+    Письмо записывается в БД в той же транзакции, что и изменение,
+    из-за которого оно отправляется, и отправляется позже диспетчером
+    """
+
+    @staticmethod
+    async def add(uow: UoWABC, item: MassEmailItem) -> None:
+        """
+        Добавить письмо в outbox в текущей транзакции `uow`.
+        Транзакцию фиксирует вызывающий код
+
+        :param uow: Открытый UoW
+        :param item: Письмо
+        :raises MailServiceError: Ошибка записи письма
+        """
+
+        try:
+            await uow.mail_outbox.create(item.model_dump(mode="json"))
+        except RepositoryException as e:
+            logger.error("Ошибка при записи письма в outbox", exc_info=e)
+            raise MailServiceError("Ошибка постановки письма в очередь") from e
+
+
+class MailOutboxDispatcher:
+    """
+    Отправка писем из outbox.
+
+    Пачка писем захватывается через `FOR UPDATE SKIP LOCKED` в короткой транзакции,
+    которая скрывает письма от других диспетчеров на `lease_timeout` секунд, поэтому
+    несколько диспетчеров не отправят одно письмо дважды. Пачка отправляется
+    через массовую рассылку вне транзакции, затем во второй транзакции
+    отправленные письма удаляются, остальные откладываются с экспоненциальной
+    задержкой. Письма, не отправленные за `max_attempts` попыток, учитываются
+    в логах и метриках и удаляются: их контекст содержит ссылки с токенами.
+    Письма, чей диспетчер упал на последней попытке, удаляются в начале `dispatch`
+
+    :param uow_factory: Фабрика UoW
+    :param email_service: Сервис отправки писем
+    :param batch_size: Размер пачки
+    :param max_attempts: Максимальное количество попыток отправки письма
+    :param retry_delay: Задержка перед второй попыткой в секундах
+    :param lease_timeout: На сколько секунд захваченные письма скрываются
+        от других диспетчеров
+    :param metrics: Метрики писем, по умолчанию берутся из `metrics_service`
+    """
+
+    def __init__(
+        self,
+        uow_factory: Callable[[], UoWABC] = SQLAlchemyUoW,
+        email_service: EmailService = email_service,
+        batch_size: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_delay: Optional[int] = None,
+        lease_timeout: Optional[int] = None,
+        metrics: Optional[MailMetrics] = None,
+    ) -> None:
+        self.uow_factory = uow_factory
+        self.email_service = email_service
+        self.batch_size = batch_size or settings.EMAIL.OUTBOX_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.EMAIL.OUTBOX_MAX_ATTEMPTS
+        self.retry_delay = retry_delay or settings.EMAIL.OUTBOX_RETRY_DELAY
+        self.lease_timeout = lease_timeout or settings.EMAIL.OUTBOX_LEASE_TIMEOUT
+        self.metrics = metrics or metrics_service.mail
+
+    async def dispatch(self, max_batches: Optional[int] = None) -> int:
+        """
+        Отправляет пачки писем, пока outbox не опустеет
+
+        :param max_batches: Максимальное количество пачек за вызов
+        :return: Количество обработанных писем
+        """
+
+        await self.delete_exhausted()
+
+        processed = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            claimed = await self.dispatch_batch()
+            processed += claimed
+            batches += 1
+            if claimed < self.batch_size:
+                break
+
+        return processed
+
+    async def delete_exhausted(self) -> int:
+        """
+        Удаляет письма, исчерпавшие попытки, которые не удалил упавший диспетчер
+
+        :return: Количество удалённых писем
+        """
+
+        async with self.uow_factory() as uow:
+            deleted = await uow.mail_outbox.delete_exhausted(self.max_attempts)
+            await uow.commit()
+
+        if deleted:
+            self.metrics.outbox_dead.inc(deleted)
+            logger.error(
+                "Удалено %s писем outbox, не отправленных за %s попыток",
+                deleted,
+                self.max_attempts,
+            )
+        return deleted
+
+    async def dispatch_batch(self) -> int:
+        """
+        Захватывает и отправляет одну пачку писем
+
+        :return: Количество захваченных писем
+        """
+
+        uow = self.uow_factory()
+        async with uow:
+            rows = await uow.mail_outbox.claim_batch(
+                self.batch_size,
+                self.max_attempts,
+                Clock.utc_now() + timedelta(seconds=self.lease_timeout),
+            )
+            if not rows:
+                return 0
+            await uow.commit()
+
+        results = await asyncio.to_thread(self._send, rows)
+
+        sent_ids = [row.id for row, result in zip(rows, results) if result.sent]
+        failed = [
+            (row, result) for row, result in zip(rows, results) if not result.sent
+        ]
+        # Попытка уже засчитана при захвате, после последней письмо удаляется
+        dead = [item for item in failed if item[0].attempts + 1 >= self.max_attempts]
+        retried = [item for item in failed if item not in dead]
+        async with uow:
+            delete_ids = sent_ids + [row.id for row, _ in dead]
+            if delete_ids:
+                await uow.mail_outbox.bulk_delete_by_ids(delete_ids)
+
+            now = Clock.utc_now()
+            for row, result in retried:
+                await uow.mail_outbox.postpone(
+                    row.id,
+                    result.error or "",
+                    now + timedelta(seconds=self.get_retry_delay(row.attempts)),
+                )
+
+            await uow.commit()
+
+        if failed:
+            logger.warning(
+                "Не отправлено %s из %s писем outbox", len(failed), len(rows)
+            )
+        for row, result in dead:
+            self.metrics.outbox_dead.inc()
+            logger.error(
+                "Письмо outbox %s не отправлено за %s попыток и удалено: %s",
+                row.id,
+                self.max_attempts,
+                result.error,
+            )
+        return len(rows)
+
+    def get_retry_delay(self, attempts: int) -> int:
+        """Задержка перед следующей попыткой в секундах"""
+        return min(self.retry_delay * 2**attempts, MAX_RETRY_DELAY)
+
+    def _send(self, rows: list[MailOutboxModel]) -> list[MassEmailResult]:
+        """Отправляет письма пачки, результат - на каждое письмо"""
+
+        results: dict[int, MassEmailResult] = {}
+        items: list[MassEmailItem] = []
+        item_indexes: list[int] = []
+        for index, row in enumerate(rows):
+            try:
+                items.append(
+                    MassEmailItem(
+                        subject=row.subject,
+                        template=row.template,
+                        context=row.context,
+                        recipients=row.recipients,
+                        from_email=row.from_email,
+                    )
+                )
+            except ValidationError as e:
+                results[index] = MassEmailResult(
+                    index=index, recipients=row.recipients, sent=False, error=str(e)
+                )
+                continue
+            item_indexes.append(index)
+
+        try:
+            sent_results = self.email_service.send_mass_email(
+                items, chunk_size=self.batch_size
+            )
+        except MailServiceError as e:
+            sent_results = [
+                MassEmailResult(
+                    index=index, recipients=item.recipients, sent=False, error=e.reason
+                )
+                for index, item in enumerate(items)
+            ]
+
+        for index, result in zip(item_indexes, sent_results):
+            results[index] = result
+
+        return [results[index] for index in range(len(rows))]
+
+
+mail_outbox_dispatcher = MailOutboxDispatcher()
@@ -1,15 +1,23 @@
 from pathlib import Path
+from typing import Iterable, Optional
 
-from jinja2 import Template
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
 from src.core.config import settings
 from src.templates import TemplatePath
 
 
 class TemplateRenderer:
-    """Класс для работы с шаблоном письма"""
+    """
+    Класс для работы с шаблоном письма.
+
+    Шаблоны загружаются через одно окружение Jinja: скомпилированные шаблоны
+    хранятся в памяти процесса, байткод - в общей директории, если она задана.
+    Изменения файлов шаблонов отслеживаются только в режиме DEBUG
+    """
 
     _base_path: Path = settings.BASE_DIR / "src/templates"
+    _environment: Optional[Environment] = None
 
     @classmethod
     def render_template(cls, data: dict, template_path: TemplatePath) -> str:
@@ -21,9 +29,48 @@ class TemplateRenderer:
         :returns: Строка с отформатированным письмом
         """
 
-        template_file = cls._base_path / template_path
-        template_file_text = template_file.read_text()
-        return Template(template_file_text).render(**data)
+        template = cls.get_environment().get_template(str(template_path))
+        return template.render(**data)
+
+    @classmethod
+    def get_environment(cls) -> Environment:
+        if cls._environment is None:
+            cls._environment = create_environment(cls._base_path)
+        return cls._environment
+
+    @classmethod
+    def warm_up(cls, template_paths: Iterable[TemplatePath] = TemplatePath) -> None:
+        """
+        Загружает и компилирует шаблоны заранее, вызывается при старте процесса
+
+        :param template_paths: Пути к файлам шаблонов, по умолчанию все TemplatePath
+        """
+
+        environment = cls.get_environment()
+        for template_path in template_paths:
+            environment.get_template(str(template_path))
+
+
+def create_environment(base_path: Path) -> Environment:
+    """
+    Окружение Jinja для шаблонов из `base_path`
+
+    :param base_path: Директория шаблонов
+    """
+
+    bytecode_cache = None
+    if settings.TEMPLATE.BYTECODE_CACHE_DIR:
+        settings.TEMPLATE.BYTECODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(
+            str(settings.TEMPLATE.BYTECODE_CACHE_DIR)
+        )
+
+    return Environment(
+        loader=FileSystemLoader(base_path),
+        cache_size=settings.TEMPLATE.CACHE_SIZE,
+        auto_reload=settings.DEBUG,
+        bytecode_cache=bytecode_cache,
+    )
 
 
 template_renderer = TemplateRenderer()
@@ -1,10 +1,20 @@
-from .base import TASK, TASK_ID, TaskServiceABC
+from .base import TASK, TASK_ID, TaskCall, TaskServiceABC
 from .celery import CeleryTaskService, celery_task_service
+from .exceptions import TaskServiceError
+from .inprocess import AsyncioTaskService, TaskState, TaskStatus
+from .service import create_task_service, task_service
 
 __all__ = [
     "TaskServiceABC",
     "TASK",
     "TASK_ID",
+    "TaskCall",
     "CeleryTaskService",
     "celery_task_service",
+    "TaskServiceError",
+    "AsyncioTaskService",
+    "TaskState",
+    "TaskStatus",
+    "create_task_service",
+    "task_service",
 ]
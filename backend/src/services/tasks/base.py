@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, TypeAlias, Union
+from typing import Any, Iterable, NamedTuple, TypeAlias, Union
 
 from celery.result import AsyncResult
 
@@ -7,10 +7,23 @@ TASK_ID: TypeAlias = Union[str, int]
 TASK: TypeAlias = Union[AsyncResult, Any]
 
 
+class TaskCall(NamedTuple):
+    """
+    Вызов функции для отложенного выполнения
+
+    :param function: Функция, которая будет отложенно вызываться
+    :param args: Позиционные аргументы для задачи
+    :param kwargs: Именованные аргументы для задачи
+    """
+
+    function: Any
+    args: tuple = ()
+    kwargs: dict = {}
+
+
 class TaskServiceABC(ABC):
-    @staticmethod
     @abstractmethod
-    async def create_task(function, *args, **kwargs) -> TASK_ID:
+    async def create_task(self, function, *args, **kwargs) -> TASK_ID:
         """
         Создать задачу для отложенного выполнения
 
@@ -22,9 +35,21 @@ class TaskServiceABC(ABC):
 
         raise NotImplementedError
 
-    @staticmethod
+    async def create_tasks(self, calls: Iterable[TaskCall]) -> list[TASK_ID]:
+        """
+        Создать несколько задач для отложенного выполнения
+
+        :param calls: Вызовы функций
+        :return: Id задач в порядке передачи
+        """
+
+        return [
+            await self.create_task(call.function, *call.args, **call.kwargs)
+            for call in calls
+        ]
+
     @abstractmethod
-    async def get_task(task_id: TASK_ID) -> TASK:
+    async def get_task(self, task_id: TASK_ID) -> TASK:
         """
         Получить задачу по её Id
 
@@ -32,3 +57,11 @@ class TaskServiceABC(ABC):
         :return: Объект задачи
         """
         raise NotImplementedError
+
+    async def start(self) -> None:
+        """Вызывается при старте приложения"""
+        pass
+
+    async def close(self) -> None:
+        """Освобождает ресурсы сервиса при остановке приложения"""
+        pass
@@ -1,17 +1,123 @@
+from asyncio import get_running_loop
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from os import getpid
+from threading import Lock
+from time import monotonic
+from typing import Optional
+
 from celery.result import AsyncResult
+from kombu import Producer
+
+from src.metrics import TaskMetrics, metrics_service
+from src.tracing import inject
 
-from .base import TASK, TASK_ID, TaskServiceABC
+from .base import TASK, TASK_ID, TaskCall, TaskServiceABC
 
 
 class CeleryTaskService(TaskServiceABC):
-    @staticmethod
-    async def create_task(function, *args, **kwargs) -> TASK_ID:
-        id_task = function.apply_async(args=args, kwargs=kwargs)
-        return id_task.task_id
+    """
+    Постановка Celery задач без блокировки event loop.
+
+    `apply_async` выполняет сетевой ввод-вывод брокера, поэтому сообщения
+    публикуются в отдельном потоке публикации. Поток держит один producer
+    из пула приложения Celery между публикациями, соединение с брокером
+    открывается один раз. Пачка задач `create_tasks` публикуется за один
+    переход в поток через тот же producer
+
+    :param metrics: Метрики постановки задач
+    """
+
+    def __init__(self, metrics: Optional[TaskMetrics] = None) -> None:
+        self.metrics = metrics or metrics_service.tasks
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Используется только в потоке публикации
+        self._producer: Optional[Producer] = None
+        self._lock = Lock()
+        self._pid = getpid()
+
+    async def create_task(self, function, *args, **kwargs) -> TASK_ID:
+        [task_id] = await self.create_tasks([TaskCall(function, args, kwargs)])
+        return task_id
+
+    async def create_tasks(self, calls: Iterable[TaskCall]) -> list[TASK_ID]:
+        calls = list(calls)
+        if not calls:
+            return []
+
+        # Контекст трассировки передаётся воркеру в заголовках сообщения,
+        # берётся до перехода в поток публикации
+        headers = inject()
+        started = monotonic()
+        self.metrics.pending.inc(len(calls))
+        try:
+            task_ids = await get_running_loop().run_in_executor(
+                self.executor, self._publish, calls, headers
+            )
+        except Exception:
+            for call in calls:
+                self.metrics.enqueue_failures.labels(call.function.name).inc()
+            raise
+        finally:
+            self.metrics.pending.dec(len(calls))
 
-    @staticmethod
-    async def get_task(task_id: TASK_ID) -> TASK:
+        elapsed = monotonic() - started
+        for call in calls:
+            self.metrics.enqueue_duration.labels(call.function.name).observe(elapsed)
+        return task_ids
+
+    async def get_task(self, task_id: TASK_ID) -> TASK:
         return AsyncResult(task_id)
 
+    async def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.submit(self._release_producer)
+            executor.shutdown(wait=True)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pid != getpid():
+                # Поток и соединение родительского процесса после fork недоступны
+                self._executor = None
+                self._producer = None
+                self._pid = getpid()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="celery-publisher"
+                )
+            return self._executor
+
+    def _publish(self, calls: list[TaskCall], headers: dict) -> list[TASK_ID]:
+        """Публикует сообщения задач, выполняется в потоке публикации"""
+
+        producer = self._get_producer(calls[0].function)
+        try:
+            return [
+                call.function.apply_async(
+                    args=call.args,
+                    kwargs=call.kwargs,
+                    headers=dict(headers),
+                    producer=producer,
+                ).task_id
+                for call in calls
+            ]
+        except Exception:
+            # Состояние соединения неизвестно, следующая публикация возьмёт новое
+            self._release_producer()
+            raise
+
+    def _get_producer(self, function) -> Producer:
+        if self._producer is None:
+            self._producer = function.app.producer_pool.acquire(block=True)
+        return self._producer
+
+    def _release_producer(self) -> None:
+        producer, self._producer = self._producer, None
+        if producer is not None:
+            producer.release()
+
 
 celery_task_service = CeleryTaskService()
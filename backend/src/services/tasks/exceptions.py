@@ -0,0 +1,5 @@
+from src.exceptions import ProjectException
+
+
+class TaskServiceError(ProjectException):
+    reason = "Ошибка сервиса отложенных задач"
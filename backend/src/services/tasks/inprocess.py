@@ -0,0 +1,237 @@
+import asyncio
+from collections import OrderedDict
+from enum import StrEnum
+from inspect import iscoroutinefunction
+from logging import getLogger
+from time import monotonic
+from typing import Any, Optional
+from uuid import uuid4
+
+from src.core.config import settings
+
+from .base import TASK_ID, TaskServiceABC
+from .exceptions import TaskServiceError
+
+logger = getLogger(__name__)
+
+
+class TaskState(StrEnum):
+    """Состояния задачи, названия совпадают с состояниями Celery"""
+
+    PENDING = "PENDING"
+    STARTED = "STARTED"
+    SUCCESS = "SUCCESS"
+    FAILURE = "FAILURE"
+
+
+class TaskStatus:
+    """
+    Статус задачи `AsyncioTaskService`.
+    Повторяет часть интерфейса `celery.result.AsyncResult`
+
+    :param task_id: Id задачи
+    :param name: Название функции задачи
+    """
+
+    __slots__ = (
+        "task_id",
+        "name",
+        "state",
+        "result",
+        "error",
+        "created_at",
+        "started_at",
+        "finished_at",
+    )
+
+    def __init__(self, task_id: TASK_ID, name: Optional[str] = None) -> None:
+        self.task_id = task_id
+        self.name = name
+        self.state = TaskState.PENDING
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.created_at = monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def status(self) -> TaskState:
+        return self.state
+
+    def ready(self) -> bool:
+        """Завершена ли задача"""
+        return self.state in (TaskState.SUCCESS, TaskState.FAILURE)
+
+    def successful(self) -> bool:
+        return self.state == TaskState.SUCCESS
+
+    def failed(self) -> bool:
+        return self.state == TaskState.FAILURE
+
+
+class AsyncioTaskService(TaskServiceABC):
+    """
+    Выполнение отложенных задач в процессе приложения, без брокера и воркера.
+    Для разработки, тестов и развёртывания на одном узле.
+
+    Задачи попадают в ограниченную очередь, которую разбирают `workers`
+    корутин. Если очередь заполнена, `create_task` ждёт свободного места.
+    Корутинные функции выполняются в event loop, остальные (включая Celery
+    задачи) - в отдельном потоке. При остановке приложения `close` дожидается
+    выполнения очереди не дольше `drain_timeout` секунд.
+    Статусы последних `results_size` задач хранятся в памяти.
+
+    Периодические задачи, которые с Celery запускает beat, регистрируются
+    через `add_periodic_task` и ставятся в очередь после `start`
+
+    :param workers: Количество корутин-исполнителей
+    :param queue_size: Размер очереди
+    :param results_size: Количество хранимых статусов задач
+    :param drain_timeout: Время ожидания выполнения очереди при остановке в секундах
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        results_size: Optional[int] = None,
+        drain_timeout: Optional[float] = None,
+    ) -> None:
+        self.workers = workers or settings.TASK.WORKERS
+        self.queue_size = queue_size or settings.TASK.QUEUE_SIZE
+        self.results_size = results_size or settings.TASK.RESULTS_SIZE
+        self.drain_timeout = (
+            settings.TASK.DRAIN_TIMEOUT if drain_timeout is None else drain_timeout
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self._periodic: list[tuple[float, Any, tuple, dict]] = []
+        self._beats: list[asyncio.Task] = []
+        self._results: OrderedDict[TASK_ID, TaskStatus] = OrderedDict()
+        self._closing = False
+
+    async def create_task(self, function, *args, **kwargs) -> TASK_ID:
+        if self._closing:
+            raise TaskServiceError("Сервис отложенных задач остановлен")
+
+        await self.start()
+        task_status = await self._enqueue(function, args, kwargs)
+        return task_status.task_id
+
+    async def get_task(self, task_id: TASK_ID) -> TaskStatus:
+        """Статус задачи, неизвестная задача считается ожидающей, как в Celery"""
+
+        task_status = self._results.get(task_id)
+        return task_status if task_status is not None else TaskStatus(task_id)
+
+    def add_periodic_task(
+        self, function, interval: float, *args: Any, **kwargs: Any
+    ) -> None:
+        """
+        Регистрирует задачу, которая ставится в очередь каждые `interval` секунд.
+        Следующий запуск пропускается, пока не выполнен предыдущий
+
+        :param function: Функция задачи
+        :param interval: Интервал запуска в секундах
+        """
+
+        self._periodic.append((interval, function, args, kwargs))
+        if self._workers:
+            self._beats.append(self._start_beat(interval, function, args, kwargs))
+
+    async def start(self) -> None:
+        """Запускает исполнителей и периодические задачи в текущем event loop"""
+
+        if self._workers:
+            return
+
+        self._closing = False
+        self._queue = asyncio.Queue(self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"task-worker-{number}")
+            for number in range(self.workers)
+        ]
+        self._beats = [
+            self._start_beat(interval, function, args, kwargs)
+            for interval, function, args, kwargs in self._periodic
+        ]
+
+    async def close(self) -> None:
+        """Перестаёт принимать задачи и дожидается выполнения очереди"""
+
+        self._closing = True
+        beats, self._beats = self._beats, []
+        for beat in beats:
+            beat.cancel()
+        await asyncio.gather(*beats, return_exceptions=True)
+
+        if not self._workers:
+            return
+
+        try:
+            await asyncio.wait_for(self._queue.join(), self.drain_timeout)
+        except TimeoutError:
+            logger.warning(
+                "Не выполнено %s отложенных задач при остановке",
+                self._queue.qsize(),
+            )
+
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _enqueue(self, function, args, kwargs) -> TaskStatus:
+        task_status = TaskStatus(
+            str(uuid4()), getattr(function, "name", None) or function.__name__
+        )
+        self._store(task_status)
+        await self._queue.put((task_status, function, args, kwargs))
+        return task_status
+
+    def _start_beat(self, interval: float, function, args, kwargs) -> asyncio.Task:
+        return asyncio.create_task(
+            self._beat(interval, function, args, kwargs),
+            name=f"task-beat-{function.__name__}",
+        )
+
+    async def _beat(self, interval: float, function, args, kwargs) -> None:
+        task_status: Optional[TaskStatus] = None
+        while not self._closing:
+            await asyncio.sleep(interval)
+            if task_status is None or task_status.ready():
+                task_status = await self._enqueue(function, args, kwargs)
+
+    async def _work(self) -> None:
+        while True:
+            task_status, function, args, kwargs = await self._queue.get()
+            try:
+                await self._run(task_status, function, args, kwargs)
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    async def _run(task_status: TaskStatus, function, args, kwargs) -> None:
+        task_status.state = TaskState.STARTED
+        task_status.started_at = monotonic()
+        try:
+            if iscoroutinefunction(function):
+                result = await function(*args, **kwargs)
+            else:
+                result = await asyncio.to_thread(function, *args, **kwargs)
+        except Exception as e:
+            logger.error(
+                "Ошибка выполнения отложенной задачи %s", task_status.name, exc_info=e
+            )
+            task_status.state = TaskState.FAILURE
+            task_status.error = e
+        else:
+            task_status.state = TaskState.SUCCESS
+            task_status.result = result
+        finally:
+            task_status.finished_at = monotonic()
+
+    def _store(self, task_status: TaskStatus) -> None:
+        self._results[task_status.task_id] = task_status
+        while len(self._results) > self.results_size:
+            self._results.popitem(last=False)
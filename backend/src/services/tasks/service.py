@@ -0,0 +1,12 @@
+from src.core.config import settings
+from src.utils.loading import import_string
+
+from .base import TaskServiceABC
+
+
+def create_task_service() -> TaskServiceABC:
+    """Сервис отложенных задач, выбранный в настройках `TASK.BACKEND`"""
+    return import_string(settings.TASK.BACKEND)()
+
+
+task_service = create_task_service()
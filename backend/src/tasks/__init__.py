@@ -1,5 +1,7 @@
-from .mailing import send_mail
+from .mailing import dispatch_mail_outbox, send_mail, send_mass_mail
 
 __all__ = [
+    "dispatch_mail_outbox",
     "send_mail",
+    "send_mass_mail",
 ]
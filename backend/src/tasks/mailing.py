@@ -1,6 +1,15 @@
+from asyncio import run
+from typing import Optional
+
 from celery import shared_task
+from celery.signals import worker_process_shutdown
+from celery.utils.log import get_logger
 
 from src.services.mail import email_service
+from src.services.mail.email.schemas import MassEmailItem
+from src.services.mail.outbox import mail_outbox_dispatcher
+
+logger = get_logger(__name__)
 
 
 @shared_task
@@ -10,3 +19,44 @@ def send_mail(
     email_service.send_email(
         subject=subject, body=body, recipients=recipients, fail_silently=fail_silently
     )
+
+
+@shared_task
+def send_mass_mail(
+    items: list[dict], chunk_size: Optional[int] = None, fail_silently: bool = False
+) -> list[dict]:
+    """
+    Массовая рассылка писем через одно соединение.
+    Шаблоны рендерятся в воркере
+
+    :param items: Письма рассылки в формате MassEmailItem
+    :param chunk_size: Количество писем, которые рендерятся и отправляются за раз
+    :return: Результаты отправки писем в формате MassEmailResult
+    """
+    results = email_service.send_mass_email(
+        (MassEmailItem.model_validate(item) for item in items),
+        chunk_size=chunk_size,
+        fail_silently=fail_silently,
+    )
+    failed = [result for result in results if not result.sent]
+    if failed:
+        logger.warning(
+            "Не отправлено %s из %s писем рассылки", len(failed), len(results)
+        )
+    return [result.model_dump() for result in results]
+
+
+@shared_task(name="mail-outbox-dispatch")
+def dispatch_mail_outbox(max_batches: Optional[int] = None) -> int:
+    """
+    Отправляет письма из outbox
+
+    :param max_batches: Максимальное количество пачек за запуск
+    :return: Количество обработанных писем
+    """
+    return run(mail_outbox_dispatcher.dispatch(max_batches))
+
+
+@worker_process_shutdown.connect
+def close_email_connections(**kwargs):
+    email_service.backend.close()
@@ -0,0 +1,12 @@
+from .span import Span, SpanContext
+from .tracer import Tracer, extract, get_current_span, inject, tracer
+
+__all__ = [
+    "Span",
+    "SpanContext",
+    "Tracer",
+    "extract",
+    "get_current_span",
+    "inject",
+    "tracer",
+]
@@ -0,0 +1,151 @@
+from abc import ABC, abstractmethod
+from json import dumps
+from pathlib import Path
+from sys import stderr
+from typing import TYPE_CHECKING, Optional
+
+import httpx
+
+from src.core.config import settings
+from src.utils.batching import BatchQueue
+from src.utils.loading import import_string
+
+if TYPE_CHECKING:
+    from src.tracing.span import Span
+
+
+class SpanExporterABC(ABC):
+    """Абстрактный класс экспорта span'ов"""
+
+    @abstractmethod
+    def export(self, spans: list[dict]) -> None:
+        """
+        Экспортировать пачку span'ов
+
+        :param spans: Span'ы в формате OTLP/JSON
+        """
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        """Освободить ресурсы экспорта"""
+
+
+class FileSpanExporter(SpanExporterABC):
+    """
+    Записывает span'ы в NDJSON файл, по span'у на строку
+
+    :param file: Путь к файлу
+    """
+
+    def __init__(self, file: Optional[Path] = None) -> None:
+        self.file = file or settings.TRACING.FILE
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, spans: list[dict]) -> None:
+        data = "".join(dumps(span, ensure_ascii=False) + "\n" for span in spans)
+        with open(self.file, "a") as f:
+            f.write(data)
+
+
+class OTLPHttpSpanExporter(SpanExporterABC):
+    """
+    Отправляет span'ы в коллектор по OTLP/HTTP в JSON кодировке
+
+    :param endpoint: URL коллектора, например `http://localhost:4318/v1/traces`
+    :param timeout: Таймаут запроса в секундах
+    """
+
+    def __init__(
+        self, endpoint: Optional[str] = None, timeout: Optional[float] = None
+    ) -> None:
+        self.endpoint = endpoint or settings.TRACING.OTLP_ENDPOINT
+        self.client = httpx.Client(timeout=timeout or settings.TRACING.OTLP_TIMEOUT)
+        self.resource = {
+            "attributes": [
+                {
+                    "key": "service.name",
+                    "value": {
+                        "stringValue": settings.TRACING.SERVICE_NAME
+                        or settings.PROJECT_NAME
+                    },
+                },
+            ]
+        }
+
+    def export(self, spans: list[dict]) -> None:
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": self.resource,
+                    "scopeSpans": [{"scope": {"name": "src.tracing"}, "spans": spans}],
+                }
+            ]
+        }
+        response = self.client.post(self.endpoint, json=payload)
+        response.raise_for_status()
+
+    def shutdown(self) -> None:
+        self.client.close()
+
+
+class BatchSpanProcessor:
+    """
+    Копит завершённые span'ы в ограниченной очереди и экспортирует их пачками
+    в фоновом потоке. При переполнении очереди span'ы отбрасываются
+
+    :param exporter_path: Путь к классу экспорта span'ов
+    :param queue_size: Максимальный размер очереди
+    :param batch_size: Максимальный размер пачки
+    :param flush_interval: Максимальное время ожидания пачки в секундах
+    """
+
+    def __init__(
+        self,
+        exporter_path: Optional[str] = None,
+        queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+    ) -> None:
+        self.exporter_path = exporter_path or settings.TRACING.EXPORTER_PATH
+        self.batch_queue: BatchQueue["Span"] = BatchQueue(
+            self._export,
+            queue_size=queue_size or settings.TRACING.QUEUE_SIZE,
+            batch_size=batch_size or settings.TRACING.BATCH_SIZE,
+            flush_interval=flush_interval or settings.TRACING.FLUSH_INTERVAL,
+            name="span-exporter",
+            on_start=self._reset_exporter,
+        )
+        self._exporter: Optional[SpanExporterABC] = None
+
+    @property
+    def dropped(self) -> int:
+        return self.batch_queue.dropped
+
+    @property
+    def exporter(self) -> SpanExporterABC:
+        if self._exporter is None:
+            self._exporter = import_string(self.exporter_path)()
+        return self._exporter
+
+    def on_end(self, span: "Span") -> None:
+        self.batch_queue.put(span)
+
+    def flush(self) -> None:
+        """Синхронно экспортирует все span'ы из очереди"""
+        self.batch_queue.flush()
+
+    def shutdown(self) -> None:
+        self.batch_queue.stop()
+        if self._exporter is not None:
+            self._exporter.shutdown()
+
+    def _reset_exporter(self) -> None:
+        """Клиент экспорта создаётся заново в каждом процессе"""
+        self._exporter = None
+
+    def _export(self, batch: list["Span"]) -> None:
+        try:
+            self.exporter.export([span.to_otlp() for span in batch])
+        except Exception as e:
+            self.batch_queue.add_dropped(len(batch))
+            stderr.write(f"Ошибка экспорта span'ов: {e}, отброшено {len(batch)}\n")
@@ -0,0 +1,123 @@
+from contextvars import Token
+from typing import Any, Optional, Union
+
+from celery import signals
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.config import settings
+from src.tracing.span import Span
+from src.tracing.tracer import extract, get_current_span, tracer
+
+SPAN_ATTRIBUTE = "_trace_span"
+
+_instrumented_engines: set[int] = set()
+_task_spans: dict[str, tuple[Span, Token]] = {}
+
+
+def instrument_engine(engine: Union[AsyncEngine, Engine]) -> None:
+    """
+    Создаёт span на каждый SQL запрос движка.
+    Span'ы создаются только внутри сэмплированной трассировки
+
+    :param engine: Движок SQLAlchemy
+    """
+
+    sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    if id(sync_engine) in _instrumented_engines:
+        return
+    _instrumented_engines.add(id(sync_engine))
+
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(
+    conn, cursor, statement: str, parameters, context, executemany: bool
+) -> None:
+    parent = get_current_span()
+    if parent is None or not parent.sampled or context is None:
+        return
+
+    span = tracer.start_span(
+        "db.query",
+        kind="client",
+        parent=parent,
+        attributes={
+            "db.system": conn.dialect.name,
+            "db.statement": statement[: settings.TRACING.MAX_STATEMENT_SIZE],
+            "db.executemany": executemany,
+        },
+    )
+    setattr(context, SPAN_ATTRIBUTE, span)
+
+
+def _after_cursor_execute(
+    conn, cursor, statement: str, parameters, context, executemany: bool
+) -> None:
+    span: Optional[Span] = getattr(context, SPAN_ATTRIBUTE, None)
+    if span is not None:
+        span.set_attribute("db.rowcount", cursor.rowcount)
+        span.end()
+
+
+def _handle_error(exception_context) -> None:
+    context = exception_context.execution_context
+    span: Optional[Span] = getattr(context, SPAN_ATTRIBUTE, None)
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.end()
+
+
+def instrument_celery() -> None:
+    """
+    Создаёт span на каждое выполнение Celery задачи.
+    Родитель берётся из заголовка `traceparent`, который добавляет
+    `CeleryTaskService.create_task`
+    """
+
+    signals.task_prerun.connect(_task_prerun, weak=False)
+    signals.task_postrun.connect(_task_postrun, weak=False)
+    signals.task_failure.connect(_task_failure, weak=False)
+    signals.worker_process_shutdown.connect(_worker_shutdown, weak=False)
+
+
+def _task_prerun(task_id: str, task, **kwargs: Any) -> None:
+    parent = extract(
+        {"traceparent": getattr(task.request, "traceparent", None)}
+    ) or extract(getattr(task.request, "headers", None))
+
+    span = tracer.start_span(
+        f"celery {task.name}",
+        kind="consumer",
+        parent=parent,
+        attributes={"celery.task_id": task_id, "celery.task_name": task.name},
+    )
+    _task_spans[task_id] = (span, tracer.activate(span))
+
+
+def _task_postrun(task_id: str, state: Optional[str] = None, **kwargs: Any) -> None:
+    span_token = _task_spans.pop(task_id, None)
+    if span_token is None:
+        return
+
+    span, token = span_token
+    span.set_attribute("celery.state", state)
+    span.end()
+    try:
+        tracer.deactivate(token)
+    except ValueError:
+        # Токен создан в другом контексте
+        pass
+
+
+def _task_failure(task_id: str, exception: BaseException, **kwargs: Any) -> None:
+    span_token = _task_spans.get(task_id)
+    if span_token is not None:
+        span_token[0].record_exception(exception)
+
+
+def _worker_shutdown(**kwargs: Any) -> None:
+    tracer.shutdown()
@@ -0,0 +1,142 @@
+from os import urandom
+from time import time_ns
+from typing import TYPE_CHECKING, Any, Literal, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from src.tracing.tracer import Tracer
+
+SPAN_KIND = Literal["internal", "server", "client", "producer", "consumer"]
+
+# Коды SpanKind и StatusCode из OTLP
+OTLP_SPAN_KINDS: dict[str, int] = {
+    "internal": 1,
+    "server": 2,
+    "client": 3,
+    "producer": 4,
+    "consumer": 5,
+}
+OTLP_STATUS_OK = 1
+OTLP_STATUS_ERROR = 2
+
+
+class SpanContext(NamedTuple):
+    """Данные span'а, передаваемые между процессами"""
+
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+
+def generate_trace_id() -> str:
+    return urandom(16).hex()
+
+
+def generate_span_id() -> str:
+    return urandom(8).hex()
+
+
+class Span:
+    """
+    Единица работы в трассировке.
+    Атрибуты и время сохраняются только для сэмплированных span'ов,
+    но идентификаторы есть всегда, чтобы связывать лог-записи
+
+    :param tracer: Трассировщик, которому span передаётся при завершении
+    :param name: Название операции
+    :param kind: Тип span'а
+    :param trace_id: Id трассировки
+    :param parent_id: Id родительского span'а
+    :param sampled: Будет ли span экспортирован
+    """
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "kind",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "sampled",
+        "start_time",
+        "end_time",
+        "attributes",
+        "error",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        kind: SPAN_KIND,
+        trace_id: str,
+        parent_id: Optional[str],
+        sampled: bool,
+    ) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = generate_span_id()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_time = time_ns() if sampled else 0
+        self.end_time: Optional[int] = None
+        self.attributes: dict[str, Any] = {}
+        self.error = False
+
+    @property
+    def context(self) -> SpanContext:
+        return SpanContext(self.trace_id, self.span_id, self.sampled)
+
+    @property
+    def traceparent(self) -> str:
+        """Заголовок W3C `traceparent`"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.sampled:
+            self.attributes[key] = value
+
+    def record_exception(self, exception: BaseException) -> None:
+        self.error = True
+        if self.sampled:
+            self.attributes["exception.type"] = type(exception).__qualname__
+            self.attributes["exception.message"] = str(exception)
+
+    def end(self) -> None:
+        if self.end_time is not None:
+            return
+
+        self.end_time = time_ns() if self.sampled else 0
+        if self.sampled:
+            self.tracer.on_end(self)
+
+    def to_otlp(self) -> dict:
+        """Span в формате OTLP/JSON"""
+
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": OTLP_SPAN_KINDS[self.kind],
+            "startTimeUnixNano": str(self.start_time),
+            "endTimeUnixNano": str(self.end_time),
+            "attributes": [
+                {"key": key, "value": to_otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": OTLP_STATUS_ERROR if self.error else OTLP_STATUS_OK},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def to_otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
@@ -0,0 +1,168 @@
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from random import random
+from re import compile as compile_regex
+from typing import Any, Callable, Iterator, Mapping, Optional, Union
+
+from src.core.config import settings
+from src.tracing.exporters import BatchSpanProcessor
+from src.tracing.span import SPAN_KIND, Span, SpanContext, generate_trace_id
+
+TRACEPARENT_HEADER = "traceparent"
+TRACEPARENT_REGEX = compile_regex(
+    r"^[\da-f]{2}-(?P<trace_id>[\da-f]{32})-"
+    r"(?P<span_id>[\da-f]{16})-(?P<flags>[\da-f]{2})$"
+)
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def get_current_span() -> Optional[Span]:
+    """Текущий активный span контекста"""
+    return _current_span.get()
+
+
+class Tracer:
+    """
+    Трассировщик внутри процесса.
+
+    Решение о сэмплировании принимается для корневого span'а и наследуется
+    дочерними, в т.ч. в других процессах через заголовок `traceparent`.
+    Завершённые сэмплированные span'ы экспортируются пачками в фоновом потоке
+
+    :param enabled: Включена ли трассировка, без неё span'ы не экспортируются
+    :param sample_rate: Доля сэмплируемых трассировок от 0 до 1
+    :param random_func: Источник случайных чисел для сэмплирования
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[float] = None,
+        random_func: Callable[[], float] = random,
+    ) -> None:
+        self.enabled = settings.TRACING.ENABLED if enabled is None else enabled
+        self.sample_rate = (
+            settings.TRACING.SAMPLE_RATE if sample_rate is None else sample_rate
+        )
+        self.random_func = random_func
+        self._processor: Optional[BatchSpanProcessor] = None
+
+    @property
+    def processor(self) -> BatchSpanProcessor:
+        if self._processor is None:
+            self._processor = BatchSpanProcessor()
+        return self._processor
+
+    def start_span(
+        self,
+        name: str,
+        kind: SPAN_KIND = "internal",
+        parent: Union[Span, SpanContext, None] = None,
+        attributes: Optional[dict[str, Any]] = None,
+    ) -> Span:
+        """
+        Создаёт span, не делая его текущим
+
+        :param name: Название операции
+        :param kind: Тип span'а
+        :param parent: Родитель, по умолчанию - текущий span
+        :param attributes: Атрибуты span'а
+        """
+
+        if parent is None:
+            parent = _current_span.get()
+
+        if parent is None:
+            trace_id = generate_trace_id()
+            parent_id = None
+            sampled = self.enabled and self.random_func() < self.sample_rate
+        else:
+            trace_id = parent.trace_id
+            parent_id = parent.span_id
+            sampled = self.enabled and parent.sampled
+
+        span = Span(self, name, kind, trace_id, parent_id, sampled)
+        if sampled and attributes:
+            span.attributes.update(attributes)
+        return span
+
+    @staticmethod
+    def activate(span: Span) -> Token:
+        """Делает span текущим, возвращает токен для `deactivate`"""
+        return _current_span.set(span)
+
+    @staticmethod
+    def deactivate(token: Token) -> None:
+        _current_span.reset(token)
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: SPAN_KIND = "internal",
+        parent: Union[Span, SpanContext, None] = None,
+        attributes: Optional[dict[str, Any]] = None,
+    ) -> Iterator[Span]:
+        """Создаёт текущий span на время блока и завершает его"""
+
+        span = self.start_span(name, kind, parent, attributes)
+        token = self.activate(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            span.end()
+            self.deactivate(token)
+
+    def on_end(self, span: Span) -> None:
+        self.processor.on_end(span)
+
+    def shutdown(self) -> None:
+        """Отправляет накопленные span'ы и останавливает фоновый поток"""
+        if self._processor is not None:
+            self._processor.shutdown()
+
+
+def inject(headers: Optional[dict] = None, span: Optional[Span] = None) -> dict:
+    """
+    Добавляет в заголовки контекст текущего span'а
+
+    :param headers: Заголовки, которые нужно дополнить
+    :param span: Span, по умолчанию - текущий
+    :return: Заголовки
+    """
+
+    headers = {} if headers is None else headers
+    span = span or _current_span.get()
+    if span is not None:
+        headers[TRACEPARENT_HEADER] = span.traceparent
+    return headers
+
+
+def extract(headers: Optional[Mapping]) -> Optional[SpanContext]:
+    """Контекст родительского span'а из заголовков или None"""
+
+    if not headers:
+        return None
+
+    traceparent = headers.get(TRACEPARENT_HEADER)
+    if isinstance(traceparent, bytes):
+        traceparent = traceparent.decode("latin-1")
+    if not traceparent:
+        return None
+
+    match = TRACEPARENT_REGEX.match(traceparent.strip().lower())
+    if match is None:
+        return None
+
+    return SpanContext(
+        trace_id=match["trace_id"],
+        span_id=match["span_id"],
+        sampled=bool(int(match["flags"], 16) & 1),
+    )
+
+
+tracer = Tracer()
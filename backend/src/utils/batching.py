@@ -0,0 +1,140 @@
+from os import getpid
+from queue import Empty, Full, Queue
+from sys import stderr
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class BatchQueue(Generic[T]):
+    """
+    Ограниченная очередь в памяти, которую фоновый поток передаёт в `process`
+    пачками по размеру или по времени.
+
+    Поток запускается при первом `put` и заново после fork процесса. Дочерний
+    процесс получает новую очередь: очередь родителя могла быть захвачена его
+    потоком в момент fork, а её элементы обработает сам родитель.
+    Если очередь переполнена или `process` упал, элементы отбрасываются
+    и учитываются в `dropped`, поток продолжает работу
+
+    :param process: Обработчик пачки
+    :param queue_size: Максимальный размер очереди
+    :param batch_size: Максимальный размер пачки
+    :param flush_interval: Максимальное время ожидания пачки в секундах
+    :param name: Название фонового потока
+    :param on_start: Вызывается перед запуском потока в каждом процессе,
+        например, чтобы пересоздать соединения после fork
+    """
+
+    def __init__(
+        self,
+        process: Callable[[list[T]], None],
+        queue_size: int,
+        batch_size: int,
+        flush_interval: float,
+        name: str,
+        on_start: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.process = process
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.name = name
+        self.on_start = on_start
+        self.queue: Queue[T] = Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._dropped_lock = Lock()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._thread_lock = Lock()
+
+    def put(self, item: T) -> None:
+        """Добавляет элемент в очередь, не блокируя вызывающий поток"""
+
+        self._ensure_worker()
+        try:
+            self.queue.put_nowait(item)
+        except Full:
+            self.add_dropped(1)
+
+    def add_dropped(self, count: int) -> None:
+        with self._dropped_lock:
+            self.dropped += count
+
+    def flush(self) -> None:
+        """Синхронно обрабатывает все элементы очереди"""
+
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                break
+            self.process(batch)
+
+    def stop(self) -> None:
+        """Останавливает фоновый поток и обрабатывает остаток очереди"""
+
+        self._stop.set()
+        if self._thread is not None and self._thread_pid == getpid():
+            self._thread.join(timeout=self.flush_interval * 2)
+        self.flush()
+
+    def _ensure_worker(self) -> None:
+        pid = getpid()
+        if self._thread_pid == pid:
+            return
+
+        with self._thread_lock:
+            if self._thread_pid == pid:
+                return
+
+            if self._thread_pid is not None:
+                self.queue = Queue(maxsize=self.queue_size)
+                self._dropped_lock = Lock()
+            if self.on_start is not None:
+                self.on_start()
+            self._stop.clear()
+            self._thread = Thread(target=self._run, name=self.name, daemon=True)
+            self._thread_pid = pid
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            try:
+                self.process(batch)
+            except Exception as e:
+                self.add_dropped(len(batch))
+                stderr.write(f"{self.name}: {e!r}, отброшено {len(batch)}\n")
+
+    def _collect_batch(self) -> list[T]:
+        """Собирает пачку, пока она не заполнится или не истечёт flush_interval"""
+
+        batch: list[T] = []
+        deadline = monotonic() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            timeout = deadline - monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except Empty:
+                break
+
+            batch.extend(self._drain(self.batch_size - len(batch)))
+
+        return batch
+
+    def _drain(self, limit: int) -> list[T]:
+        batch: list[T] = []
+        while len(batch) < limit:
+            try:
+                batch.append(self.queue.get_nowait())
+            except Empty:
+                break
+        return batch
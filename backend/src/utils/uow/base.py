@@ -1,11 +1,13 @@
 from abc import ABC, abstractmethod
 from uuid import UUID
 
+from src.repository.mail import IMailOutboxRepository
 from src.repository.users import IUserRepository
 
 
 class UoWABC(ABC):
     users: IUserRepository[UUID]
+    mail_outbox: IMailOutboxRepository[int]
 
     async def __aenter__(self):
         return self
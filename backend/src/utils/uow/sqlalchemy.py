@@ -1,7 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from src.database import async_session_maker
-from src.repository import UserRepository
+from src.repository import MailOutboxRepository, UserRepository
 
 from .base import UoWABC
 
@@ -15,6 +15,7 @@ class SQLAlchemyUoW(UoWABC):
     async def __aenter__(self):
         self.session = self.session_maker()
         self.users = UserRepository(self.session)
+        self.mail_outbox = MailOutboxRepository(self.session)
 
         return await super().__aenter__()
 